@@ -0,0 +1,110 @@
+"""
+Benchmark for request validation and response encoding
+Compares the old Dict[str, Any] + default JSON encoder path with the
+Pydantic v2 models + ORJSONResponse path used by the hot endpoints.
+
+Run: python bench_serialization.py
+"""
+
+import json
+import timeit
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from models.dispatch import DispatchCreate, DispatchResponse, WhatsAppStatus
+
+DISPATCH_BODY = {
+    "ambulance_id": "AMB-105",
+    "emergency_id": "EMG-001",
+    "hospital_name": "AIIMS New Delhi",
+    "hospital_address": "Ansari Nagar, New Delhi, Delhi 110029",
+    "driver_phone": "+917483588380",
+    "driver_name": "Amit Sharma",
+    "patient_info": "Patient - chest pain, conscious, breathing with difficulty",
+    "eta": "8 minutes"
+}
+DISPATCH_JSON = json.dumps(DISPATCH_BODY).encode()
+
+
+def make_dispatches(count: int) -> list:
+    return [
+        {
+            **DISPATCH_BODY,
+            "dispatch_id": f"DSP-{i:03d}",
+            "status": "dispatched",
+            "whatsapp_sent": True,
+            "whatsapp_sid": f"SM{i:032d}",
+            "whatsapp_error": None,
+            "created_at": "2026-10-19T10:00:00.000+00:00",
+            "version": i
+        }
+        for i in range(count)
+    ]
+
+
+def dispatch_before():
+    """Old path: parse JSON into a dict, check fields by hand, jsonable_encoder + json.dumps"""
+    data = json.loads(DISPATCH_JSON)
+    required = [data.get(k) for k in ("ambulance_id", "hospital_name", "hospital_address", "driver_phone")]
+    if not all(required):
+        raise ValueError("missing fields")
+    response = {
+        "success": True,
+        "message": "Ambulance dispatched successfully",
+        "dispatch_id": "DSP-001",
+        "ambulance_id": data.get("ambulance_id"),
+        "emergency_id": data.get("emergency_id"),
+        "hospital_name": data.get("hospital_name"),
+        "eta": data.get("eta", "8 minutes"),
+        "whatsapp_status": {"sent": True, "message_sid": "SM123", "error": None}
+    }
+    return JSONResponse(content=jsonable_encoder(response)).body
+
+
+def dispatch_after():
+    """New path: validate straight from JSON bytes, serialize the response model, render with orjson"""
+    data = DispatchCreate.model_validate_json(DISPATCH_JSON)
+    response = DispatchResponse(
+        success=True,
+        message="Ambulance dispatched successfully",
+        dispatch_id="DSP-001",
+        ambulance_id=data.ambulance_id,
+        emergency_id=data.emergency_id,
+        hospital_name=data.hospital_name,
+        eta=data.eta,
+        whatsapp_status=WhatsAppStatus(sent=True, message_sid="SM123")
+    )
+    return ORJSONResponse(content=response.model_dump(mode="json")).body
+
+
+def run(label: str, func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    per_call_us = seconds / number * 1e6
+    print(f"   {label:<10} {per_call_us:10.1f} µs/call")
+    return per_call_us
+
+
+def main():
+    print("\n" + "=" * 50)
+    print("   SARS Serialization Benchmark")
+    print("=" * 50)
+
+    print("\n📤 POST /api/dispatch/ validation + encoding")
+    print("-" * 50)
+    before = run("before", dispatch_before, 20000)
+    after = run("after", dispatch_after, 20000)
+    print(f"   speedup    {before / after:10.2f}x")
+
+    for count in (100, 1000):
+        dispatches = make_dispatches(count)
+        body = {"dispatches": dispatches, "total": count}
+        print(f"\n📋 GET /api/dispatch/ list encoding ({count} records)")
+        print("-" * 50)
+        before = run("before", lambda: JSONResponse(content=jsonable_encoder(body)).body, 200)
+        after = run("after", lambda: ORJSONResponse(content=body).body, 200)
+        print(f"   speedup    {before / after:10.2f}x")
+
+    print("\n" + "=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,39 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import transcription, ambulances, dispatch, emergencies
+from routers import transcription, ambulances, analytics, dispatch, emergencies, events, geocode, hospitals, journal, maps, profiling, traces
+from services.event_bus import event_bus
+from services.state_store import state_store
+from services.resilience import policies
+from services.eta_model import eta_model, save_default as save_speed_profile
+from services.profiler import PROFILING_ENABLED, SlowRequestMiddleware, watchdog
+from services.delivery_tracker import delivery_tracker
+from services.map_proxy import map_proxy
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await event_bus.start()
+    await delivery_tracker.start()
+    if PROFILING_ENABLED:
+        await watchdog.start()
+    yield
+    await delivery_tracker.stop()
+    await event_bus.stop()
+    await watchdog.stop()
+    await map_proxy.close()
+    save_speed_profile(eta_model)
+    state_store.close()
+
 app = FastAPI(
     title="SARS - Smart Ambulance Routing System",
     description="AI-powered ambulance dispatch and routing system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -22,11 +45,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in slow-request capture (see /api/profiling)
+if PROFILING_ENABLED:
+    app.add_middleware(SlowRequestMiddleware, watchdog=watchdog)
+
 # Include routers
 app.include_router(transcription.router, prefix="/api/transcription", tags=["Transcription"])
 app.include_router(ambulances.router, prefix="/api/ambulances", tags=["Ambulances"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(dispatch.router, prefix="/api/dispatch", tags=["Dispatch"])
 app.include_router(emergencies.router, prefix="/api/emergencies", tags=["Emergencies"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
+app.include_router(geocode.router, prefix="/api/geocode", tags=["Geocoding"])
+app.include_router(hospitals.router, prefix="/api/hospitals", tags=["Hospitals"])
+app.include_router(journal.router, prefix="/api/journal", tags=["Journal"])
+app.include_router(maps.router, prefix="/api/maps", tags=["Maps"])
+app.include_router(profiling.router, prefix="/api/profiling", tags=["Profiling"])
+app.include_router(traces.router, prefix="/api/traces", tags=["Tracing"])
 
 @app.get("/")
 async def root():
@@ -40,9 +75,16 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "service": "SARS Backend API"
+        "service": "SARS Backend API",
+        "state_backend": state_store.name,
+        "worker_pid": os.getpid()
     }
 
+@app.get("/api/health/resilience")
+async def resilience_status():
+    """Circuit breaker state, latency percentiles and hedge win rate per provider call"""
+    return {name: policy.snapshot() for name, policy in policies.items()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
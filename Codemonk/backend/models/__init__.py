@@ -1 +1,26 @@
 # Models package
+from models.ambulance import (
+    Ambulance,
+    AmbulanceBulkUpdate,
+    AmbulanceChange,
+    AmbulanceStatusUpdate,
+    Driver,
+    Location,
+    TrackPoint,
+    TrackUpload,
+)
+from models.emergency import (
+    Emergency,
+    EmergencyCreate,
+    EmergencyImport,
+    EmergencyUpdate,
+)
+from models.dispatch import (
+    DispatchCreate,
+    DispatchResponse,
+    DispatchUpdate,
+    DispatchUpdateResponse,
+    WhatsAppStatus,
+)
+from models.extraction import ExtractionResult, ExtractTextRequest
+from models.hospital import Hospital, HospitalCapacityUpdate
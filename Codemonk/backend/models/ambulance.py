@@ -0,0 +1,62 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+
+class Location(BaseModel):
+    """Geographic position with an optional human-readable address"""
+    model_config = ConfigDict(extra="allow")
+
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    address: Optional[str] = None
+
+
+class Driver(BaseModel):
+    name: str
+    phone: str
+
+
+class Ambulance(BaseModel):
+    """Ambulance record as stored in the state backend"""
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    vehicle_number: str
+    type: str
+    status: str = "available"
+    current_location: Location
+    driver: Driver
+    equipment: List[str] = []
+    version: Optional[int] = None
+
+
+class AmbulanceStatusUpdate(BaseModel):
+    status: str = Field(..., min_length=1)
+    version: Optional[int] = Field(None, description="Version last read; the update is rejected if the record changed since")
+
+
+class AmbulanceChange(BaseModel):
+    """Status, location and crew change for one ambulance in a bulk update"""
+    id: str
+    version: Optional[int] = Field(None, description="Version last read; omit to apply on top of whatever is stored")
+    status: Optional[str] = Field(None, min_length=1)
+    current_location: Optional[Location] = None
+    driver: Optional[Driver] = None
+
+
+class AmbulanceBulkUpdate(BaseModel):
+    """Changes to many ambulances, e.g. a shift change or hospital handover"""
+    updates: List[AmbulanceChange] = Field(..., min_length=1, max_length=1000)
+    atomic: bool = Field(True, description="Apply all changes or none; false applies the ones without conflicts")
+
+
+class TrackPoint(BaseModel):
+    """One GPS fix from an ambulance"""
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    timestamp: float = Field(..., description="Unix seconds")
+
+
+class TrackUpload(BaseModel):
+    """Recorded GPS fixes, oldest first"""
+    points: List[TrackPoint] = Field(..., min_length=1, max_length=10000)
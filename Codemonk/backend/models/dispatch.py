@@ -0,0 +1,55 @@
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Any, Dict, Optional, Union
+
+
+class DispatchCreate(BaseModel):
+    """Request body of POST /api/dispatch/"""
+    model_config = ConfigDict(extra="allow")
+
+    ambulance_id: str = Field(..., min_length=1)
+    emergency_id: Optional[str] = None
+    patient_info: Optional[Union[str, Dict[str, Any]]] = None
+    hospital_id: Optional[str] = None
+    hospital_name: Optional[str] = Field(None, min_length=1)
+    hospital_address: Optional[str] = Field(None, min_length=1)
+    driver_phone: str = Field(..., min_length=1, description="E.164 format, e.g. +919876543210")
+    driver_name: Optional[str] = None
+    eta: Optional[Union[str, int, float]] = None
+
+    @model_validator(mode="after")
+    def check_destination(self) -> "DispatchCreate":
+        if not self.hospital_id and not (self.hospital_name and self.hospital_address):
+            raise ValueError("hospital_id or both hospital_name and hospital_address are required")
+        return self
+
+
+class DispatchUpdate(BaseModel):
+    """Request body of POST /api/dispatch/{dispatch_id}/send-update"""
+    update_type: str = "UPDATE"
+    details: str = ""
+
+
+class WhatsAppStatus(BaseModel):
+    sent: bool
+    queued: bool = False
+    message_sid: Optional[str] = None
+    error: Optional[str] = None
+
+
+class DispatchResponse(BaseModel):
+    success: bool
+    message: str
+    dispatch_id: str
+    ambulance_id: str
+    emergency_id: Optional[str] = None
+    hospital_id: Optional[str] = None
+    hospital_name: str
+    eta: Optional[Union[str, int, float]] = None
+    whatsapp_status: WhatsAppStatus
+
+
+class DispatchUpdateResponse(BaseModel):
+    success: bool
+    message: str
+    dispatch_id: str
+    whatsapp_status: WhatsAppStatus
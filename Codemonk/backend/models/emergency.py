@@ -0,0 +1,51 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+
+class EmergencyCreate(BaseModel):
+    """
+    Emergency submitted by the dispatcher UI
+
+    Known fields are typed; anything else the form sends is kept as-is.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    patient_name: Optional[str] = None
+    patient_age: Optional[Union[int, str]] = None
+    emergency_type: Optional[str] = None
+    severity: Optional[str] = None
+    priority: Optional[Union[int, str]] = None
+    symptoms: Optional[Union[List[str], str]] = None
+    location: Optional[Union[str, Dict[str, Any]]] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    special_requirements: Optional[List[str]] = None
+    # Links the emergency to the call it came from, for search and tracing
+    call_id: Optional[str] = None
+    trace_id: Optional[str] = None
+
+
+class EmergencyUpdate(EmergencyCreate):
+    status: Optional[str] = None
+
+
+class EmergencyImport(EmergencyCreate):
+    """
+    One row of a bulk emergency import
+
+    id and created_at are kept when given (historical data); otherwise the
+    row gets a new EMG id and the import time.
+    """
+    id: Optional[str] = Field(None, min_length=1)
+    status: str = "new"
+    created_at: Optional[datetime] = None
+
+
+class Emergency(EmergencyUpdate):
+    """Emergency record as stored in the state backend"""
+    id: str
+    status: str = "new"
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    version: Optional[int] = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Union
+
+
+class ExtractTextRequest(BaseModel):
+    """Request body of POST /api/transcription/extract"""
+    text: str
+
+
+class ExtractionResult(BaseModel):
+    """Structured patient information extracted from an emergency call"""
+    model_config = ConfigDict(extra="allow")
+
+    patient_name: str = "Patient"
+    patient_age: Union[int, str] = 45
+    patient_gender: str = "unknown"
+    patient_phone: str = ""
+    emergency_type: str = "Medical Emergency"
+    symptoms: List[str] = []
+    location: str = ""
+    severity: str = "high"
+    priority: int = Field(2, ge=1, le=4)
+    caller_name: str = "Caller"
+    caller_phone: str = ""
+    special_requirements: List[str] = []
+    consciousness: str = "unknown"
+    breathing: str = "unknown"
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+
+class Hospital(BaseModel):
+    """Hospital record as stored in the state backend"""
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    name: str
+    address: Optional[str] = None
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    specialties: List[str] = []
+    beds_total: int = 0
+    beds_available: int = 0
+    icu_total: int = 0
+    icu_available: int = 0
+    diverting: bool = False
+    version: Optional[int] = None
+
+
+class HospitalCapacityUpdate(BaseModel):
+    """Request body of PATCH /api/hospitals/{hospital_id}/capacity (absolute counts)"""
+    beds_total: Optional[int] = Field(None, ge=0)
+    beds_available: Optional[int] = Field(None, ge=0)
+    icu_total: Optional[int] = Field(None, ge=0)
+    icu_available: Optional[int] = Field(None, ge=0)
+    diverting: Optional[bool] = None
@@ -1,9 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import time
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.capability_index import capability_index
+from services.eta_model import eta_model, format_eta
+from services.list_query import utc_now
+from services.bulk_import import ImportTarget, import_request, ambulance_defaults
+from models.ambulance import Ambulance, AmbulanceBulkUpdate, AmbulanceChange, AmbulanceStatusUpdate, Location, TrackUpload
 
 router = APIRouter()
 
-# Mock ambulance data
+# Collection holding ambulance records in the shared state backend
+AMBULANCES = "ambulances"
+
+# Rounds for changes without a version that lost a race with another console
+UNPINNED_ATTEMPTS = 3
+
+# Roster imports: every row names its vehicle id
+FLEET_IMPORT = ImportTarget(AMBULANCES, Ambulance, "ambulance.imported", prepare=ambulance_defaults)
+
+# Mock ambulance data (seeded into the state backend on first start)
 mock_ambulances = [
     {
         "id": "AMB-105",
@@ -87,29 +106,266 @@ mock_ambulances = [
     }
 ]
 
+state_store.seed(AMBULANCES, mock_ambulances)
+capability_index.load(state_store.values(AMBULANCES))
+event_bus.add_listener(capability_index.on_event)
+event_bus.add_listener(eta_model.on_event)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+
+@router.get("/", response_class=ORJSONResponse)
+async def get_all_ambulances(
+    status: Optional[str] = None,
+    capabilities: Optional[str] = None,
+    requirements: Optional[str] = None
+) -> ORJSONResponse:
+    """
+    Get all ambulances with their current status and location
+
+    Filters:
+    - status: e.g. available
+    - capabilities: comma-separated equipment or type, all required (e.g. als,ventilator)
+    - requirements: comma-separated special_requirements from extraction
+      (e.g. Cardiac Care); entries with no equipment equivalent are ignored
+    """
+    if status is None and capabilities is None and requirements is None:
+        return ORJSONResponse(content=state_store.values(AMBULANCES))
+    return ORJSONResponse(content=_filtered(status, capabilities, requirements))
+
+
+def _filtered(status: Optional[str], capabilities: Optional[str], requirements: Optional[str]) -> List[Dict[str, Any]]:
+    wanted, unknown = capability_index.resolve(_split(capabilities))
+    if unknown:
+        # Nobody in the fleet has it
+        return []
+    wanted += capability_index.resolve(_split(requirements))[0]
+
+    ambulances = []
+    for ambulance_id in capability_index.query(status, wanted):
+        ambulance = state_store.get(AMBULANCES, ambulance_id)
+        if ambulance:
+            ambulances.append(ambulance)
+    return ambulances
+
+
+@router.get("/capabilities")
+async def get_capability_index() -> Dict[str, Any]:
+    """Interned capabilities and per-status fleet counts"""
+    return capability_index.stats()
+
+
+@router.get("/eta", response_class=ORJSONResponse)
+async def rank_by_eta(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    status: Optional[str] = "available",
+    capabilities: Optional[str] = None,
+    requirements: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+) -> ORJSONResponse:
+    """
+    Candidate ambulances ranked by predicted travel time to a point
+
+    Takes the same filters as GET /, then predicts every candidate's ETA in
+    one vectorized pass over the learned speed profile for the current hour.
+    """
+    started = time.perf_counter()
+    candidates = [
+        ambulance for ambulance in _filtered(status, capabilities, requirements)
+        if (ambulance.get("current_location") or {}).get("latitude") is not None
+    ]
+    origins = np.array(
+        [(a["current_location"]["latitude"], a["current_location"]["longitude"]) for a in candidates],
+        dtype=np.float64
+    )
+    seconds = eta_model.predict(origins, (latitude, longitude), time.time())
+    order = np.argsort(seconds)[:limit]
+    return ORJSONResponse(content={
+        "candidates": [
+            {
+                "ambulance_id": candidates[i]["id"],
+                "type": candidates[i].get("type"),
+                "current_location": candidates[i]["current_location"],
+                "eta_seconds": round(float(seconds[i])),
+                "eta": format_eta(float(seconds[i]))
+            }
+            for i in order.tolist()
+        ],
+        "considered": len(candidates),
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
+
+@router.get("/eta/profile")
+async def get_speed_profile() -> Dict[str, Any]:
+    """Learned road cells, per-hour city speeds and table size"""
+    return eta_model.profile()
+
+
+@router.post("/import")
+async def import_ambulances(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    on_conflict: str = Query("skip", pattern="^(skip|replace)$"),
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Bulk-load a fleet roster from NDJSON or CSV
 
-@router.get("/")
-async def get_all_ambulances() -> List[Dict[str, Any]]:
-    """Get all ambulances with their current status and location"""
-    return mock_ambulances
+    Rows are full ambulance records (id, vehicle_number, type, status,
+    current_location, driver, equipment). In CSV, nested fields use dotted
+    columns (current_location.latitude, driver.phone) and lists are JSON
+    cells. Pass on_conflict=replace to update vehicles already on the roster.
+    """
+    return await import_request(request, FLEET_IMPORT, format, on_conflict, dry_run)
 
 
 @router.get("/{ambulance_id}")
 async def get_ambulance(ambulance_id: str) -> Dict[str, Any]:
     """Get specific ambulance details"""
-    ambulance = next(
-        (amb for amb in mock_ambulances if amb["id"] == ambulance_id), None)
+    ambulance = state_store.get(AMBULANCES, ambulance_id)
     if not ambulance:
         raise HTTPException(status_code=404, detail="Ambulance not found")
     return ambulance
 
 
+@router.patch("/status")
+async def bulk_update_ambulances(bulk: AmbulanceBulkUpdate) -> Dict[str, Any]:
+    """
+    Update status, location and crew of many ambulances in one request
+
+    Each change may carry the version the console last read; it applies only
+    if the ambulance has not changed since (compare-and-set), so consoles
+    never lock the fleet. With atomic (the default) either every change is
+    written or none is and the response is 409 listing the conflicts.
+    Changes without a version are merged into the latest stored record.
+    """
+    written, conflicts = _update_fleet(bulk.updates, bulk.atomic)
+    if conflicts and bulk.atomic:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Ambulances changed since they were read; nothing was updated", "conflicts": conflicts}
+        )
+    return {
+        "success": not conflicts,
+        "updated": [{"id": record["id"], "status": record.get("status"), "version": record["version"]} for record in written],
+        "conflicts": conflicts
+    }
+
+
 @router.put("/{ambulance_id}/status")
-async def update_ambulance_status(ambulance_id: str, status: Dict[str, str]) -> Dict[str, Any]:
-    """Update ambulance status"""
+async def update_ambulance_status(ambulance_id: str, status: AmbulanceStatusUpdate) -> Dict[str, Any]:
+    """
+    Update ambulance status
+
+    Pass the version last read to reject the update (409) if someone else
+    changed the ambulance in the meantime.
+    """
+    written, conflicts = _update_fleet(
+        [AmbulanceChange(id=ambulance_id, version=status.version, status=status.status)], atomic=True
+    )
+    if conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": f"Ambulance {ambulance_id} changed since it was read", "conflicts": conflicts}
+        )
     return {
         "success": True,
         "message": f"Ambulance {ambulance_id} status updated",
         "ambulance_id": ambulance_id,
-        "new_status": status.get("status")
+        "new_status": status.status,
+        "version": written[0]["version"]
     }
+
+
+def _apply_change(record: Dict[str, Any], change: AmbulanceChange) -> Dict[str, Any]:
+    updated = dict(record)
+    if change.status is not None:
+        updated["status"] = change.status
+    if change.current_location is not None:
+        updated["current_location"] = {
+            **(record.get("current_location") or {}),
+            **change.current_location.model_dump(exclude_none=True)
+        }
+    if change.driver is not None:
+        updated["driver"] = change.driver.model_dump()
+    updated["updated_at"] = utc_now()
+    return updated
+
+
+def _update_fleet(changes: List[AmbulanceChange], atomic: bool) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Compare-and-set a batch of ambulance changes
+
+    Returns:
+        (records written, conflicts); written records are published as
+        "ambulance.updated" so the capability index updates per vehicle
+    """
+    ids = [change.id for change in changes]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Each ambulance may appear only once per request")
+
+    pending = changes
+    written: List[Dict[str, Any]] = []
+    conflicts: List[Dict[str, Any]] = []
+    for attempt in range(UNPINNED_ATTEMPTS):
+        batch, unknown = [], []
+        for change in pending:
+            record = state_store.get(AMBULANCES, change.id)
+            if record is None:
+                unknown.append(change.id)
+                continue
+            expected = change.version if change.version is not None else record.get("version")
+            batch.append((change.id, _apply_change(record, change), expected))
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Ambulances not found: {', '.join(unknown)}")
+
+        done, failed = state_store.put_many(AMBULANCES, batch, atomic)
+        written += done
+
+        # Changes without a version only conflicted with a concurrent write; re-read and try again
+        unpinned = {change.id for change in pending if change.version is None}
+        retry = {conflict["id"] for conflict in failed if conflict["id"] in unpinned and conflict["current_version"] is not None}
+        if atomic and len(retry) < len(failed):
+            retry = set()
+        conflicts += [conflict for conflict in failed if conflict["id"] not in retry]
+        if not retry or attempt == UNPINNED_ATTEMPTS - 1:
+            conflicts += [conflict for conflict in failed if conflict["id"] in retry]
+            break
+        if not atomic:
+            # The rest were written (or rejected for good); an atomic batch is retried whole
+            pending = [change for change in pending if change.id in retry]
+
+    for record in written:
+        event_bus.publish("ambulance.updated", record)
+    return written, conflicts
+
+
+@router.post("/{ambulance_id}/track")
+async def upload_track(ambulance_id: str, track: TrackUpload) -> Dict[str, Any]:
+    """
+    Record GPS fixes from an ambulance
+
+    The last fix becomes the ambulance's current location, and the track is
+    learned into the speed profile on every worker. The location is merged
+    with compare-and-set like a status change, so a concurrent status update
+    is never overwritten.
+    """
+    points = sorted((point.model_dump() for point in track.points), key=lambda point: point["timestamp"])
+    last = points[-1]
+    change = AmbulanceChange(
+        id=ambulance_id,
+        current_location=Location(latitude=last["latitude"], longitude=last["longitude"], recorded_at=last["timestamp"])
+    )
+    written, conflicts = _update_fleet([change], atomic=True)
+    if conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": f"Ambulance {ambulance_id} kept changing; track not applied", "conflicts": conflicts}
+        )
+
+    event_bus.publish("ambulance.track", {"ambulance_id": ambulance_id, "points": points})
+    return {"ambulance_id": ambulance_id, "points": len(points), "current_location": written[0]["current_location"]}
@@ -0,0 +1,137 @@
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.coverage import coverage_grid, RASTER_STEP_SECONDS, UNREACHABLE
+from services.demand_forecast import demand_forecaster, SEVERITIES
+from routers.ambulances import AMBULANCES
+from routers.emergencies import EMERGENCIES
+from typing import Dict, Any, Optional
+import asyncio
+import zlib
+
+router = APIRouter()
+
+# Grid starts from the fleet already in the state backend; moves on any worker update it incrementally
+coverage_grid.load(state_store.values(AMBULANCES))
+event_bus.add_listener(coverage_grid.on_event)
+
+# Forecast history starts from stored emergencies; new ones are picked up at the next refit
+demand_forecaster.load(state_store.values(EMERGENCIES))
+event_bus.add_listener(demand_forecaster.on_event)
+
+# Deepest zoom worth rendering: a 250 m cell is a few pixels wide at z16
+MAX_TILE_ZOOM = 18
+
+
+def _not_modified(etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+@router.get("/coverage")
+async def get_coverage() -> Dict[str, Any]:
+    """
+    Coverage of the service area by available ambulances
+
+    within_target_pct is the share of the service circle an available unit
+    can reach within SARS_COVERAGE_TARGET_MINUTES.
+    """
+    return coverage_grid.summary()
+
+
+@router.get("/coverage/raster")
+async def get_coverage_raster(
+    row: int = Query(0, ge=0),
+    col: int = Query(0, ge=0),
+    rows: Optional[int] = Query(None, ge=1),
+    cols: Optional[int] = Query(None, ge=1),
+    if_none_match: Optional[str] = Header(None)
+) -> Response:
+    """
+    Reach time per cell as raw uint8, row-major from the north-west corner
+
+    Each byte is the reach time in steps of X-Coverage-Step-Seconds; 255
+    means no available unit within the horizon. Pass row/col/rows/cols for
+    a window; grid size and bounds are in the X-Coverage-* headers.
+    Revalidate with If-None-Match to only download changes.
+    """
+    codes = coverage_grid.codes()
+    version = coverage_grid.version
+    if row >= coverage_grid.rows or col >= coverage_grid.cols:
+        raise HTTPException(status_code=400, detail=f"Window starts outside the {coverage_grid.rows}x{coverage_grid.cols} grid")
+    window = codes[row:row + (rows or coverage_grid.rows), col:col + (cols or coverage_grid.cols)]
+    content = window.tobytes()
+
+    # From the content, not the per-process version: any worker answers a revalidation correctly
+    etag = f'"cov-{zlib.crc32(content):08x}-{row}-{col}-{window.shape[0]}-{window.shape[1]}"'
+    cached = _not_modified(etag, if_none_match)
+    if cached is not None:
+        return cached
+
+    bounds = coverage_grid.bounds()
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "X-Coverage-Version": str(version),
+            "X-Coverage-Rows": str(window.shape[0]),
+            "X-Coverage-Cols": str(window.shape[1]),
+            "X-Coverage-Row": str(row),
+            "X-Coverage-Col": str(col),
+            "X-Coverage-Bounds": f"{bounds['north']},{bounds['west']},{bounds['south']},{bounds['east']}",
+            "X-Coverage-Cell-Km": str(coverage_grid.cell_km),
+            "X-Coverage-Step-Seconds": str(RASTER_STEP_SECONDS),
+            "X-Coverage-Unreachable": str(UNREACHABLE)
+        }
+    )
+
+
+@router.get("/coverage/tiles/{z}/{x}/{y}.png")
+async def get_coverage_tile(
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: Optional[str] = Header(None)
+) -> Response:
+    """Coverage as a transparent 256px XYZ map tile (green within target, amber to red beyond)"""
+    if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    # Content digest of the whole raster (applies any hourly speed change first), the same on every worker
+    etag = f'"cov-{coverage_grid.digest():08x}"'
+    cached = _not_modified(etag, if_none_match)
+    if cached is not None:
+        return cached
+    return Response(
+        content=coverage_grid.tile(z, x, y),
+        media_type="image/png",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
+@router.get("/forecast")
+async def get_forecast(
+    hours: int = Query(6, ge=1, le=168),
+    severity: Optional[str] = Query(None, pattern=f"^({'|'.join(SEVERITIES)})$"),
+    top: int = Query(50, ge=1, le=5000),
+    min_expected: float = Query(0.0, ge=0)
+) -> Dict[str, Any]:
+    """
+    Expected emergencies per map cell over the next hours, for pre-positioning
+
+    Cells are ranked by expected calls; p_any is the chance of at least one.
+    Queries read the fitted arrays; the model is refitted (off the event
+    loop) when new emergencies arrived and the last fit is older than
+    SARS_FORECAST_REFIT_SECONDS.
+    """
+    await asyncio.to_thread(demand_forecaster.ensure_fresh)
+    return demand_forecaster.forecast(hours=hours, severity=severity, top=top, min_expected=min_expected)
+
+
+@router.get("/forecast/stats")
+async def get_forecast_stats() -> Dict[str, Any]:
+    """Emergencies in the history, fit time and grid size"""
+    return demand_forecaster.metrics()
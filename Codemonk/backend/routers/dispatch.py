@@ -1,15 +1,70 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Dict, Any, Optional
 from services.sms_service import sms_service
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.list_query import list_collection, utc_now, MAX_PAGE_SIZE
+from services.idempotency import idempotency_store, IdempotencyKeyReused
+from services.hospital_registry import hospital_registry
+from services.geocoder import point_of
+from services.eta_model import eta_model, format_eta
+from services.tracing import tracer, parse_traceparent
+from services.delivery_tracker import delivery_tracker
+from services.bulk_export import bulk_exporter, ExportTarget
+from models.dispatch import DispatchCreate, DispatchResponse, DispatchUpdate, DispatchUpdateResponse, WhatsAppStatus
+from routers.ambulances import AMBULANCES
+from routers.emergencies import EMERGENCIES
+from urllib.parse import parse_qsl
+import time
 
 router = APIRouter()
 
-# In-memory storage for dispatches (replace with database in production)
-dispatches = {}
+# Collection holding dispatch records in the shared state backend
+DISPATCHES = "dispatches"
 
+# Used when neither the request nor the ETA model can give an estimate
+DEFAULT_ETA = "8 minutes"
 
-@router.post("/")
-async def dispatch_ambulance(dispatch_data: Dict[str, Any]) -> Dict[str, Any]:
+# Dispatch statuses in which the ambulance is heading to the hospital rather than the scene
+HOSPITAL_LEG_STATUSES = {"patient_onboard", "transporting"}
+
+# Columns of a CSV export when none are requested
+DISPATCH_EXPORT = ExportTarget(DISPATCHES, "dispatches", [
+    "dispatch_id", "status", "created_at", "emergency_id", "ambulance_id", "hospital_id", "hospital_name",
+    "eta", "eta_seconds", "driver_phone", "whatsapp_sent", "whatsapp_status", "whatsapp_sid", "trace_id", "version"
+])
+
+# Twilio status callbacks are matched to dispatches by message SID on every worker
+delivery_tracker.load(record for _, record in state_store.iter_records(DISPATCHES))
+event_bus.add_listener(delivery_tracker.on_event)
+
+
+async def _run_idempotent(response: Response, scope: str, key: Optional[str], body: Any, handler):
+    """Execute handler once per Idempotency-Key and flag replayed responses"""
+    try:
+        result, replayed = await idempotency_store.execute(
+            f"{scope}:{key}" if key else None,
+            idempotency_store.fingerprint(scope, body.model_dump_json()),
+            handler
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@router.post("/", response_model=DispatchResponse, response_class=ORJSONResponse)
+async def dispatch_ambulance(
+    dispatch_data: DispatchCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    traceparent: Optional[str] = Header(None)
+) -> DispatchResponse:
     """
     Dispatch an ambulance to an emergency location via WhatsApp
 
@@ -17,138 +72,312 @@ async def dispatch_ambulance(dispatch_data: Dict[str, Any]) -> Dict[str, Any]:
     - ambulance_id: ID of the ambulance to dispatch
     - emergency_id: ID of the emergency
     - patient_info: Patient information (optional)
-    - hospital_name: Name of the destination hospital
-    - hospital_address: Address of the destination hospital
+    - hospital_id: Registered hospital, e.g. from /api/hospitals/recommend (optional)
+    - hospital_name: Name of the destination hospital (taken from the registry when hospital_id is given)
+    - hospital_address: Address of the destination hospital (likewise)
     - driver_phone: Driver's phone number (E.164 format, e.g., +919876543210)
     - eta: Estimated time of arrival (optional)
+
+    Retries carrying the same Idempotency-Key header get the original
+    response back without creating a new dispatch or sending another message.
+
+    The dispatch and its WhatsApp send are traced under the emergency's
+    trace (or the traceparent header when the emergency has none).
     """
-    ambulance_id = dispatch_data.get("ambulance_id")
-    hospital_name = dispatch_data.get("hospital_name")
-    hospital_address = dispatch_data.get("hospital_address")
-    driver_phone = dispatch_data.get("driver_phone")
+    return await _run_idempotent(
+        response, "dispatch", idempotency_key, dispatch_data,
+        lambda: _create_dispatch(dispatch_data, traceparent)
+    )
 
-    # Validate required fields
-    if not all([ambulance_id, hospital_name, hospital_address, driver_phone]):
-        raise HTTPException(
-            status_code=400,
-            detail="Missing required fields: ambulance_id, hospital_name, hospital_address, driver_phone"
-        )
+
+def _current_point(ambulance_id: str):
+    ambulance = state_store.get(AMBULANCES, ambulance_id) or {}
+    location = ambulance.get("current_location") or {}
+    if location.get("latitude") is None or location.get("longitude") is None:
+        return None
+    return location["latitude"], location["longitude"]
+
+
+async def _create_dispatch(dispatch_data: DispatchCreate, traceparent: Optional[str] = None) -> DispatchResponse:
+    emergency = state_store.get(EMERGENCIES, dispatch_data.emergency_id)
+    trace_id, parent_id = (emergency or {}).get("trace_id"), None
+    if not trace_id:
+        trace_id, parent_id = parse_traceparent(traceparent) or (None, None)
+
+    with tracer.span(
+        "dispatch.create", trace_id=trace_id, parent_id=parent_id,
+        emergency_id=dispatch_data.emergency_id, ambulance_id=dispatch_data.ambulance_id
+    ) as span:
+        return await _dispatch(dispatch_data, emergency, span)
+
+
+async def _dispatch(dispatch_data: DispatchCreate, emergency: Optional[Dict[str, Any]], span) -> DispatchResponse:
+    hospital_name = dispatch_data.hospital_name
+    hospital_address = dispatch_data.hospital_address
+    hospital_point = None
+
+    # Fill the destination from the hospital registry
+    if dispatch_data.hospital_id:
+        hospital = hospital_registry.get(dispatch_data.hospital_id)
+        if not hospital:
+            raise HTTPException(status_code=404, detail="Hospital not found")
+        hospital_name = hospital_name or hospital["name"]
+        hospital_address = hospital_address or hospital.get("address") or hospital["name"]
+        hospital_point = [hospital["latitude"], hospital["longitude"]]
+
+    # Resolve the scene once so status polls only need the ambulance's position
+    scene = point_of(emergency) if emergency else None
+    scene_point = list(scene) if scene else None
+
+    eta = dispatch_data.eta
+    eta_seconds = None
+    origin = _current_point(dispatch_data.ambulance_id)
+    if origin and scene:
+        eta_seconds = round(eta_model.predict_one(origin, scene, time.time()))
+        if eta is None:
+            eta = format_eta(eta_seconds)
+    if eta is None:
+        eta = DEFAULT_ETA
 
     # Generate dispatch ID
-    dispatch_id = f"DSP-{len(dispatches) + 1:03d}"
+    dispatch_id = f"DSP-{state_store.next_id(DISPATCHES):03d}"
+    span.set("dispatch_id", dispatch_id)
 
     # Send WhatsApp notification
-    whatsapp_result = sms_service.send_hospital_assignment(
-        driver_phone=driver_phone,
-        ambulance_id=ambulance_id,
-        hospital_name=hospital_name,
-        hospital_address=hospital_address,
-        patient_info=dispatch_data.get("patient_info"),
-        eta=dispatch_data.get("eta", "8 minutes")
-    )
+    with tracer.span("whatsapp.send_hospital_assignment", dispatch_id=dispatch_id) as send_span:
+        whatsapp_result = await sms_service.send_hospital_assignment(
+            driver_phone=dispatch_data.driver_phone,
+            ambulance_id=dispatch_data.ambulance_id,
+            hospital_name=hospital_name,
+            hospital_address=hospital_address,
+            patient_info=dispatch_data.patient_info,
+            eta=eta,
+            driver_name=dispatch_data.driver_name
+        )
+        send_span.set("sent", whatsapp_result.get("success", False))
+        if whatsapp_result.get("error"):
+            send_span.set("error", whatsapp_result["error"])
 
     # Store dispatch information
-    dispatches[dispatch_id] = {
+    dispatch_record = {
         "dispatch_id": dispatch_id,
-        "ambulance_id": ambulance_id,
-        "emergency_id": dispatch_data.get("emergency_id"),
+        "ambulance_id": dispatch_data.ambulance_id,
+        "emergency_id": dispatch_data.emergency_id,
+        "hospital_id": dispatch_data.hospital_id,
         "hospital_name": hospital_name,
         "hospital_address": hospital_address,
-        "driver_phone": driver_phone,
-        "patient_info": dispatch_data.get("patient_info"),
-        "eta": dispatch_data.get("eta", "8 minutes"),
+        "driver_phone": dispatch_data.driver_phone,
+        "patient_info": dispatch_data.patient_info,
+        "eta": eta,
+        "eta_seconds": eta_seconds,
+        "scene_point": scene_point,
+        "hospital_point": hospital_point,
         "status": "dispatched",
         "whatsapp_sent": whatsapp_result.get("success", False),
         "whatsapp_sid": whatsapp_result.get("message_sid"),
-        "whatsapp_error": whatsapp_result.get("error")
+        "whatsapp_status": whatsapp_result.get("status"),
+        "whatsapp_error": whatsapp_result.get("error"),
+        "trace_id": span.trace_id,
+        "created_at": utc_now()
     }
+    dispatch_record = state_store.put(DISPATCHES, dispatch_id, dispatch_record)
+    event_bus.publish("dispatch.created", dispatch_record)
 
-    response = {
-        "success": True,
-        "message": "Ambulance dispatched successfully",
-        "dispatch_id": dispatch_id,
-        "ambulance_id": ambulance_id,
-        "emergency_id": dispatch_data.get("emergency_id"),
-        "hospital_name": hospital_name,
-        "eta": dispatch_data.get("eta", "8 minutes"),
-        "whatsapp_status": {
-            "sent": whatsapp_result.get("success", False),
-            "message_sid": whatsapp_result.get("message_sid"),
-            "error": whatsapp_result.get("error") if not whatsapp_result.get("success") else None
-        }
-    }
+    return DispatchResponse(
+        success=True,
+        message="Ambulance dispatched successfully",
+        dispatch_id=dispatch_id,
+        ambulance_id=dispatch_data.ambulance_id,
+        emergency_id=dispatch_data.emergency_id,
+        hospital_id=dispatch_data.hospital_id,
+        hospital_name=hospital_name,
+        eta=eta,
+        whatsapp_status=_whatsapp_status(whatsapp_result)
+    )
 
-    return response
+
+def _whatsapp_status(whatsapp_result: Dict[str, Any]) -> WhatsAppStatus:
+    sent = whatsapp_result.get("success", False)
+    return WhatsAppStatus(
+        sent=sent,
+        queued=whatsapp_result.get("queued", False),
+        message_sid=whatsapp_result.get("message_sid"),
+        error=whatsapp_result.get("error") if not sent else None
+    )
 
 
-@router.get("/{dispatch_id}")
+@router.get("/notifications/metrics")
+async def get_notification_metrics() -> Dict[str, Any]:
+    """WhatsApp coalescing, rate-shaping, queue-delay and delivery-callback metrics"""
+    return {**sms_service.get_metrics(), "delivery": delivery_tracker.metrics()}
+
+
+@router.post("/whatsapp/status", status_code=204)
+async def whatsapp_status_callback(
+    request: Request,
+    x_twilio_signature: Optional[str] = Header(None)
+) -> Response:
+    """
+    Twilio message status callback (set TWILIO_STATUS_CALLBACK_URL to this URL)
+
+    Verifies X-Twilio-Signature, then queues the status for a batched write
+    to the dispatch that sent the message. Returns 204 without waiting for
+    the write.
+    """
+    params = parse_qsl((await request.body()).decode(), keep_blank_values=True)
+    url = delivery_tracker.callback_url or str(request.url)
+    if not delivery_tracker.verify(url, params, x_twilio_signature):
+        raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    if not delivery_tracker.receive(dict(params)):
+        raise HTTPException(status_code=400, detail="MessageSid and MessageStatus are required")
+    return Response(status_code=204)
+
+
+@router.get("/export")
+async def export_dispatches(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    compress: Optional[str] = Query(None, pattern="^gzip$"),
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Download dispatch history as NDJSON or CSV (compress=gzip for .gz)
+
+    Records are streamed straight from storage, so a year of history is
+    exported in constant memory and bytes start arriving immediately.
+    Takes the same status/created_after/created_before filters as the list.
+    """
+    return bulk_exporter.response(DISPATCH_EXPORT, format, compress, fields, status, created_after, created_before)
+
+
+@router.get("/{dispatch_id}", response_class=ORJSONResponse)
 async def get_dispatch_status(dispatch_id: str) -> Dict[str, Any]:
-    """Get status of a dispatch"""
-    dispatch = dispatches.get(dispatch_id)
+    """
+    Get status of a dispatch
+
+    The ETA is re-estimated on every call from the ambulance's last reported
+    position to the scene (or to the hospital once the patient is on board).
+    whatsapp_delivery reports the assignment's delivery status from Twilio
+    callbacks; resend only when its needs_resend is true.
+    """
+    dispatch = state_store.get(DISPATCHES, dispatch_id)
 
     if not dispatch:
         raise HTTPException(status_code=404, detail="Dispatch not found")
 
+    status = dispatch.get("status", "en_route")
+    origin = _current_point(dispatch.get("ambulance_id"))
+    target = dispatch.get("hospital_point") if status in HOSPITAL_LEG_STATUSES else dispatch.get("scene_point")
+
+    eta = dispatch.get("eta", DEFAULT_ETA)
+    eta_seconds = dispatch.get("eta_seconds")
+    live = origin is not None and target is not None
+    if live:
+        eta_seconds = round(eta_model.predict_one(origin, tuple(target), time.time()))
+        eta = format_eta(eta_seconds)
+
     return {
         "dispatch_id": dispatch_id,
-        "status": dispatch.get("status", "en_route"),
+        "status": status,
         "ambulance_id": dispatch.get("ambulance_id"),
         "hospital_name": dispatch.get("hospital_name"),
         "hospital_address": dispatch.get("hospital_address"),
-        "eta": dispatch.get("eta", "5 minutes"),
+        "eta": eta,
+        "eta_seconds": eta_seconds,
+        "eta_live": live,
         "whatsapp_sent": dispatch.get("whatsapp_sent", False),
+        "whatsapp_delivery": delivery_tracker.delivery_state(dispatch),
         "current_location": {
-            "latitude": 28.6139,
-            "longitude": 77.2090
-        }
+            "latitude": origin[0],
+            "longitude": origin[1]
+        } if origin else None
     }
 
 
-@router.post("/{dispatch_id}/send-update")
-async def send_dispatch_update(dispatch_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+@router.post("/{dispatch_id}/send-update", response_model=DispatchUpdateResponse, response_class=ORJSONResponse)
+async def send_dispatch_update(
+    dispatch_id: str,
+    update_data: DispatchUpdate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> DispatchUpdateResponse:
     """
     Send an update message to the ambulance driver via WhatsApp
 
     Expected data:
     - update_type: Type of update (e.g., "ROUTE_CHANGE", "PRIORITY_UPDATE")
     - details: Update details message
+
+    Honors the Idempotency-Key header like POST /api/dispatch/.
     """
-    dispatch = dispatches.get(dispatch_id)
+    return await _run_idempotent(
+        response, f"send-update:{dispatch_id}", idempotency_key, update_data,
+        lambda: _send_update(dispatch_id, update_data)
+    )
+
+
+async def _send_update(dispatch_id: str, update_data: DispatchUpdate) -> DispatchUpdateResponse:
+    dispatch = state_store.get(DISPATCHES, dispatch_id)
 
     if not dispatch:
         raise HTTPException(status_code=404, detail="Dispatch not found")
 
-    update_type = update_data.get("update_type", "UPDATE")
-    details = update_data.get("details", "")
+    update_type = update_data.update_type
+    details = update_data.details
 
     if not details:
         raise HTTPException(
             status_code=400, detail="Update details are required")
 
     # Send WhatsApp update
-    whatsapp_result = sms_service.send_emergency_update(
+    whatsapp_result = await sms_service.send_emergency_update(
         driver_phone=dispatch.get("driver_phone"),
         ambulance_id=dispatch.get("ambulance_id"),
         update_type=update_type,
         details=details
     )
-
-    return {
-        "success": True,
-        "message": "Update sent to driver via WhatsApp",
+    event_bus.publish("dispatch.update_sent", {
         "dispatch_id": dispatch_id,
-        "whatsapp_status": {
-            "sent": whatsapp_result.get("success", False),
-            "message_sid": whatsapp_result.get("message_sid"),
-            "error": whatsapp_result.get("error") if not whatsapp_result.get("success") else None
-        }
-    }
+        "update_type": update_type,
+        "details": details,
+        "sent": whatsapp_result.get("success", False),
+        "queued": whatsapp_result.get("queued", False)
+    })
 
+    return DispatchUpdateResponse(
+        success=True,
+        message="Update queued for driver via WhatsApp" if whatsapp_result.get("queued") else "Update sent to driver via WhatsApp",
+        dispatch_id=dispatch_id,
+        whatsapp_status=_whatsapp_status(whatsapp_result)
+    )
 
-@router.get("/")
-async def get_all_dispatches() -> Dict[str, Any]:
-    """Get all dispatches"""
-    return {
-        "dispatches": list(dispatches.values()),
-        "total": len(dispatches)
-    }
+
+@router.get("/", response_class=ORJSONResponse)
+async def get_all_dispatches(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0)
+) -> Response:
+    """
+    Get dispatches, one page at a time
+
+    - limit / cursor: page size and the next_cursor of the previous page
+    - fields: comma-separated fields to return (e.g. "dispatch_id,status")
+    - status, created_after, created_before: filters
+    - since: only dispatches changed after this version (delta sync); ones that
+      no longer match the filters are listed in deleted
+    - Send the returned ETag as If-None-Match to get 304 when nothing changed
+    """
+    return list_collection(
+        request, DISPATCHES, "dispatches",
+        limit=limit, cursor=cursor, fields=fields, status=status,
+        created_after=created_after, created_before=created_before, since=since,
+        key_field="dispatch_id"
+    )
@@ -1,55 +1,278 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Dict, Any, Optional
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.list_query import list_collection, utc_now, MAX_PAGE_SIZE
+from services.incident_index import incident_index
+from services.transcript_index import CALLS
+from services.tracing import tracer, parse_traceparent
+from services.bulk_import import ImportTarget, import_request, emergency_defaults
+from services.bulk_export import bulk_exporter, ExportTarget
+from models.emergency import EmergencyCreate, EmergencyImport, EmergencyUpdate
 
 router = APIRouter()
 
-# Mock emergencies data
-mock_emergencies = []
+# Collection holding emergency records in the shared state backend
+EMERGENCIES = "emergencies"
 
-@router.get("/")
-async def get_all_emergencies() -> List[Dict[str, Any]]:
-    """Get all active emergencies"""
-    return mock_emergencies
+# Most caller reports kept on one incident record
+MAX_LINKED_REPORTS = 50
+
+# What each linked report keeps from the caller's submission
+LINKED_REPORT_FIELDS = (
+    "caller_name", "caller_phone", "location", "description", "severity", "priority", "patient_name",
+    "patient_age", "symptoms", "special_requirements", "call_id", "trace_id"
+)
+
+# Merges retried when another write changed the incident in between
+ATTACH_ATTEMPTS = 5
+
+# Higher is more severe; a linked report can only raise the incident's severity
+SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+# Bulk imports: rows without an id get the next EMG number
+EMERGENCY_IMPORT = ImportTarget(
+    EMERGENCIES, EmergencyImport, "emergency.imported",
+    new_id=lambda number: f"EMG-{number:03d}", prepare=emergency_defaults
+)
+
+# Columns of a CSV export when none are requested; a location object becomes a JSON cell
+EMERGENCY_EXPORT = ExportTarget(EMERGENCIES, "emergencies", [
+    "id", "status", "created_at", "updated_at", "emergency_type", "severity", "priority", "patient_name",
+    "patient_age", "symptoms", "latitude", "longitude", "location", "report_count", "call_id", "trace_id", "version"
+])
+
+event_bus.add_listener(incident_index.on_event)
+
+@router.get("/", response_class=ORJSONResponse)
+async def get_all_emergencies(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0)
+) -> Response:
+    """
+    Get active emergencies, one page at a time
+
+    Supports the same pagination, projection, filter, delta (since=<version>)
+    and ETag parameters as GET /api/dispatch/.
+    """
+    return list_collection(
+        request, EMERGENCIES, "emergencies",
+        limit=limit, cursor=cursor, fields=fields, status=status,
+        created_after=created_after, created_before=created_before, since=since
+    )
 
 @router.post("/")
-async def create_emergency(emergency_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Create a new emergency"""
-    new_emergency = {
-        "id": f"EMG-{len(mock_emergencies) + 1:03d}",
-        **emergency_data,
-        "status": "new"
-    }
-    mock_emergencies.append(new_emergency)
-    
+async def create_emergency(
+    emergency_data: EmergencyCreate,
+    dedupe: bool = True,
+    traceparent: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """
+    Create a new emergency
+
+    A report that matches an open incident (same area, time window and
+    emergency category, similar description) is attached to that incident
+    instead of creating a duplicate; the response then has
+    deduplicated=true and the existing emergency. Pass dedupe=false to
+    always create a new record.
+
+    The emergency joins the trace of the call it came from: pass trace_id
+    or call_id from the transcription response, or a traceparent header.
+    """
+    data = emergency_data.model_dump(exclude_unset=True)
+    trace_id, parent_id = _call_trace(data, traceparent)
+
+    with tracer.span("emergency.create", trace_id=trace_id, parent_id=parent_id) as span:
+        created_at = utc_now()
+        report = incident_index.describe(data) if dedupe else None
+
+        if report is not None:
+            incident_id = incident_index.match(report)
+            incident = _attach_report(incident_id, {**data, "trace_id": span.trace_id}, created_at) if incident_id else None
+            if incident is not None:
+                incident_index.attach(incident_id, report)
+                span.set("emergency_id", incident_id)
+                span.set("deduplicated", True)
+                return {
+                    "success": True,
+                    "message": f"Report attached to existing emergency {incident_id}",
+                    "deduplicated": True,
+                    "emergency": incident
+                }
+
+        new_emergency = {
+            "id": f"EMG-{state_store.next_id(EMERGENCIES):03d}",
+            **data,
+            "trace_id": span.trace_id,
+            "status": "new",
+            "created_at": created_at
+        }
+        new_emergency = state_store.put(EMERGENCIES, new_emergency["id"], new_emergency)
+        if report is not None:
+            incident_index.add(new_emergency["id"], report)
+        event_bus.publish("emergency.created", new_emergency)
+        span.set("emergency_id", new_emergency["id"])
+
     return {
         "success": True,
         "message": "Emergency created successfully",
         "emergency": new_emergency
     }
 
+def _call_trace(data: Dict[str, Any], traceparent: Optional[str]):
+    """(trace id, remote parent span id) the new emergency should join, if any"""
+    if data.get("trace_id"):
+        return data["trace_id"], None
+    if data.get("call_id"):
+        call = state_store.get(CALLS, data["call_id"])
+        if call and call.get("trace_id"):
+            return call["trace_id"], None
+    return parse_traceparent(traceparent) or (None, None)
+
+def _attach_report(incident_id: str, data: Dict[str, Any], created_at: str) -> Optional[Dict[str, Any]]:
+    """
+    Record another caller's report on an existing emergency
+
+    The incident is escalated to the most severe report (severity and
+    priority) and gains the report's special requirements. Written with
+    compare-and-set so a concurrent update or report is never lost.
+    """
+    report = {
+        **{k: v for k, v in data.items() if k in LINKED_REPORT_FIELDS},
+        "received_at": created_at
+    }
+    for _ in range(ATTACH_ATTEMPTS):
+        incident = state_store.get(EMERGENCIES, incident_id)
+        if not incident or incident.get("status") in ("resolved", "closed"):
+            incident_index.remove(incident_id)
+            return None
+        reports = list(incident.get("linked_reports") or [])
+        reports.append(report)
+        merged = {
+            **incident,
+            **_escalate(incident, data),
+            "linked_reports": reports[-MAX_LINKED_REPORTS:],
+            "report_count": incident.get("report_count", 1) + 1,
+            "updated_at": created_at
+        }
+        written, _ = state_store.put_many(EMERGENCIES, [(incident_id, merged, incident.get("version"))])
+        if written:
+            event_bus.publish("emergency.updated", written[0])
+            return written[0]
+    return None
+
+def _escalate(incident: Dict[str, Any], report: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of the incident that a new report raises: severity, priority, special requirements"""
+    changes: Dict[str, Any] = {}
+    severities = [s for s in (incident.get("severity"), report.get("severity")) if str(s).lower() in SEVERITY_RANK]
+    if severities:
+        changes["severity"] = max(severities, key=lambda s: SEVERITY_RANK[str(s).lower()])
+    priorities = [_priority(p) for p in (incident.get("priority"), report.get("priority"))]
+    priorities = [p for p in priorities if p is not None]
+    if priorities:
+        # 1 is the most urgent
+        changes["priority"] = min(priorities)
+    requirements = list(incident.get("special_requirements") or [])
+    requirements += [r for r in report.get("special_requirements") or [] if r not in requirements]
+    if requirements:
+        changes["special_requirements"] = requirements
+    return changes
+
+def _priority(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@router.post("/import")
+async def import_emergencies(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    on_conflict: str = Query("skip", pattern="^(skip|replace)$"),
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Bulk-load emergencies (drill scenarios, historical data) from NDJSON or CSV
+
+    The body is streamed and stored in batches; one row per line (NDJSON)
+    or per CSV record with a header row. Rows keep their id and created_at
+    when given. Rows that fail validation, or whose id exists with
+    on_conflict=skip, are listed in errors by row number and skipped.
+    Imported rows are not deduplicated against open incidents.
+    """
+    return await import_request(request, EMERGENCY_IMPORT, format, on_conflict, dry_run)
+
+
+@router.get("/export")
+async def export_emergencies(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    compress: Optional[str] = Query(None, pattern="^gzip$"),
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Download emergency history as NDJSON or CSV (compress=gzip for .gz)
+
+    Streamed from storage in constant memory; filters as on the list. The
+    output can be loaded back through POST /api/emergencies/import.
+    """
+    return bulk_exporter.response(EMERGENCY_EXPORT, format, compress, fields, status, created_after, created_before)
+
+
+@router.get("/incidents/stats")
+async def get_incident_stats() -> Dict[str, Any]:
+    """Open incidents in the deduplication index and match counters"""
+    return incident_index.snapshot()
+
 @router.get("/{emergency_id}")
 async def get_emergency(emergency_id: str) -> Dict[str, Any]:
     """Get specific emergency details"""
-    emergency = next((emg for emg in mock_emergencies if emg["id"] == emergency_id), None)
+    emergency = state_store.get(EMERGENCIES, emergency_id)
     if not emergency:
         raise HTTPException(status_code=404, detail="Emergency not found")
     return emergency
 
 @router.put("/{emergency_id}")
-async def update_emergency(emergency_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+async def update_emergency(emergency_id: str, update_data: EmergencyUpdate) -> Dict[str, Any]:
     """Update emergency information"""
+    emergency = state_store.get(EMERGENCIES, emergency_id)
+    if not emergency:
+        raise HTTPException(status_code=404, detail="Emergency not found")
+
+    # id, version and creation time are managed by the backend
+    changes = {
+        k: v for k, v in update_data.model_dump(exclude_unset=True).items()
+        if k not in ("id", "version", "created_at")
+    }
+    emergency = state_store.put(EMERGENCIES, emergency_id, {
+        **emergency,
+        **changes,
+        "updated_at": utc_now()
+    })
+    event_bus.publish("emergency.updated", emergency)
+
     return {
         "success": True,
         "message": f"Emergency {emergency_id} updated",
-        "emergency_id": emergency_id
+        "emergency_id": emergency_id,
+        "emergency": emergency
     }
 
 @router.delete("/{emergency_id}")
 async def delete_emergency(emergency_id: str) -> Dict[str, Any]:
     """Delete/close an emergency"""
-    global mock_emergencies
-    mock_emergencies = [emg for emg in mock_emergencies if emg["id"] != emergency_id]
-    
+    if state_store.delete(EMERGENCIES, emergency_id):
+        event_bus.publish("emergency.closed", {"id": emergency_id})
+
     return {
         "success": True,
         "message": f"Emergency {emergency_id} closed"
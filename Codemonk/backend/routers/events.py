@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from services.event_bus import event_bus
+import asyncio
+import json
+
+router = APIRouter()
+
+
+@router.get("/stream")
+async def stream_events(request: Request):
+    """
+    Server-sent event stream of state changes from every worker
+
+    Each message carries the event topic (e.g. "dispatch.created") as the
+    SSE event name and the changed record as JSON data.
+    """
+    queue = event_bus.subscribe()
+
+    async def event_source():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['topic']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            event_bus.unsubscribe(queue)
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
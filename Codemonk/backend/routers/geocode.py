@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Query
+from services.geocoder import geocoder, AUTOFILL_MIN_SCORE
+from services.geo import parse_point
+from typing import Dict, Any, Optional
+import time
+
+router = APIRouter()
+
+
+@router.get("")
+async def geocode_location(
+    q: str = Query(..., min_length=1, description="Landmark or address, e.g. 'near India Gate'"),
+    limit: int = Query(5, ge=1, le=20),
+    near: Optional[str] = Query(None, description="Bias toward this point, as 'lat,lon'")
+) -> Dict[str, Any]:
+    """
+    Resolve a landmark or address to coordinates using the offline gazetteer
+
+    Returns ranked candidates with their scores. match is the best one
+    only when it is confident enough to use as-is (an exact name hit or a
+    score of at least SARS_GEOCODE_AUTOFILL_SCORE), otherwise null and a
+    person should pick from the candidates.
+    """
+    bias = parse_point(near)
+    if near and bias is None:
+        raise HTTPException(status_code=400, detail="near must be 'lat,lon'")
+
+    started = time.perf_counter()
+    matches = geocoder.geocode(q, limit=limit, near=bias)
+    return {
+        "query": q,
+        "match": matches[0] if matches and matches[0]["score"] >= AUTOFILL_MIN_SCORE else None,
+        "candidates": matches,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+@router.get("/suggest")
+async def suggest_locations(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=10)
+) -> Dict[str, Any]:
+    """Autocomplete gazetteer names and aliases by prefix"""
+    return {"prefix": prefix, "suggestions": geocoder.suggest(prefix, limit=limit)}
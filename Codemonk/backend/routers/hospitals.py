@@ -0,0 +1,95 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from typing import Dict, Any, Optional
+from services.hospital_registry import hospital_registry
+from services.geocoder import point_of
+from services.state_store import state_store
+from models.hospital import HospitalCapacityUpdate
+from routers.emergencies import EMERGENCIES
+import time
+
+router = APIRouter()
+
+
+@router.get("/", response_class=ORJSONResponse)
+async def get_all_hospitals(specialty: Optional[str] = None) -> ORJSONResponse:
+    """Get registered hospitals with live capacity, optionally filtered by specialty"""
+    return ORJSONResponse(content=hospital_registry.list(specialty))
+
+
+@router.get("/recommend", response_class=ORJSONResponse)
+async def recommend_hospitals(
+    emergency_id: Optional[str] = None,
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    requirements: Optional[str] = Query(None, description="Comma-separated special requirements"),
+    emergency_type: Optional[str] = None,
+    limit: int = Query(3, ge=1, le=20),
+    radius_km: float = Query(25.0, gt=0, le=100)
+) -> Dict[str, Any]:
+    """
+    Rank destination hospitals for an emergency
+
+    Pass an emergency_id to use its stored location, special_requirements
+    and emergency_type, or give latitude/longitude and requirements directly.
+    Explicit query parameters override the emergency's values.
+    """
+    started = time.perf_counter()
+    emergency: Dict[str, Any] = {}
+    if emergency_id:
+        emergency = state_store.get(EMERGENCIES, emergency_id)
+        if not emergency:
+            raise HTTPException(status_code=404, detail="Emergency not found")
+
+    if latitude is not None and longitude is not None:
+        point = (latitude, longitude)
+    else:
+        point = point_of(emergency)
+    if point is None:
+        raise HTTPException(status_code=400, detail="Emergency location could not be resolved; pass latitude and longitude")
+
+    if requirements is not None:
+        needed = [part.strip() for part in requirements.split(",") if part.strip()]
+    else:
+        needed = emergency.get("special_requirements") or []
+        if isinstance(needed, str):
+            needed = [needed]
+
+    result = hospital_registry.recommend(
+        point[0], point[1],
+        requirements=needed,
+        emergency_type=emergency_type or emergency.get("emergency_type") or "",
+        limit=limit,
+        radius_km=radius_km
+    )
+    return {
+        "emergency_id": emergency_id,
+        "origin": {"latitude": point[0], "longitude": point[1]},
+        **result,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+@router.get("/{hospital_id}")
+async def get_hospital(hospital_id: str) -> Dict[str, Any]:
+    """Get specific hospital details"""
+    hospital = hospital_registry.get(hospital_id)
+    if not hospital:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    return hospital
+
+
+@router.patch("/{hospital_id}/capacity")
+async def update_hospital_capacity(hospital_id: str, capacity: HospitalCapacityUpdate) -> Dict[str, Any]:
+    """Report current bed/ICU counts or diversion status for a hospital"""
+    changes = capacity.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No capacity fields given")
+    hospital = hospital_registry.update_capacity(hospital_id, changes)
+    if not hospital:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    return {
+        "success": True,
+        "message": f"Hospital {hospital_id} capacity updated",
+        "hospital": hospital
+    }
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Query
+from services.state_store import state_store, JournaledBackend
+from typing import Dict, Any
+import asyncio
+
+router = APIRouter()
+
+
+def _journaled() -> JournaledBackend:
+    if not isinstance(state_store, JournaledBackend):
+        raise HTTPException(status_code=503, detail="Journal is disabled (set SARS_JOURNAL_DIR)")
+    return state_store
+
+
+@router.get("")
+async def read_journal(
+    after: int = Query(0, ge=0, description="Return entries with a greater offset"),
+    limit: int = Query(500, ge=1, le=5000)
+) -> Dict[str, Any]:
+    """
+    Ordered change feed of every write to the state store
+
+    Consumers resume from the last offset they processed by passing it as
+    `after`. If it is older than oldest_offset, those entries were compacted
+    into a snapshot and the consumer has to resync from the collections.
+    """
+    store = _journaled()
+    journal = store.journal
+    events = await asyncio.to_thread(journal.read, after, limit)
+    return {
+        "events": events,
+        "next_offset": events[-1]["offset"] if events else after,
+        "oldest_offset": journal.oldest_offset(),
+        "last_offset": journal.last_offset
+    }
+
+
+@router.get("/stats")
+async def journal_stats() -> Dict[str, Any]:
+    """Journal size, snapshot position and the last recovery"""
+    store = _journaled()
+    return {"backend": store.name, "recovery": store.recovery, **store.journal.snapshot_stats()}
+
+
+@router.post("/snapshot")
+async def take_snapshot() -> Dict[str, Any]:
+    """Snapshot the in-memory state now and prune covered segments"""
+    store = _journaled()
+    offset = await asyncio.to_thread(store.snapshot)
+    if offset is None:
+        raise HTTPException(status_code=400, detail=f"Snapshots only apply to the memory backend, not {store.backend.name}")
+    return {"snapshot_offset": offset, **store.journal.snapshot_stats()}
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from services.map_proxy import map_proxy, UpstreamError
+from typing import Dict, Any, List, Tuple
+
+router = APIRouter()
+
+# TomTom accepts up to 150; dashboards send 2-3
+MAX_WAYPOINTS = 25
+
+
+def _parse_waypoints(waypoints: str) -> List[Tuple[float, float]]:
+    points = []
+    for part in waypoints.split(":"):
+        try:
+            lat, lon = (float(value) for value in part.split(","))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="waypoints must be 'lat,lon:lat,lon[:...]'")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise HTTPException(status_code=400, detail=f"Waypoint out of range: {part}")
+        points.append((lat, lon))
+    if not 2 <= len(points) <= MAX_WAYPOINTS:
+        raise HTTPException(status_code=400, detail=f"Between 2 and {MAX_WAYPOINTS} waypoints are required")
+    return points
+
+
+def _cached(result: Tuple[Dict[str, Any], str, float]) -> ORJSONResponse:
+    body, status, fresh_for = result
+    return ORJSONResponse(content=body, headers={
+        "X-Cache": status,
+        # Browsers may keep the answer for as long as the shared cache considers it fresh
+        "Cache-Control": f"public, max-age={int(fresh_for)}"
+    })
+
+
+@router.get("/route", response_class=ORJSONResponse)
+async def get_route(
+    waypoints: str = Query(..., description="'lat,lon:lat,lon[:...]' in travel order"),
+    route_type: str = Query("fastest", pattern="^(fastest|shortest|eco|thrilling)$"),
+    travel_mode: str = Query("car", pattern="^(car|truck|van|motorcycle)$")
+) -> ORJSONResponse:
+    """
+    Traffic-aware route through the waypoints, in TomTom calculateRoute format
+
+    Served from the shared cache; waypoints are snapped to a grid of
+    MAP_ROUTE_QUANTUM_DEG. X-Cache tells whether the answer was fresh (HIT),
+    served while refreshing (STALE) or fetched now (MISS).
+    """
+    try:
+        return _cached(await map_proxy.route(_parse_waypoints(waypoints), route_type, travel_mode))
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.get("/traffic/flow", response_class=ORJSONResponse)
+async def get_traffic_flow(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(10, ge=0, le=22)
+) -> ORJSONResponse:
+    """Current and free-flow speed of the road nearest a point, in TomTom flowSegmentData format"""
+    try:
+        return _cached(await map_proxy.traffic_flow(latitude, longitude, zoom))
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.get("/stats")
+async def get_map_cache_stats() -> Dict[str, Any]:
+    """Cache entries, hit ratio and upstream calls saved by coalescing"""
+    return map_proxy.metrics()
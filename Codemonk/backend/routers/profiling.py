@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from services.profiler import PROFILING_ENABLED, profiler, watchdog, folded
+from typing import Dict, Any
+import time
+
+router = APIRouter()
+
+
+def _require_enabled() -> None:
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=503, detail="Profiling is disabled (set SARS_PROFILING=1)")
+
+
+def _download(text: str, name: str) -> PlainTextResponse:
+    return PlainTextResponse(text, headers={"Content-Disposition": f'attachment; filename="{name}.folded"'})
+
+
+@router.get("")
+async def profiling_status() -> Dict[str, Any]:
+    """State of the on-demand profiler and the slow-request/loop-block watchdog"""
+    _require_enabled()
+    return {"profiler": profiler.status(), "watchdog": watchdog.status()}
+
+
+@router.post("/start")
+async def start_profiler(
+    seconds: float = Query(30, gt=0, le=600),
+    interval_ms: float = Query(5, ge=1, le=100)
+) -> Dict[str, Any]:
+    """Sample every thread for the given number of seconds"""
+    _require_enabled()
+    if not profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return profiler.status()
+
+
+@router.get("/profile")
+async def download_profile() -> PlainTextResponse:
+    """Collapsed stacks of the last (or running) profile, for flamegraph.pl or speedscope"""
+    _require_enabled()
+    return _download(folded(profiler.counts), f"profile-{int(profiler.started_at or time.time())}")
+
+
+@router.get("/slow-requests")
+async def list_slow_requests() -> Dict[str, Any]:
+    """Recent requests slower than SARS_SLOW_REQUEST_MS, newest first"""
+    _require_enabled()
+    return {
+        "threshold_ms": watchdog.slow * 1000,
+        "requests": [
+            {key: value for key, value in capture.items() if key != "folded"}
+            for capture in reversed(watchdog.captures)
+        ]
+    }
+
+
+@router.get("/slow-requests/{capture_id}")
+async def download_slow_request(capture_id: int) -> PlainTextResponse:
+    """Collapsed stacks sampled while one slow request was running"""
+    _require_enabled()
+    for capture in watchdog.captures:
+        if capture["id"] == capture_id:
+            return _download(capture["folded"], f"request-{capture_id}")
+    raise HTTPException(status_code=404, detail="Capture not found (it may have been evicted)")
+
+
+@router.get("/loop-blocks")
+async def list_loop_blocks() -> Dict[str, Any]:
+    """Recent event-loop stalls longer than SARS_LOOP_BLOCK_MS and the call that caused them"""
+    _require_enabled()
+    return {
+        "threshold_ms": watchdog.block * 1000,
+        "blocks": [
+            {key: value for key, value in block.items() if key != "folded"}
+            for block in reversed(watchdog.blocks)
+        ]
+    }
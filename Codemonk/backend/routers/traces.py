@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Query
+from services.tracing import span_store, summarize, aggregate
+from services.event_bus import event_bus
+from typing import Dict, Any
+
+router = APIRouter()
+
+# Spans finished on any worker reach every worker's store
+event_bus.add_listener(span_store.on_event)
+
+
+@router.get("")
+async def list_traces(limit: int = Query(50, ge=1, le=1000)) -> Dict[str, Any]:
+    """Most recent traces, newest first, without their individual spans"""
+    traces = []
+    for trace_id, spans in span_store.recent(limit):
+        summary = summarize(trace_id, spans)
+        summary.pop("spans")
+        traces.append(summary)
+    return {"traces": traces, "count": len(traces)}
+
+
+@router.get("/stats")
+async def trace_stats() -> Dict[str, Any]:
+    """
+    Per-stage latency percentiles and the call-to-dispatch KPI
+
+    call_to_dispatch covers traces that went all the way from transcription
+    to the WhatsApp hospital assignment.
+    """
+    return aggregate(span_store.all())
+
+
+@router.get("/{trace_id}")
+async def get_trace(trace_id: str) -> Dict[str, Any]:
+    """Timeline of one incident: every span with its offset from the first"""
+    spans = span_store.get(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return summarize(trace_id, spans)
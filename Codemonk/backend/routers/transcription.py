@@ -1,14 +1,68 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from services.transcription_service import TranscriptionService
-from typing import Dict, Any
+from services.admission import admission_controller, lane_for, AdmissionRejected
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.list_query import utc_now, parse_timestamp
+from services.transcript_index import transcript_index, CALLS, snippet
+from services.tracing import tracer, Span
+from services.bulk_export import bulk_exporter, ExportTarget
+from models.extraction import ExtractionResult, ExtractTextRequest
+from datetime import datetime
+from typing import Dict, Any, Optional
+import math
+import time
 
 router = APIRouter()
 transcription_service = TranscriptionService()
 
+# Columns of a CSV export when none are requested
+CALL_EXPORT = ExportTarget(CALLS, "calls", [
+    "id", "created_at", "source", "filename", "trace_id", "extracted_data.emergency_type",
+    "extracted_data.severity", "extracted_data.patient_name", "extracted_data.location", "transcription"
+])
+
+# Calls already in the state backend (e.g. restored from the journal) are searchable from the start
+transcript_index.load(record for _, record in state_store.iter_records(CALLS))
+event_bus.add_listener(transcript_index.on_event)
+
+
+def _record_call(
+    transcription: str,
+    extracted_data: Dict[str, Any],
+    source: str,
+    filename: Optional[str] = None,
+    trace_id: Optional[str] = None
+) -> str:
+    """Store a processed call for search; indexing happens on every worker via the event bus"""
+    call_id = f"CALL-{state_store.next_id(CALLS):06d}"
+    record = state_store.put(CALLS, call_id, {
+        "id": call_id,
+        "source": source,
+        "filename": filename,
+        "trace_id": trace_id,
+        "transcription": transcription,
+        "extracted_data": extracted_data,
+        "created_at": utc_now()
+    })
+    event_bus.publish("call.recorded", record)
+    return call_id
+
+
+def _shed(e: AdmissionRejected) -> HTTPException:
+    """Turn an admission rejection into 429 with a Retry-After hint"""
+    return HTTPException(
+        status_code=429,
+        detail=f"Transcription capacity exhausted ({e.lane} lane {e.reason}), retry later",
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
 @router.post("/upload")
 async def transcribe_audio(
-    audio: UploadFile = File(..., description="Emergency call audio file (MP3, WAV, etc.)")
+    audio: UploadFile = File(..., description="Emergency call audio file (MP3, WAV, etc.)"),
+    priority: Optional[str] = Form(None, description="Caller priority hint: 1-4, critical/high/medium/low, or batch"),
+    x_call_priority: Optional[str] = Header(None)
 ) -> Dict[str, Any]:
     """
     Upload and transcribe emergency call audio file
@@ -17,8 +71,20 @@ async def transcribe_audio(
     - Transcribes audio to text using OpenAI Whisper
     - Extracts patient information using GPT
     - Returns structured emergency data
+    - Live calls are admitted by priority (priority form field or
+      X-Call-Priority header); returns 429 with Retry-After when shedding load
+
+    The response carries a trace id (and a traceparent header); pass it as
+    trace_id or call_id when creating the emergency so dispatch joins the
+    same trace.
     """
-    
+    with tracer.span("transcription.upload", filename=audio.filename) as span:
+        response = await _transcribe_upload(audio, priority or x_call_priority, span)
+        response.headers["traceparent"] = span.traceparent
+        return response
+
+
+async def _transcribe_upload(audio: UploadFile, priority: Optional[str], span: Span) -> JSONResponse:
     # Validate file type
     allowed_types = ["audio/mpeg", "audio/mp3", "audio/wav", "audio/x-wav", "audio/m4a", "audio/x-m4a"]
     allowed_extensions = [".mp3", ".wav", ".m4a", ".ogg", ".flac"]
@@ -33,6 +99,7 @@ async def transcribe_audio(
     # Check file size (max 25MB)
     file_bytes = await audio.read()
     file_size_mb = len(file_bytes) / (1024 * 1024)
+    span.set("bytes", len(file_bytes))
     
     if file_size_mb > 25:
         raise HTTPException(
@@ -41,8 +108,11 @@ async def transcribe_audio(
         )
     
     try:
-        # Process audio file
-        result = await transcription_service.process_audio_file(file_bytes, audio.filename)
+        # Process audio file once a slot in the caller's lane is free
+        queued_at = time.perf_counter()
+        async with admission_controller.slot(lane_for(priority)):
+            span.set("admission_wait_ms", round((time.perf_counter() - queued_at) * 1000, 3))
+            result = await transcription_service.process_audio_file(file_bytes, audio.filename)
         
         if not result.get("success"):
             raise HTTPException(
@@ -50,14 +120,20 @@ async def transcribe_audio(
                 detail=f"Transcription failed: {result.get('error', 'Unknown error')}"
             )
         
+        extracted_data = ExtractionResult.model_validate(result.get("extracted_data", {})).model_dump()
+        call_id = _record_call(result.get("transcription", ""), extracted_data, "upload", audio.filename, span.trace_id)
+        span.set("call_id", call_id)
+
         return JSONResponse(
             status_code=200,
             content={
                 "success": True,
                 "message": "Audio transcribed successfully",
                 "data": {
+                    "call_id": call_id,
+                    "trace_id": span.trace_id,
                     "transcription": result.get("transcription", ""),
-                    "extracted_data": result.get("extracted_data", {}),
+                    "extracted_data": extracted_data,
                     "audio_duration": result.get("audio_duration", 0),
                     "filename": audio.filename
                 }
@@ -66,6 +142,8 @@ async def transcribe_audio(
         
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _shed(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -73,7 +151,10 @@ async def transcribe_audio(
         )
 
 @router.post("/extract")
-async def extract_from_text(request: Dict[str, str]) -> Dict[str, Any]:
+async def extract_from_text(
+    request: ExtractTextRequest,
+    x_call_priority: Optional[str] = Header(None)
+) -> Dict[str, Any]:
     """
     Extract patient information from already transcribed text
     
@@ -81,9 +162,11 @@ async def extract_from_text(request: Dict[str, str]) -> Dict[str, Any]:
     {
         "text": "transcribed emergency call text"
     }
+
+    Re-extractions run in the batch lane unless X-Call-Priority says otherwise.
     """
     
-    text = request.get("text", "").strip()
+    text = request.text.strip()
     
     if not text:
         raise HTTPException(
@@ -92,19 +175,117 @@ async def extract_from_text(request: Dict[str, str]) -> Dict[str, Any]:
         )
     
     try:
-        extracted_data = await transcription_service.extract_patient_info(text)
-        
+        with tracer.span("transcription.extract_text", characters=len(text)) as span:
+            async with admission_controller.slot(lane_for(x_call_priority, default="batch")):
+                extracted_data = await transcription_service.extract_patient_info(text)
+
+            extracted_data = ExtractionResult.model_validate(extracted_data).model_dump()
+            call_id = _record_call(text, extracted_data, "extract", trace_id=span.trace_id)
+            span.set("call_id", call_id)
+
         return JSONResponse(
             status_code=200,
             content={
                 "success": True,
                 "message": "Information extracted successfully",
+                "call_id": call_id,
+                "trace_id": span.trace_id,
                 "data": extracted_data
-            }
+            },
+            headers={"traceparent": span.traceparent}
         )
         
+    except AdmissionRejected as e:
+        raise _shed(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Extraction failed: {str(e)}"
         )
+
+
+@router.get("/admission")
+async def get_admission_metrics() -> Dict[str, Any]:
+    """Per-lane admission counters and queue/service latency percentiles"""
+    return admission_controller.metrics()
+
+
+@router.get("/search")
+async def search_calls(
+    q: str = Query("", description="Words from the transcript or extraction; the last word matches as a prefix"),
+    severity: Optional[str] = None,
+    emergency_type: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    match: str = Query("all", pattern="^(all|any)$"),
+    limit: int = Query(20, ge=1, le=200)
+) -> Dict[str, Any]:
+    """
+    Search past calls by transcript and extracted details
+
+    e.g. ?q=chest pain mg road&created_after=2024-05-01T00:00:00Z. Hits are
+    ranked by BM25; with no q, filtered calls come back newest first.
+    """
+    started = time.perf_counter()
+    after = parse_timestamp(created_after, "created_after")
+    before = parse_timestamp(created_before, "created_before")
+    result = transcript_index.search(
+        q,
+        severity=severity,
+        emergency_type=emergency_type,
+        after=datetime.fromisoformat(after).timestamp() if after else None,
+        before=datetime.fromisoformat(before).timestamp() if before else None,
+        match_all=match == "all",
+        limit=limit
+    )
+
+    hits = []
+    for call_id, score in result["hits"]:
+        call = state_store.get(CALLS, call_id)
+        if not call:
+            continue
+        extracted = call.get("extracted_data") or {}
+        hits.append({
+            "call_id": call_id,
+            "score": score,
+            "created_at": call.get("created_at"),
+            "severity": extracted.get("severity"),
+            "emergency_type": extracted.get("emergency_type"),
+            "patient_name": extracted.get("patient_name"),
+            "location": extracted.get("location"),
+            "snippet": snippet(call.get("transcription") or "", result["terms"])
+        })
+    return {
+        "query": q,
+        "total": result["total"],
+        "hits": hits,
+        "terms": result["terms"],
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+@router.get("/search/stats")
+async def search_index_stats() -> Dict[str, Any]:
+    """Indexed calls, vocabulary size and postings memory"""
+    return transcript_index.stats()
+
+
+@router.get("/calls/export")
+async def export_calls(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    compress: Optional[str] = Query(None, pattern="^gzip$"),
+    fields: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None
+) -> StreamingResponse:
+    """Download stored transcripts and extractions as NDJSON or CSV (compress=gzip for .gz), streamed"""
+    return bulk_exporter.response(CALL_EXPORT, format, compress, fields, None, created_after, created_before)
+
+
+@router.get("/calls/{call_id}")
+async def get_call(call_id: str) -> Dict[str, Any]:
+    """Stored transcript and extraction of one call"""
+    call = state_store.get(CALLS, call_id)
+    if not call:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return call
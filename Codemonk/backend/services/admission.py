@@ -0,0 +1,236 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+# Lanes in priority order: a freed slot always goes to the highest non-empty lane
+LANES = ("critical", "live", "batch")
+
+PRIORITY_LANES = {
+    "1": "critical",
+    "critical": "critical",
+    "2": "live",
+    "high": "live",
+    "3": "live",
+    "medium": "live",
+    "live": "live",
+    "4": "batch",
+    "low": "batch",
+    "batch": "batch",
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, lane: str, reason: str, retry_after: float):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def lane_for(priority: Optional[str] = None, default: str = "live") -> str:
+    """
+    Map caller metadata to a lane
+
+    Args:
+        priority: Priority hint from the caller (1-4, critical/high/medium/low, or a lane name)
+        default: Lane used when no usable hint is given
+    """
+    if priority is None:
+        return default
+    return PRIORITY_LANES.get(str(priority).strip().lower(), default)
+
+
+class _LaneStats:
+    def __init__(self, sample_size: int):
+        self.admitted = 0
+        self.completed = 0
+        self.rejected_queue_full = 0
+        self.shed_deadline = 0
+        self.timed_out = 0
+        self.wait_samples: deque = deque(maxlen=sample_size)
+        self.service_samples: deque = deque(maxlen=sample_size)
+
+
+def _percentiles(samples: deque) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        f"p{p}_ms": round(ordered[min(last, int(last * p / 100))] * 1000, 2)
+        for p in (50, 95, 99)
+    }
+
+
+class AdmissionController:
+    """
+    Priority-aware admission control in front of TranscriptionService.
+
+    At most `capacity` requests run at once, and `reserved_critical` of those
+    slots are only usable by the critical lane, so a surge of live or batch
+    work can never occupy every slot. Requests that cannot start immediately
+    wait in a bounded per-lane queue. A request is shed with a Retry-After
+    hint when its lane queue is full, when the estimated wait already
+    exceeds the lane's max wait, or when it actually waits that long.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 4,
+        reserved_critical: int = 1,
+        queue_limits: Optional[Dict[str, int]] = None,
+        max_wait: Optional[Dict[str, float]] = None,
+        sample_size: int = 1024
+    ):
+        self.capacity = max(1, capacity)
+        self.reserved_critical = min(max(0, reserved_critical), self.capacity - 1)
+        self.queue_limits = {"critical": 100, "live": 50, "batch": 20, **(queue_limits or {})}
+        self.max_wait = {"critical": 60.0, "live": 30.0, "batch": 10.0, **(max_wait or {})}
+        self._in_use = 0
+        self._queues: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self._stats = {lane: _LaneStats(sample_size) for lane in LANES}
+        # Smoothed service time used to estimate queueing delay
+        self._service_estimate = 5.0
+
+    def _slots_for(self, lane: str) -> int:
+        return self.capacity if lane == "critical" else self.capacity - self.reserved_critical
+
+    def _waiting_ahead(self, lane: str) -> int:
+        ahead = 0
+        for other in LANES:
+            ahead += len(self._queues[other])
+            if other == lane:
+                return ahead
+        return ahead
+
+    def _estimate_wait(self, lane: str) -> float:
+        return (self._waiting_ahead(lane) + 1) * self._service_estimate / self._slots_for(lane)
+
+    def _forget(self, lane: str, future: asyncio.Future) -> None:
+        """Drop a waiter that gave up, so it stops counting toward queue length and wait estimates"""
+        try:
+            self._queues[lane].remove(future)
+        except ValueError:
+            # Already taken off by _wake
+            pass
+
+    def _wake(self) -> None:
+        for lane in LANES:
+            queue = self._queues[lane]
+            while queue:
+                future = queue[0]
+                if future.done():
+                    # Waiter gave up (timeout or client disconnect)
+                    queue.popleft()
+                    continue
+                if self._in_use >= self._slots_for(lane):
+                    break
+                queue.popleft()
+                self._in_use += 1
+                future.set_result(None)
+
+    async def acquire(self, lane: str) -> float:
+        """Wait for a slot in the given lane and return the time spent queued"""
+        stats = self._stats[lane]
+        queue = self._queues[lane]
+
+        if self._waiting_ahead(lane) == 0 and self._in_use < self._slots_for(lane):
+            self._in_use += 1
+            stats.admitted += 1
+            stats.wait_samples.append(0.0)
+            return 0.0
+
+        estimate = self._estimate_wait(lane)
+        if len(queue) >= self.queue_limits[lane]:
+            stats.rejected_queue_full += 1
+            raise AdmissionRejected(lane, "queue full", estimate)
+        if estimate > self.max_wait[lane]:
+            stats.shed_deadline += 1
+            raise AdmissionRejected(lane, "over deadline", estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait[lane])
+        except asyncio.TimeoutError:
+            self._forget(lane, future)
+            stats.timed_out += 1
+            raise AdmissionRejected(lane, "wait timed out", self._estimate_wait(lane))
+        except asyncio.CancelledError:
+            self._forget(lane, future)
+            if future.done() and not future.cancelled():
+                # Slot was granted just before the caller went away
+                self.release()
+            raise
+
+        waited = time.monotonic() - started
+        stats.admitted += 1
+        stats.wait_samples.append(waited)
+        return waited
+
+    def release(self) -> None:
+        self._in_use -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        """Hold a slot for the duration of the block and record its service time"""
+        lane = lane if lane in self._queues else "live"
+        await self.acquire(lane)
+        started = time.monotonic()
+        try:
+            yield lane
+        finally:
+            service = time.monotonic() - started
+            self._service_estimate = 0.8 * self._service_estimate + 0.2 * service
+            stats = self._stats[lane]
+            stats.completed += 1
+            stats.service_samples.append(service)
+            self.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-lane counters and queue/service latency percentiles"""
+        return {
+            "capacity": self.capacity,
+            "reserved_critical": self.reserved_critical,
+            "in_use": self._in_use,
+            "service_estimate_ms": round(self._service_estimate * 1000, 2),
+            "lanes": {
+                lane: {
+                    "queued": sum(1 for f in self._queues[lane] if not f.done()),
+                    "queue_limit": self.queue_limits[lane],
+                    "max_wait_seconds": self.max_wait[lane],
+                    "admitted": stats.admitted,
+                    "completed": stats.completed,
+                    "rejected_queue_full": stats.rejected_queue_full,
+                    "shed_deadline": stats.shed_deadline,
+                    "timed_out": stats.timed_out,
+                    "wait": _percentiles(stats.wait_samples),
+                    "service": _percentiles(stats.service_samples),
+                }
+                for lane, stats in self._stats.items()
+            }
+        }
+
+
+# Singleton instance guarding the transcription pipeline
+admission_controller = AdmissionController(
+    capacity=int(os.getenv("TRANSCRIPTION_CONCURRENCY", "4")),
+    reserved_critical=int(os.getenv("TRANSCRIPTION_RESERVED_CRITICAL", "1")),
+    queue_limits={
+        "critical": int(os.getenv("TRANSCRIPTION_QUEUE_CRITICAL", "100")),
+        "live": int(os.getenv("TRANSCRIPTION_QUEUE_LIVE", "50")),
+        "batch": int(os.getenv("TRANSCRIPTION_QUEUE_BATCH", "20")),
+    },
+    max_wait={
+        "critical": float(os.getenv("TRANSCRIPTION_MAX_WAIT_CRITICAL", "60")),
+        "live": float(os.getenv("TRANSCRIPTION_MAX_WAIT_LIVE", "30")),
+        "batch": float(os.getenv("TRANSCRIPTION_MAX_WAIT_BATCH", "10")),
+    }
+)
@@ -0,0 +1,160 @@
+import io
+import os
+import csv
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from services.state_store import state_store
+from services.list_query import parse_fields, project, record_filter
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _cell(record: Dict[str, Any], path: List[str]) -> Any:
+    """Value of a dotted column; objects and lists become JSON cells, as the importer reads them"""
+    value: Any = record
+    for part in path:
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(part)
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+def _ndjson(rows: Iterable[Dict[str, Any]], fields: Optional[List[str]]) -> Iterator[bytes]:
+    for record in rows:
+        yield orjson.dumps(project(record, fields)) + b"\n"
+
+
+def _csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    line = io.StringIO()
+    writer = csv.writer(line, lineterminator="\n")
+    writer.writerow(columns)
+    yield line.getvalue().encode()
+    paths = [column.split(".") for column in columns]
+    for record in rows:
+        line.seek(0)
+        line.truncate()
+        writer.writerow([_cell(record, path) for path in paths])
+        yield line.getvalue().encode()
+
+
+def _chunked(pieces: Iterator[bytes], chunk_bytes: int, flush_seconds: float) -> Iterator[bytes]:
+    """Group small pieces into chunks; the first piece and anything older than flush_seconds go out at once"""
+    buffer: List[bytes] = []
+    size = 0
+    flushed_at = None
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        now = time.monotonic()
+        if flushed_at is None or size >= chunk_bytes or now - flushed_at >= flush_seconds:
+            yield b"".join(buffer)
+            buffer, size, flushed_at = [], 0, now
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _gzipped(chunks: Iterator[bytes], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        # Sync flush so every chunk reaches the client now rather than whenever the window fills
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class ExportTarget:
+    """A collection that can be exported, with the CSV columns used when none are requested"""
+
+    def __init__(self, collection: str, name: str, columns: List[str]):
+        self.collection = collection
+        self.name = name
+        self.columns = columns
+
+
+class BulkExporter:
+    """
+    Streams a collection out as NDJSON or CSV, optionally gzip-compressed.
+
+    Records are read lazily with iter_records (`batch_size` at a time,
+    in insertion order), filtered by status and creation time, encoded
+    one by one and flushed in chunks of about `chunk_bytes`. Memory does
+    not depend on how many records are exported. The first row is sent
+    as soon as it is found, so clients start receiving data immediately.
+    """
+
+    def __init__(self, batch_size: int = 500, chunk_bytes: int = 64 * 1024, flush_seconds: float = 0.5, gzip_level: int = 6):
+        self.batch_size = batch_size
+        self.chunk_bytes = chunk_bytes
+        self.flush_seconds = flush_seconds
+        self.gzip_level = gzip_level
+
+    def _rows(self, collection: str, matches: Callable[[Dict[str, Any]], bool]) -> Iterator[Dict[str, Any]]:
+        for _, record in state_store.iter_records(collection, batch_size=self.batch_size):
+            if matches(record):
+                yield record
+
+    def response(
+        self,
+        target: ExportTarget,
+        fmt: str = "ndjson",
+        compress: Optional[str] = None,
+        fields: Optional[str] = None,
+        status: Optional[str] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None
+    ) -> StreamingResponse:
+        """
+        Streaming download of a collection
+
+        Args:
+            target: Collection to export
+            fmt: "ndjson" or "csv"
+            compress: "gzip" to compress the stream
+            fields: Comma-separated fields (NDJSON) or dotted columns (CSV); defaults to
+                whole records (NDJSON) or the target's columns (CSV)
+            status: Comma-separated statuses to keep
+            created_after: Keep records created at or after this ISO timestamp
+            created_before: Keep records created before this ISO timestamp
+
+        Returns:
+            StreamingResponse served as an attachment
+        """
+        # Validated before the response starts, so bad filters still get a 400
+        matches = record_filter(status, created_after, created_before)
+        projection = parse_fields(fields)
+        if fmt == "csv":
+            pieces = _csv(self._rows(target.collection, matches), projection or target.columns)
+        elif fmt == "ndjson":
+            pieces = _ndjson(self._rows(target.collection, matches), projection)
+        else:
+            raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+        body = _chunked(pieces, self.chunk_bytes, self.flush_seconds)
+        filename = f"{target.name}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{fmt}"
+        media_type = MEDIA_TYPES[fmt]
+        if compress == "gzip":
+            body = _gzipped(body, self.gzip_level)
+            filename += ".gz"
+            media_type = "application/gzip"
+
+        return StreamingResponse(body, media_type=media_type, headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            # Resume with ?since=<version> on the list endpoint to pick up later changes
+            "X-Collection-Version": str(state_store.collection_version(target.collection)),
+            "Cache-Control": "no-store"
+        })
+
+
+# Singleton instance
+bulk_exporter = BulkExporter(
+    chunk_bytes=int(os.getenv("SARS_EXPORT_CHUNK_KB", "64")) * 1024,
+    gzip_level=int(os.getenv("SARS_EXPORT_GZIP_LEVEL", "6"))
+)
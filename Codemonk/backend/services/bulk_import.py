@@ -0,0 +1,394 @@
+import os
+import csv
+import json
+import time
+import codecs
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+import orjson
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.list_query import utc_now
+
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+    "text/csv": "csv",
+    "application/csv": "csv"
+}
+
+# A row longer than this is reported as an error instead of being buffered (e.g. an unclosed CSV quote)
+MAX_ROW_BYTES = 1 << 20
+
+# Conflict rounds for on_conflict=replace before a row is reported as failed
+REPLACE_ATTEMPTS = 3
+
+# (row number, parsed record or None, parse error or None)
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class ImportBusy(Exception):
+    """Every import slot on this worker is taken"""
+
+
+def import_format(requested: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Format from ?format= or the Content-Type header; None if neither names one"""
+    if requested:
+        return requested
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPES.get(media_type)
+
+
+def _unflatten(header: List[str], values: List[str]) -> Dict[str, Any]:
+    """CSV row to a record: empty cells are skipped, dotted columns nest, JSON cells are parsed"""
+    record: Dict[str, Any] = {}
+    for column, value in zip(header, values):
+        value = value.strip()
+        if not column or value == "":
+            continue
+        if value[0] in "[{":
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValueError(f"{column}: invalid JSON value")
+        target = record
+        *parents, leaf = column.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+            if not isinstance(target, dict):
+                raise ValueError(f"{column}: conflicts with column {parent}")
+        target[leaf] = value
+    if len(values) > len(header):
+        raise ValueError(f"{len(values)} values for {len(header)} columns")
+    return record
+
+
+async def _ndjson_rows(chunks: AsyncIterator[bytes], batch_size: int) -> AsyncIterator[List[Row]]:
+    buffer = b""
+    number = 0
+    skipping = False
+    batch: List[Row] = []
+    async for chunk in chunks:
+        if skipping:
+            # Drop the rest of an oversized line
+            if b"\n" not in chunk:
+                continue
+            chunk = chunk.split(b"\n", 1)[1]
+            skipping = False
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            number += 1
+            row = _parse_json_line(number, line)
+            if row is not None:
+                batch.append(row)
+        if len(buffer) > MAX_ROW_BYTES:
+            number += 1
+            batch.append((number, None, f"row longer than {MAX_ROW_BYTES} bytes"))
+            buffer, skipping = b"", True
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if buffer.strip() and not skipping:
+        batch.append(_parse_json_line(number + 1, buffer))
+    if batch:
+        yield batch
+
+
+def _parse_json_line(number: int, line: bytes) -> Optional[Row]:
+    if not line.strip():
+        return None
+    try:
+        record = orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return number, None, f"invalid JSON: {e}"
+    if not isinstance(record, dict):
+        return number, None, "expected a JSON object"
+    return number, record, None
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes], batch_size: int) -> AsyncIterator[List[Row]]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    pending_bytes = 0
+    quotes = 0
+    skipping = False
+    tail = ""
+    number = 0
+    complete: List[str] = []
+
+    def parse(lines: List[str]) -> List[Row]:
+        nonlocal header, number
+        rows = []
+        for values in csv.reader(lines):
+            if not any(value.strip() for value in values):
+                continue
+            if header is None:
+                header = [column.strip() for column in values]
+                continue
+            number += 1
+            try:
+                rows.append((number, _unflatten(header, values), None))
+            except ValueError as e:
+                rows.append((number, None, str(e)))
+        return rows
+
+    async def feed():
+        async for chunk in chunks:
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    async for text in feed():
+        lines = (tail + text).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            line += "\n"
+            quotes += line.count('"')
+            if skipping:
+                # Drop the rest of an oversized row, up to the line that closes its quote
+                if quotes % 2 == 0:
+                    skipping, quotes = False, 0
+                continue
+            # A record ends at a newline outside quotes, i.e. once its quote count is even
+            pending.append(line)
+            pending_bytes += len(line)
+            if quotes % 2 == 0:
+                complete.extend(pending)
+                pending, pending_bytes, quotes = [], 0, 0
+            elif pending_bytes > MAX_ROW_BYTES:
+                # Rows buffered before it keep their numbers; the oversized row comes after them
+                rows = parse(complete)
+                number += 1
+                complete = []
+                yield rows + [(number, None, f"row longer than {MAX_ROW_BYTES} bytes (unclosed quote?)")]
+                pending, pending_bytes, skipping = [], 0, True
+        if len(complete) >= batch_size:
+            rows = parse(complete)
+            complete = []
+            if rows:
+                yield rows
+    complete.extend(pending)
+    if tail and not skipping:
+        complete.append(tail)
+    rows = parse(complete)
+    if rows:
+        yield rows
+
+
+class ImportTarget:
+    """What an import writes: collection, row model, id allocation and the event announcing each batch"""
+
+    def __init__(
+        self,
+        collection: str,
+        model: Type[BaseModel],
+        topic: str,
+        new_id: Optional[Callable[[int], str]] = None,
+        prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    ):
+        self.collection = collection
+        self.model = model
+        self.topic = topic
+        self.new_id = new_id
+        self.prepare = prepare
+
+
+class BulkImporter:
+    """
+    Streams NDJSON or CSV request bodies into a state collection.
+
+    The body is parsed as it arrives and handled `batch_size` rows at a time:
+    each batch is validated against the target model and written with one
+    put_many (one transaction on SQLite) in a worker thread, and the next
+    chunk is only read once the batch is stored. Memory stays at one batch
+    whatever the file size, and the event loop keeps serving live requests
+    between batches. Each stored batch is announced with a single
+    "<topic>" event carrying its records, so derived indexes on every
+    worker stay in sync without flooding the event log.
+
+    Rows that fail to parse or validate, or whose id already exists, are
+    reported with their row number and do not stop the import.
+    """
+
+    def __init__(self, batch_size: int = 1000, max_concurrent: int = 1, max_errors: int = 1000):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.stats = {"imports": 0, "rows": 0, "written": 0, "failed": 0}
+
+    async def run(
+        self,
+        chunks: AsyncIterator[bytes],
+        fmt: str,
+        target: ImportTarget,
+        replace: bool = False,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Import a streamed body
+
+        Args:
+            chunks: Request body chunks
+            fmt: "ndjson" or "csv" (header row first; dotted columns such as
+                current_location.latitude build nested objects)
+            target: Collection and model the rows go to
+            replace: Overwrite records whose id already exists instead of reporting them
+            dry_run: Validate only
+
+        Returns:
+            Row counts, per-row errors (up to max_errors) and throughput
+        """
+        if self._slots.locked():
+            raise ImportBusy()
+        async with self._slots:
+            started = time.perf_counter()
+            summary = {"format": fmt, "collection": target.collection, "dry_run": dry_run, "rows": 0, "written": 0, "replaced": 0, "failed": 0, "batches": 0}
+            errors: List[Dict[str, Any]] = []
+            rows_of = _ndjson_rows if fmt == "ndjson" else _csv_rows
+
+            async for batch in rows_of(chunks, self.batch_size):
+                written, replaced, failed = await asyncio.to_thread(self._store, target, batch, replace, dry_run)
+                summary["rows"] += len(batch)
+                summary["written"] += written
+                summary["replaced"] += replaced
+                summary["failed"] += len(failed)
+                summary["batches"] += 1
+                errors.extend(failed[:self.max_errors - len(errors)])
+
+            seconds = time.perf_counter() - started
+            self.stats["imports"] += 1
+            self.stats["rows"] += summary["rows"]
+            self.stats["written"] += summary["written"]
+            self.stats["failed"] += summary["failed"]
+            return {
+                **summary,
+                "errors": errors,
+                "errors_truncated": summary["failed"] > len(errors),
+                "took_ms": round(seconds * 1000, 1),
+                "rows_per_second": round(summary["rows"] / seconds) if seconds > 0 else None
+            }
+
+    def _store(
+        self,
+        target: ImportTarget,
+        batch: List[Row],
+        replace: bool,
+        dry_run: bool
+    ) -> Tuple[int, int, List[Dict[str, Any]]]:
+        """Validate and write one batch; returns (written, replaced, row errors)"""
+        failed: List[Dict[str, Any]] = []
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        for number, record, error in batch:
+            if error is not None:
+                failed.append({"row": number, "errors": [error]})
+                continue
+            try:
+                parsed = target.model.model_validate(record)
+            except ValidationError as e:
+                failed.append({
+                    "row": number,
+                    "id": record.get("id"),
+                    "errors": [f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in e.errors()]
+                })
+                continue
+            data = parsed.model_dump(exclude_none=True, exclude={"version"})
+            valid.append((number, target.prepare(data) if target.prepare else data))
+
+        # Rows without an id get a block of fresh ones in one sequence step
+        missing = [data for _, data in valid if not data.get("id")]
+        if missing and target.new_id is None:
+            for number, data in valid:
+                if not data.get("id"):
+                    failed.append({"row": number, "errors": ["id: Field required"]})
+            valid = [(number, data) for number, data in valid if data.get("id")]
+        elif missing and not dry_run:
+            last = state_store.next_id(target.collection, len(missing))
+            for offset, data in enumerate(missing):
+                data["id"] = target.new_id(last - len(missing) + 1 + offset)
+
+        rows_by_id: Dict[str, int] = {}
+        changes = []
+        for number, data in valid:
+            key = data.get("id")
+            if key is None:
+                continue
+            if key in rows_by_id:
+                failed.append({"row": number, "id": key, "errors": [f"id: duplicate of row {rows_by_id[key]}"]})
+                continue
+            rows_by_id[key] = number
+            changes.append((key, data, None))
+        if dry_run:
+            return 0, 0, sorted(failed, key=lambda item: item["row"])
+
+        written, conflicts = state_store.put_many(target.collection, changes, atomic=False)
+        replaced = 0
+        values = {key: data for key, data, _ in changes}
+        for attempt in range(REPLACE_ATTEMPTS if replace else 0):
+            if not conflicts:
+                break
+            retry = [(conflict["id"], values[conflict["id"]], conflict["current_version"]) for conflict in conflicts]
+            overwritten, conflicts = state_store.put_many(target.collection, retry, atomic=False)
+            written.extend(overwritten)
+            replaced += len(overwritten)
+        for conflict in conflicts:
+            failed.append({
+                "row": rows_by_id[conflict["id"]],
+                "id": conflict["id"],
+                "errors": ["id: already exists (pass on_conflict=replace to overwrite)" if not replace else "id: changed concurrently, not replaced"]
+            })
+
+        if written:
+            event_bus.publish(target.topic, {"records": written})
+        return len(written), replaced, sorted(failed, key=lambda item: item["row"])
+
+
+async def import_request(
+    request: Request,
+    target: ImportTarget,
+    fmt: Optional[str] = None,
+    on_conflict: str = "skip",
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """Run an import endpoint: 415 for an unknown format, 429 while another import holds the slot"""
+    fmt = import_format(fmt, request.headers.get("content-type"))
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail="Send NDJSON (application/x-ndjson) or CSV (text/csv), or pass format=ndjson|csv"
+        )
+    try:
+        return await bulk_importer.run(request.stream(), fmt, target, replace=on_conflict == "replace", dry_run=dry_run)
+    except ImportBusy:
+        raise HTTPException(status_code=429, detail="Another import is running, retry later", headers={"Retry-After": "5"})
+
+
+def emergency_defaults(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Imported emergencies keep their created_at, normalized like utc_now()"""
+    created_at = data.get("created_at")
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        data["created_at"] = created_at.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+    else:
+        data["created_at"] = utc_now()
+    return data
+
+
+def ambulance_defaults(data: Dict[str, Any]) -> Dict[str, Any]:
+    data["updated_at"] = utc_now()
+    return data
+
+
+# Singleton instance
+bulk_importer = BulkImporter(
+    batch_size=int(os.getenv("SARS_IMPORT_BATCH_SIZE", "1000")),
+    max_concurrent=int(os.getenv("SARS_IMPORT_CONCURRENCY", "1")),
+    max_errors=int(os.getenv("SARS_IMPORT_MAX_ERRORS", "1000"))
+)
@@ -0,0 +1,230 @@
+import sys
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Vehicle types mapped to the capability they imply
+TYPE_CAPABILITIES = {
+    "advanced life support": "als",
+    "als": "als",
+    "basic life support": "bls",
+    "bls": "bls",
+}
+
+# Extracted special_requirements mapped to the equipment/capabilities that satisfy them
+REQUIREMENT_CAPABILITIES = {
+    "cardiac care": ("defibrillator",),
+    "defibrillator": ("defibrillator",),
+    "ecg": ("ecg monitor",),
+    "oxygen support": ("oxygen",),
+    "respiratory care": ("oxygen",),
+    "ventilator": ("ventilator",),
+    "critical care": ("als",),
+    "stroke protocol": ("als",),
+    "advanced life support": ("als",),
+    "basic life support": (),
+    "trauma care": ("stretcher",),
+}
+
+
+@lru_cache(maxsize=4096)
+def normalize(name: str) -> str:
+    return " ".join(str(name).lower().split())
+
+
+def _iter_bits(mask: int) -> Iterable[int]:
+    """Positions of set bits, walking 64-bit words so empty stretches cost one test each"""
+    if not mask:
+        return
+    size = (mask.bit_length() + 63) // 64
+    words = memoryview(mask.to_bytes(size * 8, sys.byteorder)).cast("Q")
+    for index, word in enumerate(words):
+        base = index * 64
+        while word:
+            low = word & -word
+            yield base + low.bit_length() - 1
+            word ^= low
+
+
+def _bitset(positions: List[int]) -> int:
+    """Build a bitset from positions in one pass"""
+    if not positions:
+        return 0
+    buffer = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class CapabilityIndex:
+    """
+    Bitset index of the fleet by status and capability.
+
+    Equipment names and vehicle types are interned into bit positions, and
+    each vehicle gets a dense slot number. For every status and every
+    capability the index keeps one arbitrary-precision int with a bit set
+    per matching slot, so "available ALS units with a ventilator" is a
+    couple of ANDs over the whole fleet instead of string comparisons per
+    unit.
+    """
+
+    def __init__(self):
+        self._capability_bits: Dict[str, int] = {}
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        # slot -> (status, capability mask)
+        self._vehicles: Dict[int, Tuple[str, int]] = {}
+        # status / capability bit -> fleet bitset over slots
+        self._by_status: Dict[str, int] = {}
+        self._by_capability: Dict[int, int] = {}
+
+    def _intern(self, name: str) -> int:
+        bit = self._capability_bits.get(name)
+        if bit is None:
+            bit = self._capability_bits[name] = len(self._capability_bits)
+        return bit
+
+    def capabilities_of(self, record: Dict[str, Any]) -> List[str]:
+        names = [normalize(item) for item in record.get("equipment") or []]
+        vehicle_type = TYPE_CAPABILITIES.get(normalize(record.get("type") or ""))
+        if vehicle_type:
+            names.append(vehicle_type)
+        return names
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        """Index or re-index one ambulance record"""
+        vehicle_id = record["id"]
+        status = normalize(record.get("status") or "unknown")
+        mask = 0
+        for name in self.capabilities_of(record):
+            mask |= 1 << self._intern(name)
+
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            slot = self._free_slots.pop() if self._free_slots else len(self._ids)
+            if slot == len(self._ids):
+                self._ids.append(vehicle_id)
+            else:
+                self._ids[slot] = vehicle_id
+            self._slots[vehicle_id] = slot
+        elif self._vehicles[slot] == (status, mask):
+            return
+        else:
+            self._clear(slot)
+
+        bit = 1 << slot
+        self._vehicles[slot] = (status, mask)
+        self._by_status[status] = self._by_status.get(status, 0) | bit
+        for capability in _iter_bits(mask):
+            self._by_capability[capability] = self._by_capability.get(capability, 0) | bit
+
+    def remove(self, vehicle_id: str) -> None:
+        slot = self._slots.pop(vehicle_id, None)
+        if slot is None:
+            return
+        self._clear(slot)
+        del self._vehicles[slot]
+        self._ids[slot] = None
+        self._free_slots.append(slot)
+
+    def _clear(self, slot: int) -> None:
+        status, mask = self._vehicles[slot]
+        keep = ~(1 << slot)
+        self._by_status[status] &= keep
+        for capability in _iter_bits(mask):
+            self._by_capability[capability] &= keep
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Index many records; bitsets are built once at the end instead of per record"""
+        if self._slots:
+            for record in records:
+                self.upsert(record)
+            return len(self._slots)
+
+        status_slots: Dict[str, List[int]] = {}
+        capability_slots: Dict[int, List[int]] = {}
+        for record in records:
+            vehicle_id = record["id"]
+            if vehicle_id in self._slots:
+                continue
+            status = normalize(record.get("status") or "unknown")
+            mask = 0
+            for name in self.capabilities_of(record):
+                mask |= 1 << self._intern(name)
+            slot = len(self._ids)
+            self._ids.append(vehicle_id)
+            self._slots[vehicle_id] = slot
+            self._vehicles[slot] = (status, mask)
+            status_slots.setdefault(status, []).append(slot)
+            for capability in _iter_bits(mask):
+                capability_slots.setdefault(capability, []).append(slot)
+
+        self._by_status = {status: _bitset(slots) for status, slots in status_slots.items()}
+        self._by_capability = {bit: _bitset(slots) for bit, slots in capability_slots.items()}
+        return len(self._slots)
+
+    def resolve(self, requirements: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Translate requested capabilities or special_requirements to interned names
+
+        Returns:
+            (capabilities, unmatched) where unmatched names map to nothing known
+        """
+        capabilities, unmatched = [], []
+        for requirement in requirements:
+            name = normalize(requirement)
+            if not name:
+                continue
+            if name in REQUIREMENT_CAPABILITIES:
+                capabilities.extend(REQUIREMENT_CAPABILITIES[name])
+            elif name in TYPE_CAPABILITIES:
+                capabilities.append(TYPE_CAPABILITIES[name])
+            elif name in self._capability_bits:
+                capabilities.append(name)
+            else:
+                unmatched.append(requirement)
+        return list(dict.fromkeys(capabilities)), unmatched
+
+    def query(self, status: Optional[str] = None, capabilities: Iterable[str] = ()) -> List[str]:
+        """
+        Ids of vehicles in the given status that have every listed capability
+
+        Args:
+            status: Status to filter on, or None for any status
+            capabilities: Interned capability names (see resolve()); a name
+                no vehicle has yet matches nothing
+        """
+        if status is None:
+            mask = 0
+            for bits in self._by_status.values():
+                mask |= bits
+        else:
+            mask = self._by_status.get(normalize(status), 0)
+
+        for name in capabilities:
+            bit = self._capability_bits.get(normalize(name))
+            if bit is None:
+                return []
+            mask &= self._by_capability.get(bit, 0)
+            if not mask:
+                return []
+        return [self._ids[slot] for slot in _iter_bits(mask)]
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener keeping the index in sync across workers"""
+        if topic == "ambulance.updated" and data.get("id"):
+            self.upsert(data)
+        elif topic == "ambulance.imported":
+            for record in data.get("records") or []:
+                self.upsert(record)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vehicles": len(self._slots),
+            "capabilities": sorted(self._capability_bits),
+            "by_status": {status: bin(bits).count("1") for status, bits in self._by_status.items() if bits}
+        }
+
+
+# Singleton instance over the ambulance fleet
+capability_index = CapabilityIndex()
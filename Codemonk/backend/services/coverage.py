@@ -0,0 +1,313 @@
+import os
+import math
+import time
+import zlib
+import struct
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+from services.geo import SERVICE_CENTER, SERVICE_RADIUS_KM
+from services.hospital_registry import ROAD_FACTOR
+from services.eta_model import eta_model
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+
+# Raster cells hold reach time in steps of this many seconds; 255 means no unit within the horizon
+RASTER_STEP_SECONDS = 10
+UNREACHABLE = 255
+
+TILE_SIZE = 256
+
+
+def _png(rgba: np.ndarray) -> bytes:
+    """Encode an (h, w, 4) uint8 array as PNG"""
+    height, width = rgba.shape[:2]
+    # Filter byte 0 (none) at the start of every scanline
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+class CoverageGrid:
+    """
+    Best reach time from any available ambulance to every cell of the service area.
+
+    The area is a square grid of `cell_km` cells around the service centre
+    (320 x 320 cells for the default 40 km radius and 250 m cells). Travel
+    time is road distance (straight line x ROAD_FACTOR) at the learned
+    city-wide speed for the current hour, and nothing beyond
+    `horizon_minutes` counts as reachable.
+
+    A unit can only affect the cells within its horizon, so when one unit
+    moves or changes status only the windows around its old and new
+    positions are recomputed, from the units close enough to reach them.
+    The whole grid is rebuilt only when the hourly speed changes.
+    """
+
+    def __init__(
+        self,
+        center: Tuple[float, float] = SERVICE_CENTER,
+        radius_km: float = SERVICE_RADIUS_KM,
+        cell_km: float = 0.25,
+        target_minutes: float = 8.0,
+        horizon_minutes: float = 20.0
+    ):
+        self.center = center
+        self.radius_km = radius_km
+        self.cell_km = cell_km
+        self.target_seconds = target_minutes * 60
+        self.horizon_seconds = horizon_minutes * 60
+        self.rows = self.cols = int(math.ceil(2 * radius_km / cell_km))
+        self.lat_step = cell_km / KM_PER_DEG_LAT
+        self.lon_step = cell_km / (KM_PER_DEG_LON_EQUATOR * math.cos(math.radians(center[0])))
+        self.north = center[0] + self.rows / 2 * self.lat_step
+        self.west = center[1] - self.cols / 2 * self.lon_step
+
+        self._lock = threading.Lock()
+        self._seconds = np.full((self.rows, self.cols), np.inf, dtype=np.float32)
+        self._codes: Optional[np.ndarray] = None
+        self._digest = 0
+        # Available units as fractional (row, col); NaN marks a free slot
+        self._slots: Dict[str, int] = {}
+        self._positions = np.full((64, 2), np.nan)
+        self._speed_kmh = 0.0
+        self._reach_cells = 0.0
+        self.version = 0
+        self.stats = {"updates": 0, "rebuilds": 0, "cells_recomputed": 0, "last_update_ms": 0.0}
+
+        rows, cols = np.mgrid[0:self.rows, 0:self.cols]
+        half = self.rows / 2
+        self._in_area = np.hypot(rows + 0.5 - half, cols + 0.5 - half) * cell_km <= radius_km
+
+    # Geometry
+
+    def cell_of(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """Fractional (row, col) of a point; row 0 is the northern edge"""
+        return (self.north - latitude) / self.lat_step, (longitude - self.west) / self.lon_step
+
+    def bounds(self) -> Dict[str, float]:
+        return {
+            "north": round(self.north, 6),
+            "south": round(self.north - self.rows * self.lat_step, 6),
+            "west": round(self.west, 6),
+            "east": round(self.west + self.cols * self.lon_step, 6)
+        }
+
+    # Incremental maintenance
+
+    def _set_speed(self, at: float) -> bool:
+        speed = eta_model.city_speed_kmh(at)
+        if speed == self._speed_kmh:
+            return False
+        self._speed_kmh = speed
+        self._reach_cells = self.horizon_seconds / 3600 * speed / ROAD_FACTOR / self.cell_km
+        return True
+
+    def _window(self, row: float, col: float) -> Tuple[int, int, int, int]:
+        reach = self._reach_cells
+        return (
+            max(0, int(math.floor(row - reach))), min(self.rows, int(math.ceil(row + reach)) + 1),
+            max(0, int(math.floor(col - reach))), min(self.cols, int(math.ceil(col + reach)) + 1)
+        )
+
+    def _recompute(self, r0: int, r1: int, c0: int, c1: int) -> None:
+        if r0 >= r1 or c0 >= c1:
+            return
+        reach = self._reach_cells
+        positions = self._positions
+        near = (
+            (positions[:, 0] >= r0 - reach) & (positions[:, 0] <= r1 + reach)
+            & (positions[:, 1] >= c0 - reach) & (positions[:, 1] <= c1 + reach)
+        )
+        rows = np.arange(r0, r1, dtype=np.float32)[:, None] + 0.5
+        cols = np.arange(c0, c1, dtype=np.float32)[None, :] + 0.5
+        best = np.full((r1 - r0, c1 - c0), np.inf, dtype=np.float32)
+        for row, col in positions[near]:
+            np.minimum(best, (rows - row) ** 2 + (cols - col) ** 2, out=best)
+
+        seconds = np.sqrt(best) * (self.cell_km * ROAD_FACTOR / self._speed_kmh * 3600)
+        seconds[seconds > self.horizon_seconds] = np.inf
+        self._seconds[r0:r1, c0:c1] = seconds
+        self.stats["cells_recomputed"] += best.size
+
+    def _rebuild(self) -> None:
+        self._seconds.fill(np.inf)
+        for row, col in self._positions[~np.isnan(self._positions[:, 0])]:
+            r0, r1, c0, c1 = self._window(row, col)
+            if r0 >= r1 or c0 >= c1:
+                continue
+            rows = np.arange(r0, r1, dtype=np.float32)[:, None] + 0.5
+            cols = np.arange(c0, c1, dtype=np.float32)[None, :] + 0.5
+            distance = np.sqrt((rows - row) ** 2 + (cols - col) ** 2) * (self.cell_km * ROAD_FACTOR / self._speed_kmh * 3600)
+            np.minimum(self._seconds[r0:r1, c0:c1], distance, out=self._seconds[r0:r1, c0:c1])
+        self._seconds[self._seconds > self.horizon_seconds] = np.inf
+        self.stats["rebuilds"] += 1
+
+    def _position_of(self, ambulance: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        location = ambulance.get("current_location") or {}
+        if ambulance.get("status") != "available" or location.get("latitude") is None or location.get("longitude") is None:
+            return None
+        return self.cell_of(location["latitude"], location["longitude"])
+
+    def _place(self, ambulance_id: str, position: Optional[Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+        """Store a unit's position (None removes it); returns its previous position"""
+        slot = self._slots.get(ambulance_id)
+        previous = None
+        if slot is not None and not np.isnan(self._positions[slot, 0]):
+            previous = (float(self._positions[slot, 0]), float(self._positions[slot, 1]))
+        if position is None:
+            if slot is not None:
+                self._positions[slot] = np.nan
+            return previous
+        if slot is None:
+            # Slots are kept per unit for its lifetime, so the array grows with the fleet only
+            slot = self._slots[ambulance_id] = len(self._slots)
+            if slot == len(self._positions):
+                grown = np.full((slot * 2, 2), np.nan)
+                grown[:slot] = self._positions
+                self._positions = grown
+        self._positions[slot] = position
+        return previous
+
+    def load(self, ambulances: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for ambulance in ambulances:
+                self._place(ambulance["id"], self._position_of(ambulance))
+            self._set_speed(time.time())
+            self._rebuild()
+            self._changed()
+
+    def update(self, ambulance: Dict[str, Any]) -> None:
+        """Apply one ambulance's new status/location"""
+        started = time.perf_counter()
+        with self._lock:
+            position = self._position_of(ambulance)
+            previous = self._place(ambulance["id"], position)
+            if self._set_speed(time.time()):
+                self._rebuild()
+            elif previous != position:
+                for point in (previous, position):
+                    if point is not None:
+                        self._recompute(*self._window(*point))
+            else:
+                return
+            self.stats["updates"] += 1
+            self.stats["last_update_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self._changed()
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener applying fleet changes from any worker"""
+        if topic == "ambulance.updated" and data.get("id"):
+            self.update(data)
+        elif topic == "ambulance.imported":
+            # A roster batch moves many units at once; one rebuild beats per-unit windows
+            self.load(data.get("records") or [])
+
+    def _changed(self) -> None:
+        self._codes = None
+        self.version += 1
+
+    def _refresh_speed(self) -> None:
+        # Hour boundaries change the speed even when no unit moves
+        with self._lock:
+            if self._set_speed(time.time()):
+                self._rebuild()
+                self._changed()
+
+    # Reads
+
+    def codes(self) -> np.ndarray:
+        """uint8 raster of reach time in RASTER_STEP_SECONDS steps (UNREACHABLE beyond the horizon)"""
+        self._refresh_speed()
+        with self._lock:
+            if self._codes is None:
+                steps = np.ceil(self._seconds / RASTER_STEP_SECONDS)
+                codes = np.full(self._seconds.shape, UNREACHABLE, dtype=np.uint8)
+                reachable = np.isfinite(steps)
+                codes[reachable] = np.minimum(steps[reachable], UNREACHABLE - 1)
+                self._codes = codes
+                self._digest = zlib.crc32(codes.tobytes())
+            return self._codes
+
+    def digest(self) -> int:
+        """
+        CRC-32 of the current raster
+
+        Depends only on the content, so every worker holding the same fleet
+        gives the same value (unlike version, which counts local changes).
+        """
+        self.codes()
+        with self._lock:
+            return self._digest
+
+    def summary(self) -> Dict[str, Any]:
+        codes = self.codes()
+        area = codes[self._in_area]
+        target_code = self.target_seconds / RASTER_STEP_SECONDS
+        with self._lock:
+            units = int((~np.isnan(self._positions[:, 0])).sum())
+        return {
+            "version": self.version,
+            "rows": self.rows,
+            "cols": self.cols,
+            "cell_km": self.cell_km,
+            "bounds": self.bounds(),
+            "available_units": units,
+            "speed_kmh": round(self._speed_kmh, 1),
+            "target_minutes": self.target_seconds / 60,
+            "horizon_minutes": self.horizon_seconds / 60,
+            "area_cells": int(area.size),
+            "within_target_pct": round(float((area <= target_code).mean()) * 100, 2) if area.size else None,
+            "unreachable_pct": round(float((area == UNREACHABLE).mean()) * 100, 2) if area.size else None,
+            **self.stats
+        }
+
+    def _palette(self) -> np.ndarray:
+        """RGBA per raster code: green within target, amber to red beyond, dark red unreachable"""
+        codes = np.arange(256, dtype=np.float32) * RASTER_STEP_SECONDS
+        palette = np.zeros((256, 4), dtype=np.uint8)
+        within = codes <= self.target_seconds
+        palette[within] = (26, 152, 80, 90)
+        late = ~within
+        fraction = np.clip((codes[late] - self.target_seconds) / max(1.0, self.horizon_seconds - self.target_seconds), 0, 1)
+        palette[late, 0] = 253 - fraction * (253 - 215)
+        palette[late, 1] = 174 - fraction * (174 - 48)
+        palette[late, 2] = 97 - fraction * (97 - 39)
+        palette[late, 3] = 140
+        palette[UNREACHABLE] = (120, 0, 20, 170)
+        return palette
+
+    def tile(self, z: int, x: int, y: int) -> bytes:
+        """256px PNG for Web Mercator tile z/x/y; transparent outside the grid"""
+        codes = self.codes()
+        scale = TILE_SIZE * (1 << z)
+        pixels = np.arange(TILE_SIZE, dtype=np.float64) + 0.5
+        longitudes = (x * TILE_SIZE + pixels) / scale * 360.0 - 180.0
+        latitudes = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y * TILE_SIZE + pixels) / scale))))
+        rows = np.floor((self.north - latitudes) / self.lat_step).astype(np.int64)
+        cols = np.floor((longitudes - self.west) / self.lon_step).astype(np.int64)
+
+        rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        row_ok = (rows >= 0) & (rows < self.rows)
+        col_ok = (cols >= 0) & (cols < self.cols)
+        if row_ok.any() and col_ok.any():
+            window = codes[np.ix_(rows[row_ok], cols[col_ok])]
+            rgba[np.ix_(row_ok, col_ok)] = self._palette()[window]
+        return _png(rgba)
+
+
+# Singleton instance over the service area
+coverage_grid = CoverageGrid(
+    cell_km=float(os.getenv("SARS_COVERAGE_CELL_KM", "0.25")),
+    target_minutes=float(os.getenv("SARS_COVERAGE_TARGET_MINUTES", "8")),
+    horizon_minutes=float(os.getenv("SARS_COVERAGE_HORIZON_MINUTES", "20"))
+)
@@ -0,0 +1,280 @@
+import os
+import hmac
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from services.state_store import state_store
+from services.event_bus import event_bus
+from services.list_query import utc_now
+
+# Twilio MessageStatus values in the order a message moves through them; failures are final
+STATUS_RANK = {
+    "accepted": 0, "scheduled": 0, "queued": 1, "sending": 2, "sent": 3,
+    "delivered": 4, "read": 5, "undelivered": 6, "failed": 6, "canceled": 6
+}
+FAILED_STATUSES = {"undelivered", "failed", "canceled"}
+DELIVERED_STATUSES = {"delivered", "read"}
+
+
+def twilio_signature(auth_token: str, url: str, params: Iterable[Tuple[str, str]]) -> str:
+    """X-Twilio-Signature for a form-encoded callback: HMAC-SHA1 over the URL and sorted parameters"""
+    payload = url + "".join(f"{key}{value}" for key, value in sorted(params))
+    digest = hmac.new(auth_token.encode(), payload.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _ms_between(start: Optional[str], end: Optional[str]) -> Optional[float]:
+    if not start or not end:
+        return None
+    return round((datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() * 1000, 1)
+
+
+class DeliveryTracker:
+    """
+    Applies Twilio delivery-status callbacks to the dispatch that sent the message.
+
+    Callbacks are matched to dispatches through an in-memory SID index kept
+    in sync from "dispatch.created" events. They are merged per dispatch in
+    memory (the furthest status wins, since Twilio may deliver callbacks out
+    of order) and written to the state backend in batches by a background
+    task, so a burst of callbacks costs one compare-and-set batch per flush
+    rather than one write each. Callbacks that arrive before their dispatch
+    is known are held for `orphan_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        auth_token: Optional[str] = None,
+        callback_url: Optional[str] = None,
+        flush_interval: float = 0.25,
+        max_batch: int = 500,
+        orphan_ttl: float = 60.0,
+        resend_after: float = 60.0
+    ):
+        self.collection = collection
+        self.auth_token = auth_token
+        self.callback_url = callback_url
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.orphan_ttl = orphan_ttl
+        self.resend_after = resend_after
+        self._lock = threading.Lock()
+        self._by_sid: Dict[str, str] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._orphans: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "received": 0, "rejected_signatures": 0, "orphaned": 0, "expired_orphans": 0,
+            "flushes": 0, "records_written": 0, "write_conflicts": 0
+        }
+
+    def index(self, dispatch: Dict[str, Any]) -> None:
+        sid = dispatch.get("whatsapp_sid")
+        if sid and dispatch.get("dispatch_id"):
+            with self._lock:
+                self._by_sid[sid] = dispatch["dispatch_id"]
+
+    def load(self, dispatches: Iterable[Dict[str, Any]]) -> None:
+        for dispatch in dispatches:
+            self.index(dispatch)
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener indexing message SIDs of dispatches created on any worker"""
+        if topic == "dispatch.created":
+            self.index(data)
+
+    def verify(self, url: str, params: List[Tuple[str, str]], signature: Optional[str]) -> bool:
+        """Check X-Twilio-Signature; constant-time compare"""
+        if not signature or not self.auth_token:
+            ok = False
+        else:
+            ok = hmac.compare_digest(twilio_signature(self.auth_token, url, params), signature)
+        if not ok:
+            self._stats["rejected_signatures"] += 1
+        return ok
+
+    @staticmethod
+    def _merge(entry: Dict[str, Any], update: Dict[str, Any]) -> None:
+        for status, at in update["timeline"].items():
+            entry["timeline"].setdefault(status, at)
+        if STATUS_RANK.get(update["status"], -1) >= STATUS_RANK.get(entry["status"], -1):
+            entry["status"] = update["status"]
+        if update.get("error_code"):
+            entry["error_code"] = update["error_code"]
+
+    def receive(self, params: Dict[str, str]) -> bool:
+        """
+        Queue one status callback; returns False if it carries no SID or status
+
+        Args:
+            params: Callback form fields (MessageSid, MessageStatus, ErrorCode, ...)
+        """
+        sid = params.get("MessageSid") or params.get("SmsSid")
+        status = (params.get("MessageStatus") or params.get("SmsStatus") or "").lower()
+        if not sid or not status:
+            return False
+        update = {"status": status, "timeline": {status: utc_now()}, "error_code": params.get("ErrorCode") or None}
+        with self._lock:
+            self._stats["received"] += 1
+            dispatch_id = self._by_sid.get(sid)
+            if dispatch_id is None:
+                self._stats["orphaned"] += 1
+                held = self._orphans.get(sid)
+                if held is None:
+                    self._orphans[sid] = (time.monotonic(), update)
+                else:
+                    self._merge(held[1], update)
+                return True
+            entry = self._pending.get(dispatch_id)
+            if entry is None:
+                self._pending[dispatch_id] = update
+            else:
+                self._merge(entry, update)
+        return True
+
+    def _take_batch(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            # Callbacks that beat their dispatch.created event are matched now
+            now = time.monotonic()
+            for sid, (held_since, update) in list(self._orphans.items()):
+                dispatch_id = self._by_sid.get(sid)
+                if dispatch_id is not None:
+                    del self._orphans[sid]
+                    if dispatch_id in self._pending:
+                        self._merge(self._pending[dispatch_id], update)
+                    else:
+                        self._pending[dispatch_id] = update
+                elif now - held_since > self.orphan_ttl:
+                    del self._orphans[sid]
+                    self._stats["expired_orphans"] += 1
+
+            batch = {}
+            for dispatch_id in list(islice(self._pending, self.max_batch)):
+                batch[dispatch_id] = self._pending.pop(dispatch_id)
+            return batch
+
+    @staticmethod
+    def _apply(dispatch: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        updated = dict(dispatch)
+        timeline = dict(dispatch.get("whatsapp_timeline") or {})
+        for status, at in update["timeline"].items():
+            timeline.setdefault(status, at)
+        updated["whatsapp_timeline"] = timeline
+        if STATUS_RANK.get(update["status"], -1) >= STATUS_RANK.get(dispatch.get("whatsapp_status"), -1):
+            updated["whatsapp_status"] = update["status"]
+        if update.get("error_code"):
+            updated["whatsapp_error_code"] = update["error_code"]
+        return updated
+
+    def flush(self) -> int:
+        """Write queued callbacks to their dispatches; returns records written"""
+        batch = self._take_batch()
+        if not batch:
+            return 0
+
+        changes = []
+        for dispatch_id, update in batch.items():
+            dispatch = state_store.get(self.collection, dispatch_id)
+            if dispatch is not None:
+                changes.append((dispatch_id, self._apply(dispatch, update), dispatch.get("version")))
+        written, conflicts = state_store.put_many(self.collection, changes, atomic=False)
+
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["records_written"] += len(written)
+            self._stats["write_conflicts"] += len(conflicts)
+            # Someone else wrote the dispatch meanwhile: retry on top of their version next flush
+            for conflict in conflicts:
+                if conflict["current_version"] is None:
+                    continue
+                update = batch[conflict["id"]]
+                if conflict["id"] in self._pending:
+                    self._merge(update, self._pending[conflict["id"]])
+                self._pending[conflict["id"]] = update
+
+        for record in written:
+            event_bus.publish("dispatch.delivery", {
+                "dispatch_id": record["dispatch_id"],
+                "whatsapp_status": record.get("whatsapp_status"),
+                "whatsapp_timeline": record.get("whatsapp_timeline"),
+                "whatsapp_error_code": record.get("whatsapp_error_code")
+            })
+        return len(written)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                while self._pending or self._orphans:
+                    if not await asyncio.to_thread(self.flush):
+                        break
+            except Exception as e:
+                print(f"⚠️ Delivery status flush failed: {e}")
+
+    def delivery_state(self, dispatch: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Delivery status and latency of a dispatch's WhatsApp assignment
+
+        needs_resend is true when the message failed, was never sent, or has
+        not been delivered within `resend_after` seconds of the dispatch.
+        """
+        status = dispatch.get("whatsapp_status")
+        timeline = dispatch.get("whatsapp_timeline") or {}
+        created_at = dispatch.get("created_at")
+        # A read receipt implies delivery, and callbacks can arrive in either order
+        delivered_at = min((timeline[status] for status in DELIVERED_STATUSES if status in timeline), default=None)
+
+        if not dispatch.get("whatsapp_sid") or status in FAILED_STATUSES:
+            needs_resend = True
+        elif status in DELIVERED_STATUSES:
+            needs_resend = False
+        else:
+            age_ms = _ms_between(created_at, utc_now())
+            needs_resend = age_ms is not None and age_ms > self.resend_after * 1000
+
+        return {
+            "status": status,
+            "error_code": dispatch.get("whatsapp_error_code"),
+            "sent_at": timeline.get("sent"),
+            "delivered_at": delivered_at,
+            "read_at": timeline.get("read"),
+            "delivery_latency_ms": _ms_between(created_at, delivered_at),
+            "read_latency_ms": _ms_between(created_at, timeline.get("read")),
+            "needs_resend": needs_resend
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "indexed_sids": len(self._by_sid),
+                "pending": len(self._pending),
+                "orphans": len(self._orphans)
+            }
+
+
+# Singleton instance over the dispatch collection
+delivery_tracker = DeliveryTracker(
+    "dispatches",
+    auth_token=os.getenv("TWILIO_AUTH_TOKEN"),
+    callback_url=os.getenv("TWILIO_STATUS_CALLBACK_URL"),
+    flush_interval=float(os.getenv("WHATSAPP_STATUS_FLUSH_MS", "250")) / 1000,
+    resend_after=float(os.getenv("WHATSAPP_RESEND_AFTER_SECONDS", "60"))
+)
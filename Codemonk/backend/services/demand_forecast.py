@@ -0,0 +1,275 @@
+import os
+import math
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from services.geo import SERVICE_CENTER, SERVICE_RADIUS_KM
+from services.geocoder import point_of
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+
+HOURS_PER_WEEK = 168
+
+# Separate fits per severity so pre-positioning can look at critical calls alone
+SEVERITIES = ("critical", "high", "medium", "low")
+GROUPS = ("all",) + SEVERITIES
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class DemandForecaster:
+    """
+    Expected emergency volume per map cell for the coming hours.
+
+    Emergencies are binned by grid cell (`cell_km` square cells over the
+    service area) and hour. Each cell gets a seasonal rate for every hour
+    of the week: its own weighted count for that hour, shrunk towards the
+    cell's overall level times the city-wide weekly shape, so sparse cells
+    borrow the city's daily and weekly rhythm while busy cells keep their
+    own. Older weeks count for less (`half_life_days`).
+
+    A fit is a handful of bincounts over the whole history, so all cells
+    (and each severity) are fitted together in one pass. The result is a
+    (groups x cells x 168) array; forecasts just sum its columns for the
+    hours asked for.
+    """
+
+    def __init__(
+        self,
+        center: Tuple[float, float] = SERVICE_CENTER,
+        radius_km: float = SERVICE_RADIUS_KM,
+        cell_km: float = 1.0,
+        history_days: float = 56.0,
+        half_life_days: float = 21.0,
+        prior_weight: float = 2.0,
+        refit_interval: float = 900.0
+    ):
+        self.center = center
+        self.cell_km = cell_km
+        self.history_hours = int(history_days * 24)
+        self.half_life_hours = half_life_days * 24
+        self.prior_weight = prior_weight
+        self.refit_interval = refit_interval
+        self.rows = self.cols = int(math.ceil(2 * radius_km / cell_km))
+        self.lat_step = cell_km / KM_PER_DEG_LAT
+        self.lon_step = cell_km / (KM_PER_DEG_LON_EQUATOR * math.cos(math.radians(center[0])))
+        self.north = center[0] + self.rows / 2 * self.lat_step
+        self.west = center[1] - self.cols / 2 * self.lon_step
+
+        self._lock = threading.Lock()
+        self._fit_lock = threading.Lock()
+        # Raw events as (cell, epoch hour, group) kept until a fit folds them in
+        self._cells: List[int] = []
+        self._hours: List[int] = []
+        self._groups: List[int] = []
+        self._seen: set = set()
+        self._rates: Optional[np.ndarray] = None
+        self._fitted_at = 0.0
+        self._fitted_events = 0
+        self._dirty = False
+        self.stats = {"events": 0, "unlocated": 0, "outside_area": 0, "fits": 0, "last_fit_ms": 0.0}
+
+    def _cell(self, point: Tuple[float, float]) -> Optional[int]:
+        row = int((self.north - point[0]) // self.lat_step)
+        col = int((point[1] - self.west) // self.lon_step)
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row * self.cols + col
+        return None
+
+    def cell_center(self, cell: int) -> Tuple[float, float]:
+        row, col = divmod(cell, self.cols)
+        return self.north - (row + 0.5) * self.lat_step, self.west + (col + 0.5) * self.lon_step
+
+    def add(self, emergency: Dict[str, Any]) -> bool:
+        """Record one emergency; returns False if it has no usable time or place"""
+        at = _epoch(emergency.get("created_at"))
+        point = point_of(emergency)
+        with self._lock:
+            if emergency.get("id") in self._seen:
+                return False
+            if at is None or point is None:
+                self.stats["unlocated"] += 1
+                return False
+            cell = self._cell(point)
+            if cell is None:
+                self.stats["outside_area"] += 1
+                return False
+            severity = str(emergency.get("severity") or "").lower()
+            if emergency.get("id"):
+                self._seen.add(emergency["id"])
+            self._cells.append(cell)
+            self._hours.append(int(at // 3600))
+            self._groups.append(SEVERITIES.index(severity) + 1 if severity in SEVERITIES else 0)
+            self.stats["events"] += 1
+            self._dirty = True
+        return True
+
+    def load(self, emergencies: Iterable[Dict[str, Any]]) -> None:
+        for emergency in emergencies:
+            self.add(emergency)
+        self.fit()
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener recording emergencies created on any worker"""
+        if topic == "emergency.created":
+            self.add(data)
+        elif topic == "emergency.imported":
+            for record in data.get("records") or []:
+                self.add(record)
+
+    def fit(self, now: Optional[float] = None) -> None:
+        """Refit every cell and severity from the recorded history"""
+        started = time.perf_counter()
+        end_hour = int((now if now is not None else time.time()) // 3600)
+        with self._lock:
+            cells = np.array(self._cells, dtype=np.int64)
+            hours = np.array(self._hours, dtype=np.int64)
+            groups = np.array(self._groups, dtype=np.int64)
+            self._dirty = False
+
+        with self._fit_lock:
+            current = hours > end_hour - self.history_hours
+            if not current.all():
+                # History past the window no longer counts; drop it from the buffer too
+                with self._lock:
+                    taken = len(hours)
+                    self._cells = cells[current].tolist() + self._cells[taken:]
+                    self._hours = hours[current].tolist() + self._hours[taken:]
+                    self._groups = groups[current].tolist() + self._groups[taken:]
+            keep = current & (hours <= end_hour)
+            cells, hours, groups = cells[keep], hours[keep], groups[keep]
+
+            n_cells = self.rows * self.cols
+            rates = np.zeros((len(GROUPS), n_cells, HOURS_PER_WEEK), dtype=np.float32)
+            if len(hours):
+                decay = math.log(2) / self.half_life_hours
+                # Exposure: how much (decayed) observation time each hour of the week has had
+                observed = np.arange(max(int(hours.min()), end_hour - self.history_hours + 1), end_hour + 1)
+                exposure = np.bincount(observed % HOURS_PER_WEEK, weights=np.exp(-decay * (end_hour - observed)), minlength=HOURS_PER_WEEK)
+                weights = np.exp(-decay * (end_hour - hours))
+                slots = hours % HOURS_PER_WEEK
+
+                for group in range(len(GROUPS)):
+                    mask = slice(None) if group == 0 else groups == group
+                    counts = np.bincount(
+                        cells[mask] * HOURS_PER_WEEK + slots[mask], weights=weights[mask],
+                        minlength=n_cells * HOURS_PER_WEEK
+                    ).reshape(n_cells, HOURS_PER_WEEK)
+                    rates[group] = self._seasonal(counts, exposure)
+
+            self._rates = rates
+            self._fitted_at = time.time()
+            self._fitted_events = len(hours)
+            self.stats["fits"] += 1
+            self.stats["last_fit_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    def _seasonal(self, counts: np.ndarray, exposure: np.ndarray) -> np.ndarray:
+        """Per-cell hourly rates: cell level x city weekly shape, updated with the cell's own counts"""
+        seen = exposure > 0
+        total_exposure = exposure.sum()
+        level = counts.sum(axis=1) / total_exposure
+        city_rate = np.where(seen, counts.sum(axis=0) / np.where(seen, exposure, 1), 0)
+        city_mean = city_rate[seen].mean() if seen.any() else 0
+        shape = city_rate / city_mean if city_mean > 0 else np.ones(HOURS_PER_WEEK)
+        # Hours of the week with no observation yet follow the cell's flat level
+        shape = np.where(seen, shape, 1.0)
+        prior = level[:, None] * shape[None, :]
+        return (counts + self.prior_weight * prior) / (exposure[None, :] + self.prior_weight)
+
+    def ensure_fresh(self) -> None:
+        """Refit when new emergencies arrived and the last fit is older than refit_interval (or was empty)"""
+        stale = time.time() - self._fitted_at >= self.refit_interval or not self._fitted_events
+        if self._rates is None or (self._dirty and stale):
+            self.fit()
+
+    def forecast(
+        self,
+        hours: int = 6,
+        severity: Optional[str] = None,
+        top: int = 50,
+        min_expected: float = 0.0,
+        now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Expected emergencies per cell over the next `hours` hours
+
+        Args:
+            hours: Hours ahead, starting with the next full hour
+            severity: Only emergencies of this severity (None for all)
+            top: Busiest cells to return
+            min_expected: Leave out cells expecting fewer calls than this
+
+        Returns:
+            Cells ranked by expected calls, plus city-wide expected calls per hour
+        """
+        if self._rates is None:
+            self.fit(now)
+        rates = self._rates[GROUPS.index(severity) if severity else 0]
+        start_hour = int((now if now is not None else time.time()) // 3600) + 1
+        slots = np.arange(start_hour, start_hour + hours) % HOURS_PER_WEEK
+        expected = rates[:, slots].sum(axis=1)
+
+        candidates = np.flatnonzero(expected > max(min_expected, 0.0))
+        if len(candidates) > top:
+            candidates = candidates[np.argpartition(-expected[candidates], top - 1)[:top]]
+        candidates = candidates[np.argsort(-expected[candidates], kind="stable")]
+
+        cells = []
+        for cell in candidates.tolist():
+            latitude, longitude = self.cell_center(cell)
+            value = float(expected[cell])
+            cells.append({
+                "cell": cell,
+                "latitude": round(latitude, 6),
+                "longitude": round(longitude, 6),
+                "expected_calls": round(value, 4),
+                # Poisson chance of at least one call in the window
+                "p_any": round(1 - math.exp(-value), 4)
+            })
+
+        hourly = rates[:, slots].sum(axis=0)
+        return {
+            "hours": hours,
+            "severity": severity,
+            "from": datetime.fromtimestamp(start_hour * 3600, timezone.utc).isoformat(),
+            "cell_km": self.cell_km,
+            "expected_total": round(float(expected.sum()), 3),
+            "hourly": [
+                {"hour": datetime.fromtimestamp((start_hour + i) * 3600, timezone.utc).isoformat(), "expected_calls": round(float(value), 3)}
+                for i, value in enumerate(hourly)
+            ],
+            "cells": cells,
+            "fitted_at": datetime.fromtimestamp(self._fitted_at, timezone.utc).isoformat() if self._fitted_at else None
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._hours)
+        return {
+            **self.stats,
+            "history_events": buffered,
+            "cells": self.rows * self.cols,
+            "cell_km": self.cell_km,
+            "groups": list(GROUPS),
+            "fitted_at": datetime.fromtimestamp(self._fitted_at, timezone.utc).isoformat() if self._fitted_at else None,
+            "pending_refit": self._dirty
+        }
+
+
+# Singleton instance over the service area
+demand_forecaster = DemandForecaster(
+    cell_km=float(os.getenv("SARS_FORECAST_CELL_KM", "1.0")),
+    history_days=float(os.getenv("SARS_FORECAST_HISTORY_DAYS", "56")),
+    half_life_days=float(os.getenv("SARS_FORECAST_HALF_LIFE_DAYS", "21")),
+    refit_interval=float(os.getenv("SARS_FORECAST_REFIT_SECONDS", "900"))
+)
@@ -0,0 +1,272 @@
+import os
+import math
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+from services.geo import EARTH_RADIUS_KM
+from services.hospital_registry import ROAD_FACTOR, AVERAGE_SPEED_KMH
+
+# Road cells of about 1 km; one speed slot per hour of the day (UTC)
+CELL_DEG = 0.01
+SLOTS_PER_DAY = 24
+SLOT_SECONDS = 86400 // SLOTS_PER_DAY
+
+# A cell/hour needs this many observed segments before it is trusted
+MIN_SAMPLES = 3
+
+# GPS segments outside this range are stops or glitches, not driving
+MIN_SPEED_KMH = 2.0
+MAX_SPEED_KMH = 140.0
+MAX_SEGMENT_SECONDS = 300.0
+
+# Points sampled along each candidate's path when summing travel time
+PATH_SAMPLES = 8
+
+# Packs (row, col) into one int64 so lookups are a single searchsorted
+_KEY_OFFSET = 1 << 20
+_KEY_SHIFT = 1 << 22
+
+
+def _haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _cell_keys(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    rows = np.floor(latitudes / CELL_DEG).astype(np.int64) + _KEY_OFFSET
+    cols = np.floor(longitudes / CELL_DEG).astype(np.int64) + _KEY_OFFSET
+    return rows * _KEY_SHIFT + cols
+
+
+def _slot(timestamp: float) -> int:
+    return int(timestamp % 86400) // SLOT_SECONDS
+
+
+def format_eta(seconds: float) -> str:
+    """Same wording the dispatch messages always used, e.g. '8 minutes'"""
+    minutes = max(1, int(math.ceil(seconds / 60)))
+    return f"{minutes} minute" if minutes == 1 else f"{minutes} minutes"
+
+
+class EtaModel:
+    """
+    Travel-time model learned from recorded ambulance tracks.
+
+    Each GPS segment adds its distance and duration to the (road cell, hour
+    of day) it was driven in. Predictions use a compiled table: the sorted
+    cell keys plus a (cells x 24) float32 array of speeds, where cells or
+    hours with too few samples fall back to the city-wide speed for that
+    hour and then to AVERAGE_SPEED_KMH. Predicting for many candidate units
+    at once is a handful of NumPy operations: the straight line to the target
+    is sampled at PATH_SAMPLES points, every sample's cell is found with one
+    searchsorted, and the per-leg times are summed.
+
+    The table is per process and fed from the event bus, like the other
+    derived indexes.
+    """
+
+    def __init__(self, min_samples: int = MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._row_of: Dict[int, int] = {}
+        self._km = np.zeros((64, SLOTS_PER_DAY), dtype=np.float64)
+        self._hours = np.zeros((64, SLOTS_PER_DAY), dtype=np.float64)
+        self._samples = np.zeros((64, SLOTS_PER_DAY), dtype=np.int32)
+        self._compiled: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.stats = {"segments": 0, "rejected_segments": 0, "predictions": 0}
+
+    def _rows_for(self, keys: np.ndarray) -> np.ndarray:
+        unique, inverse = np.unique(keys, return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.int64)
+        for i, key in enumerate(unique.tolist()):
+            row = self._row_of.get(key)
+            if row is None:
+                row = self._row_of[key] = len(self._row_of)
+            rows[i] = row
+        if len(self._row_of) > len(self._km):
+            capacity = max(len(self._row_of), 2 * len(self._km))
+            for name in ("_km", "_hours", "_samples"):
+                table = getattr(self, name)
+                grown = np.zeros((capacity, SLOTS_PER_DAY), dtype=table.dtype)
+                grown[:len(table)] = table
+                setattr(self, name, grown)
+        return rows[inverse]
+
+    def ingest(self, latitudes: Sequence[float], longitudes: Sequence[float], timestamps: Sequence[float]) -> int:
+        """
+        Learn from one track (points in time order); returns segments used
+
+        Args:
+            latitudes: Point latitudes
+            longitudes: Point longitudes
+            timestamps: Unix seconds of each point
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        ts = np.asarray(timestamps, dtype=np.float64)
+        if len(ts) < 2:
+            return 0
+
+        km = _haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])
+        seconds = np.diff(ts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speed = km / (seconds / 3600.0)
+        valid = (seconds > 0) & (seconds <= MAX_SEGMENT_SECONDS) & (speed >= MIN_SPEED_KMH) & (speed <= MAX_SPEED_KMH)
+        used = int(valid.sum())
+
+        with self._lock:
+            self.stats["rejected_segments"] += len(km) - used
+            if not used:
+                return 0
+            keys = _cell_keys(((lat[:-1] + lat[1:]) / 2)[valid], ((lon[:-1] + lon[1:]) / 2)[valid])
+            slots = ((((ts[:-1] + ts[1:]) / 2)[valid] % 86400) // SLOT_SECONDS).astype(np.int64)
+            rows = self._rows_for(keys)
+            np.add.at(self._km, (rows, slots), km[valid])
+            np.add.at(self._hours, (rows, slots), seconds[valid] / 3600.0)
+            np.add.at(self._samples, (rows, slots), 1)
+            self.stats["segments"] += used
+            self._compiled = None
+        return used
+
+    def _compile(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(sorted cell keys, speed table in key order, per-hour fallback speeds)"""
+        with self._lock:
+            if self._compiled is not None:
+                return self._compiled
+            count = len(self._row_of)
+            km, hours, samples = self._km[:count], self._hours[:count], self._samples[:count]
+
+            hourly_hours = hours.sum(axis=0)
+            fallback = np.full(SLOTS_PER_DAY, AVERAGE_SPEED_KMH, dtype=np.float64)
+            known = (samples.sum(axis=0) >= self.min_samples) & (hourly_hours > 0)
+            fallback[known] = km.sum(axis=0)[known] / hourly_hours[known]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speeds = np.where((samples >= self.min_samples) & (hours > 0), km / hours, fallback)
+
+            keys = np.fromiter(self._row_of.keys(), dtype=np.int64, count=count)
+            rows = np.fromiter(self._row_of.values(), dtype=np.int64, count=count)
+            order = np.argsort(keys)
+            self._compiled = (keys[order], speeds[rows[order]].astype(np.float32), fallback.astype(np.float32))
+            return self._compiled
+
+    def predict(self, origins: np.ndarray, destination: Tuple[float, float], at: float) -> np.ndarray:
+        """
+        ETA in seconds from each origin to one destination
+
+        Args:
+            origins: (n, 2) array of latitude, longitude
+            destination: Target latitude, longitude
+            at: Unix time of departure (selects the hour-of-day profile)
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        if not len(origins):
+            return np.zeros(0)
+        keys, speeds, fallback = self._compile()
+        slot = _slot(at)
+        with self._lock:
+            self.stats["predictions"] += len(origins)
+
+        # Midpoints of PATH_SAMPLES equal legs along each straight line
+        fractions = (np.arange(PATH_SAMPLES) + 0.5) / PATH_SAMPLES
+        lat = origins[:, :1] + (destination[0] - origins[:, :1]) * fractions
+        lon = origins[:, 1:] + (destination[1] - origins[:, 1:]) * fractions
+        leg_km = _haversine_km(origins[:, 0], origins[:, 1], destination[0], destination[1]) * ROAD_FACTOR / PATH_SAMPLES
+
+        leg_speed = np.full(lat.shape, fallback[slot], dtype=np.float32)
+        if len(keys):
+            sample_keys = _cell_keys(lat, lon)
+            index = np.minimum(np.searchsorted(keys, sample_keys), len(keys) - 1)
+            found = keys[index] == sample_keys
+            leg_speed[found] = speeds[index[found], slot]
+
+        return (leg_km[:, None] / leg_speed).sum(axis=1) * 3600.0
+
+    def predict_one(self, origin: Tuple[float, float], destination: Tuple[float, float], at: float) -> float:
+        return float(self.predict(np.array([origin]), destination, at)[0])
+
+    def city_speed_kmh(self, at: float) -> float:
+        """Learned city-wide speed for the hour of `at` (used where a cell has no profile)"""
+        return float(self._compile()[2][_slot(at)])
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener: learn from tracks uploaded on any worker"""
+        if topic == "ambulance.track":
+            points = data.get("points") or []
+            self.ingest(
+                [point["latitude"] for point in points],
+                [point["longitude"] for point in points],
+                [point["timestamp"] for point in points]
+            )
+
+    def save(self, path: str) -> None:
+        """
+        Write the raw accumulators so learning resumes after a restart
+
+        Written to a temporary file that replaces `path` in one step, so a
+        crash mid-write never leaves a truncated profile. The file is passed
+        open so numpy keeps `path` as given instead of appending ".npz".
+        """
+        with self._lock:
+            count = len(self._row_of)
+            keys = np.fromiter(self._row_of.keys(), dtype=np.int64, count=count)
+            km, hours, samples = self._km[:count].copy(), self._hours[:count].copy(), self._samples[:count].copy()
+        # Per-process name: several workers may save the same profile on shutdown
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                np.savez_compressed(file, keys=keys, km=km, hours=hours, samples=samples)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def load(self, path: str) -> int:
+        """Merge a profile written by save(); returns the number of cells"""
+        with np.load(path) as profile:
+            keys, km, hours, samples = profile["keys"], profile["km"], profile["hours"], profile["samples"]
+        with self._lock:
+            rows = self._rows_for(keys)
+            self._km[rows] += km
+            self._hours[rows] += hours
+            self._samples[rows] += samples
+            self.stats["segments"] += int(samples.sum())
+            self._compiled = None
+        return len(keys)
+
+    def profile(self) -> Dict[str, Any]:
+        keys, speeds, fallback = self._compile()
+        with self._lock:
+            trusted = int((self._samples[:len(self._row_of)] >= self.min_samples).sum())
+            stats = dict(self.stats)
+        return {
+            "cells": len(keys),
+            "trusted_cell_hours": trusted,
+            "cell_deg": CELL_DEG,
+            "hourly_speed_kmh": [round(float(speed), 1) for speed in fallback],
+            "table_bytes": int(keys.nbytes + speeds.nbytes),
+            **stats
+        }
+
+
+def _load_default() -> EtaModel:
+    model = EtaModel(min_samples=int(os.getenv("SARS_ETA_MIN_SAMPLES", str(MIN_SAMPLES))))
+    path = os.getenv("SARS_SPEED_PROFILE_PATH")
+    if path and os.path.exists(path):
+        try:
+            print(f"✅ Speed profile loaded: {model.load(path)} road cells from {path}")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️ Could not load speed profile {path}: {e}")
+    return model
+
+
+def save_default(model: "EtaModel") -> None:
+    """Persist the learned profile to SARS_SPEED_PROFILE_PATH, if set"""
+    path = os.getenv("SARS_SPEED_PROFILE_PATH")
+    if path:
+        model.save(path)
+
+
+# Singleton instance
+eta_model = _load_default()
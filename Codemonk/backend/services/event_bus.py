@@ -0,0 +1,110 @@
+import os
+import asyncio
+from typing import Dict, Any, Callable, List, Optional
+from services.state_store import StateBackend, state_store
+
+
+class EventBus:
+    """
+    Cross-process pub/sub on top of the state backend's event log.
+
+    Publishing appends to the shared log. Each worker runs one poller that
+    reads new entries and fans them out to local listeners (derived indexes)
+    and subscriber queues (server-sent event streams). Events published by
+    this worker take the same path, so every worker sees the same order.
+    """
+
+    def __init__(self, backend: StateBackend, poll_interval: float = 0.1, batch_size: int = 200):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.worker_id = os.getpid()
+        self._cursor: Any = None
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._subscribers: List[asyncio.Queue] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, topic: str, payload: Dict[str, Any]) -> None:
+        """Publish an event to every worker"""
+        self.backend.append_event(topic, {"origin": self.worker_id, "data": payload})
+
+    def add_listener(self, callback: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Register a callback invoked with (topic, data) for every event"""
+        self._listeners.append(callback)
+
+    def subscribe(self, max_queue: int = 1000) -> asyncio.Queue:
+        """Return a queue receiving every event from now on"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def dispatch_pending(self) -> int:
+        """Read and deliver all events published since the last call"""
+        delivered = 0
+        while True:
+            events = self.backend.read_events(self._cursor, self.batch_size)
+            if not events:
+                return delivered
+            delivered += self._deliver_all(events)
+
+    async def dispatch_pending_async(self) -> int:
+        """dispatch_pending for the poller: reads run on a worker thread so SQLite/Redis I/O never blocks the loop"""
+        delivered = 0
+        while True:
+            events = await asyncio.to_thread(self.backend.read_events, self._cursor, self.batch_size)
+            if not events:
+                return delivered
+            delivered += self._deliver_all(events)
+
+    def _deliver_all(self, events) -> int:
+        for cursor, topic, payload in events:
+            self._cursor = cursor
+            self._deliver(topic, payload)
+        return len(events)
+
+    def _deliver(self, topic: str, payload: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(topic, payload.get("data", {}))
+            except Exception as e:
+                print(f"⚠️ Event listener failed for {topic}: {e}")
+
+        message = {"topic": topic, "origin": payload.get("origin"), "data": payload.get("data", {})}
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block the poller
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def start(self) -> None:
+        """Start polling from the current end of the log"""
+        if self._task is not None:
+            return
+        self._cursor = await asyncio.to_thread(self.backend.last_event_cursor)
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await self.dispatch_pending_async()
+            except Exception as e:
+                print(f"⚠️ Event bus poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+# Singleton instance
+event_bus = EventBus(state_store, poll_interval=float(os.getenv("SARS_EVENT_POLL_INTERVAL", "0.1")))
@@ -0,0 +1,37 @@
+import os
+import math
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _parse_point(value: str) -> Tuple[float, float]:
+    latitude, longitude = (float(part) for part in value.split(","))
+    return latitude, longitude
+
+
+# Centre and radius of the area the fleet serves (defaults to New Delhi)
+SERVICE_CENTER = _parse_point(os.getenv("SARS_SERVICE_CENTER", "28.6139,77.2090"))
+SERVICE_RADIUS_KM = float(os.getenv("SARS_SERVICE_RADIUS_KM", "40"))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_point(value: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parse "lat,lon" into a tuple, returning None for empty or malformed input"""
+    if not value:
+        return None
+    try:
+        return _parse_point(value)
+    except ValueError:
+        return None
@@ -0,0 +1,264 @@
+import os
+import csv
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from services.geo import haversine_km, SERVICE_CENTER, SERVICE_RADIUS_KM
+
+DEFAULT_GAZETTEER = Path(__file__).resolve().parent.parent / "data" / "gazetteer.csv"
+
+# Words callers wrap around a place name ("near the India Gate", "opposite AIIMS")
+STOPWORDS = {
+    "a", "an", "the", "near", "nearby", "at", "in", "on", "of", "by", "to", "next",
+    "opposite", "opp", "behind", "beside", "outside", "inside", "front", "close",
+    "around", "area", "side", "just", "from"
+}
+
+# Trigrams shared by more entries than this carry almost no signal and are skipped
+MAX_POSTINGS = 5000
+
+# Lowest score at which a location is resolved to coordinates without a person checking it.
+# Exact phrase hits always clear it; fuzzy matches only do when the text is a near-spelling
+# of a whole name, not a generic word that happens to share trigrams ("hospital", "market").
+AUTOFILL_MIN_SCORE = float(os.getenv("SARS_GEOCODE_AUTOFILL_SCORE", "0.75"))
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def clean(text: str) -> str:
+    """Normalize and drop filler words; applied to names and queries alike"""
+    return " ".join(token for token in normalize(text).split() if token not in STOPWORDS)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GazetteerEntry:
+    __slots__ = ("id", "name", "latitude", "longitude", "kind", "names")
+
+    def __init__(self, entry_id: int, name: str, latitude: float, longitude: float, kind: str, names: List[str]):
+        self.id = entry_id
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.kind = kind
+        self.names = names
+
+
+class GazetteerGeocoder:
+    """
+    Offline geocoder over a gazetteer of landmarks, areas and addresses.
+
+    Three in-memory indexes are built at load time:
+    - exact: normalized name/alias -> entries, probed with every word n-gram
+      of the query so "near India Gate" resolves without fuzzy work;
+    - trigram postings over each name variant for typo-tolerant matching;
+    - a prefix trie for autocomplete.
+    Scores are biased toward the service area (or a caller-supplied point),
+    so an ambiguous name prefers the match closest to where the fleet runs.
+    """
+
+    def __init__(self, center: Tuple[float, float] = SERVICE_CENTER, radius_km: float = SERVICE_RADIUS_KM):
+        self.center = center
+        self.radius_km = radius_km
+        self.entries: List[GazetteerEntry] = []
+        self._exact: Dict[str, List[int]] = {}
+        # variant id -> (entry id, trigram count)
+        self._variants: List[Tuple[int, int]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._trie: Dict[str, Any] = {}
+
+    def add(self, name: str, latitude: float, longitude: float, kind: str = "place", aliases: Optional[List[str]] = None) -> None:
+        entry_id = len(self.entries)
+        names = []
+        for variant in [name] + (aliases or []):
+            normalized = clean(variant)
+            if normalized and normalized not in names:
+                names.append(normalized)
+        self.entries.append(GazetteerEntry(entry_id, name, latitude, longitude, kind, names))
+
+        for normalized in names:
+            self._exact.setdefault(normalized, []).append(entry_id)
+            grams = trigrams(normalized)
+            variant_id = len(self._variants)
+            self._variants.append((entry_id, len(grams)))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(variant_id)
+            self._insert_prefix(normalized, entry_id)
+
+    def _insert_prefix(self, normalized: str, entry_id: int) -> None:
+        node = self._trie
+        for char in normalized:
+            node = node.setdefault(char, {})
+            # Each node keeps a few entries so suggestions never need a subtree walk
+            ids = node.setdefault("$", [])
+            if entry_id not in ids and len(ids) < 10:
+                ids.append(entry_id)
+
+    def load_csv(self, path: str) -> int:
+        """
+        Load a gazetteer or address file
+
+        Columns: name, aliases ("|"-separated), latitude, longitude, kind
+
+        Returns:
+            int: Number of entries loaded
+        """
+        loaded = 0
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                try:
+                    latitude, longitude = float(row["latitude"]), float(row["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                aliases = [alias for alias in (row.get("aliases") or "").split("|") if alias.strip()]
+                self.add(row["name"], latitude, longitude, row.get("kind") or "place", aliases)
+                loaded += 1
+        return loaded
+
+    def _spatial_bias(self, entry: GazetteerEntry, near: Optional[Tuple[float, float]]) -> float:
+        origin = near or self.center
+        distance = haversine_km(origin[0], origin[1], entry.latitude, entry.longitude)
+        return 0.85 + 0.15 * math.exp(-distance / self.radius_km)
+
+    def _candidates(self, text: str) -> Tuple[Dict[int, float], bool]:
+        """Scores per entry, and whether they come from exact phrase hits"""
+        tokens = clean(text).split()
+        if not tokens:
+            return {}, False
+        cleaned = " ".join(tokens)
+        scores: Dict[int, float] = {}
+
+        # Exact phrase hits, longest n-grams first
+        for size in range(min(6, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                phrase = " ".join(tokens[start:start + size])
+                for entry_id in self._exact.get(phrase, ()):
+                    score = 0.9 + 0.1 * len(phrase) / len(cleaned)
+                    scores[entry_id] = max(scores.get(entry_id, 0.0), score)
+        if scores:
+            return scores, True
+
+        # Fuzzy: share of each name's trigrams found in the query, blended with Dice similarity
+        query_grams = trigrams(cleaned)
+        counts: Dict[int, int] = {}
+        for gram in query_grams:
+            postings = self._postings.get(gram)
+            if postings is None or len(postings) > MAX_POSTINGS:
+                continue
+            for variant_id in postings:
+                counts[variant_id] = counts.get(variant_id, 0) + 1
+
+        for variant_id, common in counts.items():
+            entry_id, gram_count = self._variants[variant_id]
+            coverage = common / gram_count
+            if coverage < 0.5:
+                continue
+            dice = 2 * common / (gram_count + len(query_grams))
+            score = 0.6 * coverage + 0.3 * dice
+            scores[entry_id] = max(scores.get(entry_id, 0.0), score)
+        return scores, False
+
+    def geocode(
+        self,
+        text: str,
+        limit: int = 5,
+        near: Optional[Tuple[float, float]] = None,
+        min_score: float = 0.5
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolve free-text location to ranked gazetteer matches
+
+        Args:
+            text: Location as spoken or typed, e.g. "near India Gate"
+            limit: Maximum number of matches
+            near: Optional (lat, lon) to bias toward instead of the service centre
+            min_score: Matches scoring below this are dropped
+
+        Returns:
+            List of matches, best first, each with its score and whether it was an exact phrase hit
+        """
+        candidates, exact = self._candidates(text)
+        ranked = []
+        for entry_id, score in candidates.items():
+            entry = self.entries[entry_id]
+            final = score * self._spatial_bias(entry, near)
+            if final >= min_score:
+                ranked.append((final, entry))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [self._as_dict(entry, score, exact) for score, entry in ranked[:limit]]
+
+    def resolve(self, text: str, min_score: float = AUTOFILL_MIN_SCORE) -> Optional[Dict[str, Any]]:
+        """
+        Best match for a location string if it is confident enough to use unchecked, or None
+
+        Candidates for a person to pick from come from geocode() with its lower cutoff.
+        """
+        if not text:
+            return None
+        matches = self.geocode(text, limit=1, min_score=min_score)
+        return matches[0] if matches else None
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Autocomplete entries whose name or alias starts with prefix"""
+        node = self._trie
+        for char in clean(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        return [self._as_dict(self.entries[entry_id]) for entry_id in node.get("$", [])[:limit]]
+
+    @staticmethod
+    def _as_dict(entry: GazetteerEntry, score: Optional[float] = None, exact: bool = False) -> Dict[str, Any]:
+        result = {
+            "name": entry.name,
+            "latitude": entry.latitude,
+            "longitude": entry.longitude,
+            "kind": entry.kind
+        }
+        if score is not None:
+            result["score"] = round(score, 3)
+            result["exact"] = exact
+        return result
+
+
+def point_of(record: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    Coordinates of an emergency-like record
+
+    Uses top-level latitude/longitude, then a location dict carrying them,
+    then geocodes the location (or its address) text; weak matches
+    (below AUTOFILL_MIN_SCORE) count as no location.
+    """
+    location = record.get("location")
+    for source in (record, location if isinstance(location, dict) else {}):
+        if source.get("latitude") is not None and source.get("longitude") is not None:
+            try:
+                return float(source["latitude"]), float(source["longitude"])
+            except (TypeError, ValueError):
+                pass
+    text = location.get("address") if isinstance(location, dict) else location
+    match = geocoder.resolve(str(text)) if text else None
+    return (match["latitude"], match["longitude"]) if match else None
+
+
+def _load_default() -> GazetteerGeocoder:
+    geocoder = GazetteerGeocoder()
+    path = os.getenv("SARS_GAZETTEER_PATH", str(DEFAULT_GAZETTEER))
+    try:
+        count = geocoder.load_csv(path)
+        print(f"✅ Gazetteer loaded: {count} places from {path}")
+    except FileNotFoundError:
+        print(f"⚠️ Gazetteer not found at {path}. Geocoding will return no matches.")
+    return geocoder
+
+
+# Singleton instance
+geocoder = _load_default()
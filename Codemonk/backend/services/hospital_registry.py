@@ -0,0 +1,285 @@
+import os
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from services.geo import haversine_km
+from services.state_store import state_store
+from services.event_bus import event_bus
+
+DEFAULT_HOSPITALS = Path(__file__).resolve().parent.parent / "data" / "hospitals.json"
+
+# Collection holding hospital records in the shared state backend
+HOSPITALS = "hospitals"
+
+# Grid cell size in degrees (~5.5 km north-south around Delhi)
+CELL_DEG = 0.05
+
+# Travel-time estimate used for ranking until live ETAs are available
+ROAD_FACTOR = 1.4
+AVERAGE_SPEED_KMH = 25.0
+
+# Ranking penalties, in minutes of extra travel
+LOAD_PENALTY_MINUTES = 15.0
+MISSING_SPECIALTY_MINUTES = 20.0
+NO_ICU_MINUTES = 15.0
+
+# Keywords in special_requirements / emergency_type mapped to hospital specialties
+SPECIALTY_KEYWORDS = {
+    "cardiac": ("cardiac", "heart", "defibrillator", "chest pain", "ecg"),
+    "stroke": ("stroke", "paralysis"),
+    "trauma": ("trauma", "accident", "multiple units", "fracture", "bleeding", "injur", "fall"),
+    "burns": ("burn", "fire"),
+    "respiratory": ("respiratory", "breath", "oxygen", "ventilat", "asthma"),
+    "pediatric": ("pediatric", "paediatric", "child", "infant"),
+    "maternity": ("maternity", "pregnan", "labour", "labor", "obstetric", "delivery"),
+}
+ICU_KEYWORDS = ("critical care", "icu", "ventilator")
+
+CAPACITY_FIELDS = ("beds_total", "beds_available", "icu_total", "icu_available", "diverting")
+
+
+def specialties_for(requirements: Iterable[str], emergency_type: str = "") -> Tuple[Set[str], bool]:
+    """
+    Map extracted special_requirements and emergency_type to hospital specialties
+
+    Returns:
+        (specialties, needs_icu)
+    """
+    text = " ".join([*(str(r) for r in requirements), emergency_type or ""]).lower()
+    specialties = {
+        specialty
+        for specialty, keywords in SPECIALTY_KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    }
+    return specialties, any(keyword in text for keyword in ICU_KEYWORDS)
+
+
+def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / CELL_DEG), math.floor(longitude / CELL_DEG)
+
+
+def _ring_cells(row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+    """Cells at exactly `ring` steps (Chebyshev distance) from (row, col)"""
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+
+class _Hospital:
+    __slots__ = ("record", "latitude", "longitude", "specialties", "cell", *CAPACITY_FIELDS, "version")
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.latitude = float(record["latitude"])
+        self.longitude = float(record["longitude"])
+        self.specialties = frozenset(s.lower() for s in record.get("specialties", []))
+        self.cell = _cell(self.latitude, self.longitude)
+        self.version = 0
+        self.apply(record)
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        self.beds_total = int(record.get("beds_total") or 0)
+        self.beds_available = int(record.get("beds_available") or 0)
+        self.icu_total = int(record.get("icu_total") or 0)
+        self.icu_available = int(record.get("icu_available") or 0)
+        self.diverting = bool(record.get("diverting", False))
+        self.version = record.get("version") or self.version
+
+    @property
+    def occupancy(self) -> float:
+        if self.beds_total <= 0:
+            return 1.0
+        return min(1.0, max(0.0, 1 - self.beds_available / self.beds_total))
+
+    @property
+    def accepting(self) -> bool:
+        return not self.diverting and self.beds_available > 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            **self.record,
+            **{field: getattr(self, field) for field in CAPACITY_FIELDS},
+            "version": self.version,
+            "occupancy": round(self.occupancy, 3)
+        }
+
+
+class HospitalRegistry:
+    """
+    In-memory hospital index backed by the shared state store.
+
+    Static data (location, specialties) is bucketed into a lat/lon grid so a
+    recommendation only scores hospitals in the rings of cells around the
+    patient. Capacity counters live on each entry and are overwritten in
+    O(1) by capacity reports; other workers pick the same report up from
+    the event bus.
+    """
+
+    def __init__(self):
+        self._hospitals: Dict[str, _Hospital] = {}
+        self._grid: Dict[Tuple[int, int], List[str]] = {}
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> int:
+        for record in records:
+            self.add(record)
+        return len(self._hospitals)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        hospital_id = record["id"]
+        if hospital_id in self._hospitals:
+            self._grid[self._hospitals[hospital_id].cell].remove(hospital_id)
+        hospital = _Hospital(record)
+        self._hospitals[hospital_id] = hospital
+        self._grid.setdefault(hospital.cell, []).append(hospital_id)
+
+    def get(self, hospital_id: str) -> Optional[Dict[str, Any]]:
+        hospital = self._hospitals.get(hospital_id)
+        return hospital.as_dict() if hospital else None
+
+    def list(self, specialty: Optional[str] = None) -> List[Dict[str, Any]]:
+        specialty = specialty.lower() if specialty else None
+        return [
+            hospital.as_dict()
+            for hospital in self._hospitals.values()
+            if specialty is None or specialty in hospital.specialties
+        ]
+
+    def update_capacity(self, hospital_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Apply a capacity report and share it with every worker
+
+        Args:
+            hospital_id: Hospital to update
+            changes: Any of beds_total, beds_available, icu_total, icu_available, diverting
+
+        Returns:
+            Updated hospital, or None if it is not registered
+        """
+        hospital = self._hospitals.get(hospital_id)
+        if hospital is None:
+            return None
+        current = {field: getattr(hospital, field) for field in CAPACITY_FIELDS}
+        record = state_store.put(HOSPITALS, hospital_id, {**hospital.record, **current, **changes})
+        hospital.apply(record)
+        event_bus.publish("hospital.capacity", {
+            "id": hospital_id,
+            "version": record["version"],
+            **{field: record.get(field) for field in CAPACITY_FIELDS}
+        })
+        return hospital.as_dict()
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener keeping capacity counters in sync across workers"""
+        if topic != "hospital.capacity":
+            return
+        hospital = self._hospitals.get(data.get("id"))
+        if hospital is not None and (data.get("version") or 0) > hospital.version:
+            hospital.apply(data)
+
+    def _nearby(self, latitude: float, longitude: float, radius_km: float) -> Iterable[_Hospital]:
+        """Yield hospitals ring by ring outward from the patient's cell"""
+        row, col = _cell(latitude, longitude)
+        # Longitude cells shrink with latitude; size the search by the narrower side
+        cell_km = CELL_DEG * 111.32 * max(0.1, math.cos(math.radians(latitude)))
+        max_ring = int(radius_km / cell_km) + 1
+        grid = self._grid
+        for ring in range(max_ring + 1):
+            for cell in _ring_cells(row, col, ring):
+                for hospital_id in grid.get(cell, ()):
+                    yield self._hospitals[hospital_id]
+
+    def recommend(
+        self,
+        latitude: float,
+        longitude: float,
+        requirements: Iterable[str] = (),
+        emergency_type: str = "",
+        limit: int = 3,
+        radius_km: float = 25.0
+    ) -> Dict[str, Any]:
+        """
+        Rank destination hospitals for an emergency
+
+        Lower score is better: estimated travel minutes plus penalties for
+        load, missing specialties and no free ICU bed when one is needed.
+        Diverting or full hospitals are only offered if nothing else is in range.
+
+        Args:
+            latitude: Patient latitude
+            longitude: Patient longitude
+            requirements: Extracted special_requirements
+            emergency_type: Extracted emergency type
+            limit: Number of hospitals to return
+            radius_km: Search radius
+
+        Returns:
+            Dict with the required specialties and ranked hospitals
+        """
+        required, needs_icu = specialties_for(requirements, emergency_type)
+        accepting, fallback = [], []
+
+        for hospital in self._nearby(latitude, longitude, radius_km):
+            distance = haversine_km(latitude, longitude, hospital.latitude, hospital.longitude)
+            if distance > radius_km:
+                continue
+            missing = required - hospital.specialties
+            eta_minutes = distance * ROAD_FACTOR / AVERAGE_SPEED_KMH * 60
+            score = (
+                eta_minutes
+                + LOAD_PENALTY_MINUTES * hospital.occupancy ** 2
+                + MISSING_SPECIALTY_MINUTES * len(missing)
+                + (NO_ICU_MINUTES if needs_icu and hospital.icu_available <= 0 else 0.0)
+            )
+            candidate = (score, distance, eta_minutes, missing, hospital)
+            (accepting if hospital.accepting else fallback).append(candidate)
+
+        ranked = sorted(accepting or fallback, key=lambda item: item[0])[:limit]
+        return {
+            "required_specialties": sorted(required),
+            "needs_icu": needs_icu,
+            "hospitals": [
+                {
+                    "id": hospital.record["id"],
+                    "name": hospital.record["name"],
+                    "address": hospital.record.get("address"),
+                    "latitude": hospital.latitude,
+                    "longitude": hospital.longitude,
+                    "distance_km": round(distance, 2),
+                    "eta_minutes": round(eta_minutes, 1),
+                    "matched_specialties": sorted(required & hospital.specialties),
+                    "missing_specialties": sorted(missing),
+                    "beds_available": hospital.beds_available,
+                    "icu_available": hospital.icu_available,
+                    "occupancy": round(hospital.occupancy, 3),
+                    "diverting": hospital.diverting,
+                    "score": round(score, 2)
+                }
+                for score, distance, eta_minutes, missing, hospital in ranked
+            ]
+        }
+
+
+def _load_default() -> HospitalRegistry:
+    registry = HospitalRegistry()
+    path = os.getenv("SARS_HOSPITALS_PATH", str(DEFAULT_HOSPITALS))
+    try:
+        with open(path, encoding="utf-8") as handle:
+            state_store.seed(HOSPITALS, json.load(handle))
+    except FileNotFoundError:
+        print(f"⚠️ Hospital seed file not found at {path}")
+    # Load from the store so capacity reported before a restart is kept
+    count = registry.load(state_store.values(HOSPITALS))
+    print(f"✅ Hospital registry loaded: {count} hospitals")
+    event_bus.add_listener(registry.on_event)
+    return registry
+
+
+# Singleton instance
+hospital_registry = _load_default()
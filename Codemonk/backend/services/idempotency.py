@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when an Idempotency-Key is replayed with a different request body"""
+
+
+class IdempotencyStore:
+    """
+    Bounded, TTL-evicted store of completed responses keyed by Idempotency-Key.
+
+    Every entry lives for the same TTL, so insertion order is also expiry
+    order: expired entries are always at the front and are evicted in O(1)
+    each. Lookups are a single dict access. A request arriving while the
+    first request with the same key is still running waits for it instead
+    of re-executing side effects (new DSP- ids, Twilio messages).
+
+    The store is per process; with several workers a retry that lands on
+    another worker is only deduplicated if that worker saw the key too.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, fingerprint, response)
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.stats = {"executed": 0, "replayed": 0, "joined": 0, "evicted": 0}
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Hash the parts of a request that must match on replay"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode())
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, (expires_at, _, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                return
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def _lookup(self, key: str, fingerprint: str, now: float) -> Optional[Tuple[Any]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            return None
+        if entry[1] != fingerprint:
+            raise IdempotencyKeyReused(key)
+        return (entry[2],)
+
+    async def execute(
+        self,
+        key: Optional[str],
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run a handler at most once per idempotency key
+
+        Args:
+            key: Idempotency-Key header value (None runs the handler normally)
+            fingerprint: Request fingerprint from fingerprint()
+            handler: Coroutine function producing the response
+
+        Returns:
+            (response, replayed) where replayed is True if the response was stored earlier
+        """
+        if not key:
+            return await handler(), False
+
+        now = time.monotonic()
+        self._evict(now)
+
+        cached = self._lookup(key, fingerprint, now)
+        if cached is not None:
+            self.stats["replayed"] += 1
+            return cached[0], True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if inflight[0] != fingerprint:
+                raise IdempotencyKeyReused(key)
+            self.stats["joined"] += 1
+            return await asyncio.shield(inflight[1]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (fingerprint, future)
+        try:
+            response = await handler()
+        except BaseException as e:
+            # Failures are not stored, so the client may retry with the same key
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved so an unawaited failure doesn't log a warning
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self.stats["executed"] += 1
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, fingerprint, response)
+        self._evict(time.monotonic())
+        future.set_result(response)
+        return response, False
+
+
+# Singleton instance
+idempotency_store = IdempotencyStore(
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+)
@@ -0,0 +1,260 @@
+import os
+import copy
+import math
+import time
+import hashlib
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple
+from services.geo import haversine_km
+from services.geocoder import normalize, point_of, STOPWORDS
+from services.hospital_registry import specialties_for
+
+# Free-text fields compared between reports of the same incident
+TEXT_FIELDS = ("transcript", "transcription", "description", "notes", "symptoms")
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    return frozenset(token for token in normalize(text).split() if token not in STOPWORDS and len(token) > 1)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class IncidentReport:
+    """What the index compares: where, when, what kind and what was said"""
+    __slots__ = ("point", "at", "category", "tokens")
+
+    def __init__(self, point: Tuple[float, float], at: float, category: str, tokens: FrozenSet[str]):
+        self.point = point
+        self.at = at
+        self.category = category
+        self.tokens = tokens
+
+
+class _Incident:
+    __slots__ = ("id", "report", "bucket")
+
+    def __init__(self, incident_id: str, report: IncidentReport, bucket: Tuple[int, int, int, str]):
+        self.id = incident_id
+        self.report = report
+        self.bucket = bucket
+
+
+class IncidentIndex:
+    """
+    Incremental clustering of emergency reports into incidents.
+
+    Open incidents are bucketed by (grid row, grid column, time window,
+    category), with cells about `radius_km` wide and windows `window_seconds`
+    long. A new report only looks at the 3x3 cells around it in its own and
+    the neighbouring windows, so matching costs the same whether there are ten
+    or ten thousand open incidents. A candidate matches when it is within
+    the radius and window, in the same category, and - if both reports
+    carry text - similar enough by token Jaccard. Windows older than that
+    are evicted as time advances, keeping the index bounded.
+
+    The index is per process and fed from the event bus; two reports of the
+    same incident landing on different workers within one poll interval can
+    still both be created.
+    """
+
+    def __init__(self, radius_km: float = 0.5, window_seconds: float = 900.0, min_similarity: float = 0.25):
+        self.radius_km = radius_km
+        self.window_seconds = window_seconds
+        self.min_similarity = min_similarity
+        self.cell_deg = radius_km / 111.32
+        self._buckets: Dict[Tuple[int, int, int, str], List[_Incident]] = {}
+        self._incidents: Dict[str, _Incident] = {}
+        self._bucket_order: Deque[Tuple[int, Tuple[int, int, int, str]]] = deque()
+        self.stats = {"matched": 0, "added": 0, "evicted": 0}
+
+    def describe(self, record: Dict[str, Any], at: Optional[float] = None) -> Optional[IncidentReport]:
+        """Build the comparable form of an emergency, or None if it cannot be located"""
+        point = point_of(record)
+        if point is None:
+            return None
+        specialties, _ = specialties_for([], record.get("emergency_type") or "")
+        category = ",".join(sorted(specialties)) or normalize(record.get("emergency_type") or "unknown")
+        parts = []
+        for field in TEXT_FIELDS:
+            value = record.get(field)
+            if isinstance(value, list):
+                parts.extend(str(item) for item in value)
+            elif value:
+                parts.append(str(value))
+        return IncidentReport(point, at if at is not None else _epoch(record.get("created_at")), category, tokenize(" ".join(parts)))
+
+    def _window(self, at: float) -> int:
+        return int(at // self.window_seconds)
+
+    def _bucket(self, report: IncidentReport) -> Tuple[int, int, int, str]:
+        return (
+            math.floor(report.point[0] / self.cell_deg),
+            math.floor(report.point[1] / self.cell_deg),
+            self._window(report.at),
+            report.category
+        )
+
+    def match(self, report: IncidentReport) -> Optional[str]:
+        """Id of the open incident this report most likely belongs to, or None"""
+        self._evict(report.at)
+        row, col, window, category = self._bucket(report)
+        best: Optional[Tuple[float, float, str]] = None
+
+        for w in (window - 1, window, window + 1):
+            for r in (row - 1, row, row + 1):
+                for c in (col - 1, col, col + 1):
+                    for incident in self._buckets.get((r, c, w, category), ()):
+                        other = incident.report
+                        if abs(report.at - other.at) > self.window_seconds:
+                            continue
+                        distance = haversine_km(report.point[0], report.point[1], other.point[0], other.point[1])
+                        if distance > self.radius_km:
+                            continue
+                        if report.tokens and other.tokens:
+                            similarity = jaccard(report.tokens, other.tokens)
+                            if similarity < self.min_similarity:
+                                continue
+                        elif distance > self.radius_km / 2:
+                            # Nothing to compare; only accept very close reports
+                            continue
+                        else:
+                            similarity = 0.0
+                        candidate = (similarity, -distance, incident.id)
+                        if best is None or candidate > best:
+                            best = candidate
+
+        if best is not None:
+            self.stats["matched"] += 1
+            return best[2]
+        return None
+
+    def add(self, incident_id: str, report: IncidentReport) -> None:
+        if incident_id in self._incidents:
+            return
+        self._insert(incident_id, report)
+        self.stats["added"] += 1
+
+    def _insert(self, incident_id: str, report: IncidentReport) -> None:
+        bucket = self._bucket(report)
+        entries = self._buckets.get(bucket)
+        if entries is None:
+            entries = self._buckets[bucket] = []
+            self._bucket_order.append((bucket[2], bucket))
+        incident = _Incident(incident_id, report, bucket)
+        entries.append(incident)
+        self._incidents[incident_id] = incident
+        self._evict(report.at)
+
+    def add_record(self, record: Dict[str, Any]) -> None:
+        report = self.describe(record)
+        if report is not None:
+            self.add(record["id"], report)
+
+    def attach(self, incident_id: str, report: IncidentReport) -> None:
+        """Fold a new report into an incident so a long-running burst keeps matching it"""
+        incident = self._incidents.get(incident_id)
+        if incident is None:
+            return
+        merged = IncidentReport(
+            incident.report.point,
+            max(incident.report.at, report.at),
+            incident.report.category,
+            incident.report.tokens | report.tokens
+        )
+        self.remove(incident_id)
+        self._insert(incident_id, merged)
+
+    def remove(self, incident_id: str) -> None:
+        incident = self._incidents.pop(incident_id, None)
+        if incident is None:
+            return
+        entries = self._buckets.get(incident.bucket)
+        if entries is not None:
+            entries.remove(incident)
+
+    def _evict(self, now: float) -> None:
+        # Buckets are appended roughly in time order, so expired ones sit at the front
+        oldest_kept = self._window(now) - 2
+        while self._bucket_order and self._bucket_order[0][0] < oldest_kept:
+            _, bucket = self._bucket_order.popleft()
+            for incident in self._buckets.pop(bucket, ()):
+                self._incidents.pop(incident.id, None)
+                self.stats["evicted"] += 1
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener keeping the index in sync across workers"""
+        if topic == "emergency.created" and data.get("id"):
+            self.add_record(data)
+        elif topic == "emergency.imported":
+            # Only open rows recent enough to be matched; historical imports would never be evicted in order
+            oldest = time.time() - 2 * self.window_seconds
+            for record in data.get("records") or []:
+                if record.get("status") not in ("resolved", "closed") and _epoch(record.get("created_at")) >= oldest:
+                    self.add_record(record)
+        elif topic == "emergency.closed" or (topic == "emergency.updated" and data.get("status") in ("resolved", "closed")):
+            self.remove(data.get("id"))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"open_incidents": len(self._incidents), "buckets": len(self._buckets), **self.stats}
+
+
+class ExtractionCache:
+    """
+    Recent extraction results keyed by normalized transcript, so a
+    re-upload of the same call skips the LLM.
+
+    Only an exact match after normalization (case, punctuation, spacing)
+    is reused. A merely similar transcript may come from a different
+    caller, and its patient name, phone, age and location must never be
+    copied into a new emergency, so it is always extracted again.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # digest -> (expires_at, result), oldest first
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha256(normalize(text).encode()).hexdigest()
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        entry = self._entries.get(self._digest(text))
+        if entry is None or entry[0] <= now:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, text: str, result: Dict[str, Any]) -> None:
+        digest = self._digest(text)
+        self._entries.pop(digest, None)
+        self._entries[digest] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(result))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Singleton instances
+incident_index = IncidentIndex(
+    radius_km=float(os.getenv("INCIDENT_RADIUS_KM", "0.5")),
+    window_seconds=float(os.getenv("INCIDENT_WINDOW_SECONDS", "900")),
+    min_similarity=float(os.getenv("INCIDENT_MIN_SIMILARITY", "0.25"))
+)
+extraction_cache = ExtractionCache(ttl_seconds=float(os.getenv("INCIDENT_WINDOW_SECONDS", "900")))
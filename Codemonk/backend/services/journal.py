@@ -0,0 +1,296 @@
+import os
+import time
+import bisect
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single process assumed
+    fcntl = None
+
+SEGMENT_SUFFIX = ".log"
+SNAPSHOT_PREFIX = "snapshot-"
+
+# One (offset, byte position) mark per this many entries lets readers seek into a segment
+SPARSE_EVERY = 1024
+
+
+class JournalLocked(Exception):
+    """Raised when another process already writes to the journal directory"""
+
+
+class Journal:
+    """
+    Segmented, append-only journal of state changes.
+
+    Each entry is one JSON line with a global, gap-free offset. Segments are
+    named after their first offset and rolled at `segment_bytes`, so a reader
+    finds the segment for any offset with a binary search. Appends go to the
+    page cache immediately and a background thread fsyncs at most every
+    `fsync_interval` seconds (group commit), which bounds how much a crash can
+    lose without paying an fsync per request.
+
+    Snapshots are written atomically (temp file + rename). Segments wholly
+    covered by the latest snapshot are deleted, except the newest
+    `retain_segments`, which stay readable for consumers.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync_interval: float = 0.05,
+        retain_segments: int = 4
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.retain_segments = max(1, retain_segments)
+        self._lock = threading.Lock()
+        self._lock_file = self._acquire_directory_lock()
+
+        self._segments: List[int] = sorted(
+            int(path.stem) for path in self.directory.glob(f"*{SEGMENT_SUFFIX}") if path.stem.isdigit()
+        )
+        self.last_offset = self._recover_tail()
+        snapshot_offset = self.latest_snapshot_offset()
+        if snapshot_offset > self.last_offset:
+            # Segments were pruned past the snapshot; keep offsets monotonic
+            self.last_offset = snapshot_offset
+        if not self._segments:
+            self._segments.append(self.last_offset + 1)
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+        self._size = self._file.tell()
+        # segment first offset -> [(offset, byte position)], built on append or first read
+        self._sparse: Dict[int, List[Tuple[int, int]]] = {}
+        if self._size == 0:
+            self._sparse[self._segments[-1]] = []
+        self._dirty = False
+        self.stats = {"appended": 0, "fsyncs": 0, "snapshots": 0, "segments_deleted": 0}
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-fsync", daemon=True)
+        self._flusher.start()
+
+    def _acquire_directory_lock(self):
+        handle = open(self.directory / "LOCK", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                raise JournalLocked(f"{self.directory} is in use by another process")
+        return handle
+
+    def _segment_path(self, first_offset: int) -> Path:
+        return self.directory / f"{first_offset:020d}{SEGMENT_SUFFIX}"
+
+    def _recover_tail(self) -> int:
+        """Find the last complete entry, truncating a torn write left by a crash"""
+        while self._segments:
+            path = self._segment_path(self._segments[-1])
+            data = path.read_bytes()
+            good = data.rfind(b"\n") + 1
+            last_offset = None
+            # Walk back over any trailing lines that do not parse
+            while good > 0:
+                start = data.rfind(b"\n", 0, good - 1) + 1
+                try:
+                    last_offset = orjson.loads(data[start:good])["offset"]
+                    break
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    good = start
+            if good < len(data):
+                with open(path, "r+b") as handle:
+                    handle.truncate(good)
+            if last_offset is not None:
+                return last_offset
+            if len(self._segments) == 1:
+                return self._segments[0] - 1
+            path.unlink()
+            self._segments.pop()
+        return 0
+
+    def append(self, op: str, collection: str, key: Optional[str], data: Any = None) -> int:
+        """Append one entry and return its offset (durable after the next group fsync)"""
+        with self._lock:
+            offset = self.last_offset + 1
+            line = orjson.dumps({
+                "offset": offset,
+                "ts": round(time.time(), 3),
+                "op": op,
+                "collection": collection,
+                "key": key,
+                "data": data
+            }) + b"\n"
+            if self._size + len(line) > self.segment_bytes and self._size > 0:
+                self._roll(offset)
+            if offset % SPARSE_EVERY == 0 and self._segments[-1] in self._sparse:
+                self._sparse[self._segments[-1]].append((offset, self._size))
+            self._file.write(line)
+            self._size += len(line)
+            self.last_offset = offset
+            self._dirty = True
+            self.stats["appended"] += 1
+            return offset
+
+    def _roll(self, first_offset: int) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._segments.append(first_offset)
+        self._file = open(self._segment_path(first_offset), "ab")
+        self._size = 0
+        self._sparse[first_offset] = []
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered entries and fsync them"""
+        with self._lock:
+            if not self._dirty or self._file.closed:
+                return
+            self._file.flush()
+            self._dirty = False
+            # fsync a duplicate descriptor outside the lock so appends keep flowing
+            fd = os.dup(self._file.fileno())
+        try:
+            os.fsync(fd)
+            self.stats["fsyncs"] += 1
+        finally:
+            os.close(fd)
+
+    def read(self, after: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Entries with offset > after, oldest first"""
+        return list(self._iter(after, limit))
+
+    def replay(self, after: int = 0) -> Iterator[Dict[str, Any]]:
+        """All entries with offset > after (used for recovery)"""
+        return self._iter(after, None)
+
+    def _iter(self, after: int, limit: Optional[int]) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+            segments = list(self._segments)
+            last_offset = self.last_offset
+        index = max(0, bisect.bisect_right(segments, after + 1) - 1)
+        produced = 0
+        for first_offset in segments[index:]:
+            path = self._segment_path(first_offset)
+            try:
+                handle = open(path, "rb")
+            except FileNotFoundError:
+                # Pruned by a snapshot while we were reading
+                continue
+            with handle:
+                marks = self._sparse.get(first_offset)
+                if marks is None:
+                    marks = self._build_sparse(handle)
+                    self._sparse.setdefault(first_offset, marks)
+                mark = bisect.bisect_right(marks, (after + 1, float("inf"))) - 1
+                handle.seek(marks[mark][1] if mark >= 0 else 0)
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    entry = orjson.loads(line)
+                    if entry["offset"] <= after:
+                        continue
+                    if entry["offset"] > last_offset:
+                        return
+                    yield entry
+                    produced += 1
+                    if limit is not None and produced >= limit:
+                        return
+
+    @staticmethod
+    def _build_sparse(handle) -> List[Tuple[int, int]]:
+        marks = []
+        position = 0
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break
+            if line.startswith(b'{"offset":'):
+                offset = int(line[10:line.index(b",")])
+                if offset % SPARSE_EVERY == 0:
+                    marks.append((offset, position))
+            position += len(line)
+        return marks
+
+    def oldest_offset(self) -> int:
+        with self._lock:
+            return self._segments[0] if self._segments else self.last_offset + 1
+
+    def write_snapshot(self, offset: int, state: Dict[str, Any]) -> Path:
+        """Atomically write a snapshot of state as of offset, then prune covered segments"""
+        path = self.directory / f"{SNAPSHOT_PREFIX}{offset:020d}.json"
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as handle:
+            handle.write(orjson.dumps({"offset": offset, "created_at": time.time(), "state": state}))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, path)
+        self.stats["snapshots"] += 1
+
+        for old in self.directory.glob(f"{SNAPSHOT_PREFIX}*.json"):
+            if old != path:
+                old.unlink(missing_ok=True)
+        self._prune(offset)
+        return path
+
+    def _prune(self, snapshot_offset: int) -> None:
+        with self._lock:
+            removable = []
+            # A segment is covered when the next one starts at or before the snapshot
+            for index, first_offset in enumerate(self._segments[:-1]):
+                if self._segments[index + 1] <= snapshot_offset + 1:
+                    removable.append(first_offset)
+            removable = removable[:max(0, len(self._segments) - self.retain_segments)]
+            for first_offset in removable:
+                self._segments.remove(first_offset)
+                self._sparse.pop(first_offset, None)
+        for first_offset in removable:
+            self._segment_path(first_offset).unlink(missing_ok=True)
+            self.stats["segments_deleted"] += 1
+
+    def latest_snapshot_offset(self) -> int:
+        offsets = [
+            int(path.stem[len(SNAPSHOT_PREFIX):])
+            for path in self.directory.glob(f"{SNAPSHOT_PREFIX}*.json")
+            if path.stem[len(SNAPSHOT_PREFIX):].isdigit()
+        ]
+        return max(offsets, default=0)
+
+    def load_snapshot(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Return (offset, state) of the latest snapshot, or (0, None)"""
+        offset = self.latest_snapshot_offset()
+        if not offset:
+            return 0, None
+        path = self.directory / f"{SNAPSHOT_PREFIX}{offset:020d}.json"
+        snapshot = orjson.loads(path.read_bytes())
+        return snapshot["offset"], snapshot["state"]
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = len(self._segments)
+        return {
+            "directory": str(self.directory),
+            "last_offset": self.last_offset,
+            "oldest_offset": self.oldest_offset(),
+            "segments": segments,
+            "snapshot_offset": self.latest_snapshot_offset(),
+            **self.stats
+        }
+
+    def close(self) -> None:
+        self._closed.set()
+        self.flush()
+        with self._lock:
+            self._file.close()
+        self._lock_file.close()
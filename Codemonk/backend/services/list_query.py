@@ -0,0 +1,177 @@
+import base64
+import hashlib
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from services.state_store import state_store
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def utc_now() -> str:
+    """Current UTC time as a fixed-width ISO 8601 string (sorts lexicographically)"""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def parse_timestamp(value: Optional[str], param: str) -> Optional[str]:
+    """Normalize a time filter to the same format as utc_now()"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {param}: expected ISO 8601 timestamp")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def encode_cursor(position: int) -> str:
+    return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def project(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def list_etag(collection: str, version: int, request: Request) -> str:
+    """Weak ETag derived from the collection version and the query parameters"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.md5(query.encode()).hexdigest()[:12]
+    return f'W/"{collection}-{version}-{digest}"'
+
+
+def record_filter(
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None
+) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Predicate for the status and time filters shared by list and export endpoints
+
+    Args:
+        status: Comma-separated statuses to keep
+        created_after: Keep records created at or after this ISO timestamp
+        created_before: Keep records created before this ISO timestamp
+    """
+    statuses = set(status.split(",")) if status else None
+    after_ts = parse_timestamp(created_after, "created_after")
+    before_ts = parse_timestamp(created_before, "created_before")
+
+    def matches(record: Dict[str, Any]) -> bool:
+        if statuses is not None and record.get("status") not in statuses:
+            return False
+        if after_ts or before_ts:
+            created_at = record.get("created_at")
+            if created_at is None:
+                return False
+            if after_ts and created_at < after_ts:
+                return False
+            if before_ts and created_at >= before_ts:
+                return False
+        return True
+
+    return matches
+
+
+def list_collection(
+    request: Request,
+    collection: str,
+    items_key: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    since: Optional[int] = None,
+    key_field: str = "id",
+) -> Response:
+    """
+    Serve a list endpoint from the state backend
+
+    Supports cursor pagination, field projection, status/time filters,
+    delta sync (records changed after a collection version) and
+    conditional requests via ETag / If-None-Match. In delta mode a changed
+    record that no longer matches the filters is listed under deleted, so
+    a filtered client view drops it. collection_total counts the whole
+    collection, not the filtered matches.
+
+    Args:
+        request: Incoming request (for query string and If-None-Match)
+        collection: State backend collection to read
+        items_key: Key holding the records in the response body
+        limit: Page size (default 100, max 1000)
+        cursor: Opaque cursor returned as next_cursor by the previous page
+        fields: Comma-separated field names to include in each record
+        status: Comma-separated statuses to keep
+        created_after: Keep records created at or after this ISO timestamp
+        created_before: Keep records created before this ISO timestamp
+        since: Return only records changed after this version (delta mode)
+        key_field: Record field holding its key, reported for records leaving the filtered view
+
+    Returns:
+        ORJSONResponse with ETag header, or an empty 304 response
+    """
+    version = state_store.collection_version(collection)
+    etag = list_etag(collection, version, request)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    projection = parse_fields(fields)
+    matches = record_filter(status, created_after, created_before)
+
+    if since is not None:
+        changed, deleted = state_store.changes_since(collection, since)
+        kept = [record for record in changed if matches(record)]
+        # Changed out of the filtered view (e.g. status moved on): the client must drop it
+        deleted += [record[key_field] for record in changed if not matches(record) and key_field in record]
+        body = {
+            items_key: [project(record, projection) for record in kept],
+            "deleted": deleted,
+            "version": version,
+            "delta": True,
+        }
+        return ORJSONResponse(content=body, headers={"ETag": etag})
+
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    items: List[Dict[str, Any]] = []
+    next_cursor = None
+    last_position = 0
+    for position, record in state_store.iter_records(collection, after=decode_cursor(cursor), batch_size=page_size):
+        if not matches(record):
+            continue
+        if len(items) == page_size:
+            # One more match exists, so there is a next page starting after the last item
+            next_cursor = encode_cursor(last_position)
+            break
+        items.append(project(record, projection))
+        last_position = position
+
+    body = {
+        items_key: items,
+        "collection_total": state_store.count(collection),
+        "next_cursor": next_cursor,
+        "version": version,
+    }
+    return ORJSONResponse(content=body, headers={"ETag": etag})
@@ -0,0 +1,307 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+from services.geo import haversine_km
+from services.hospital_registry import ROAD_FACTOR
+from services.eta_model import eta_model
+
+# Points drawn along a stand-in route leg
+LOCAL_ROUTE_POINTS = 32
+
+
+class UpstreamError(Exception):
+    """Routing/traffic provider failed or rejected the request"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class TomTomUpstream:
+    """TomTom Routing and Traffic Flow APIs; the API key never leaves the backend"""
+
+    name = "tomtom"
+
+    def __init__(self, api_key: str, base_url: str = "https://api.tomtom.com", timeout: float = 10.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    async def _get(self, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        try:
+            response = await self._http().get(path, params={**params, "key": self.api_key})
+        except httpx.HTTPError as e:
+            raise UpstreamError(502, f"TomTom request failed: {e}")
+        if response.status_code >= 400:
+            raise UpstreamError(400 if response.status_code < 500 else 502, f"TomTom returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def route(self, waypoints: List[Tuple[float, float]], route_type: str, travel_mode: str) -> Dict[str, Any]:
+        locations = ":".join(f"{lat},{lon}" for lat, lon in waypoints)
+        return await self._get(
+            f"/routing/1/calculateRoute/{locations}/json",
+            {"traffic": "true", "routeType": route_type, "travelMode": travel_mode}
+        )
+
+    async def traffic_flow(self, point: Tuple[float, float], zoom: int) -> Dict[str, Any]:
+        return await self._get(
+            f"/traffic/services/4/flowSegmentData/absolute/{zoom}/json",
+            {"point": f"{point[0]},{point[1]}"}
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalUpstream:
+    """
+    Stand-in provider for development and tests (no TOMTOM_API_KEY).
+
+    Answers in TomTom's response shapes: routes are straight legs timed by
+    the learned ETA model, and traffic flow reports the model's speed for
+    the current hour against the fastest hour of the day.
+    """
+
+    name = "local"
+
+    async def route(self, waypoints: List[Tuple[float, float]], route_type: str, travel_mode: str) -> Dict[str, Any]:
+        now = time.time()
+        legs = []
+        for start, end in zip(waypoints, waypoints[1:]):
+            seconds = round(eta_model.predict_one(start, end, now))
+            meters = round(haversine_km(start[0], start[1], end[0], end[1]) * ROAD_FACTOR * 1000)
+            points = [
+                {
+                    "latitude": round(start[0] + (end[0] - start[0]) * i / LOCAL_ROUTE_POINTS, 6),
+                    "longitude": round(start[1] + (end[1] - start[1]) * i / LOCAL_ROUTE_POINTS, 6)
+                }
+                for i in range(LOCAL_ROUTE_POINTS + 1)
+            ]
+            legs.append({
+                "summary": {"lengthInMeters": meters, "travelTimeInSeconds": seconds, "trafficDelayInSeconds": 0},
+                "points": points
+            })
+        summary = {
+            "lengthInMeters": sum(leg["summary"]["lengthInMeters"] for leg in legs),
+            "travelTimeInSeconds": sum(leg["summary"]["travelTimeInSeconds"] for leg in legs),
+            "trafficDelayInSeconds": 0,
+            "departureTime": datetime.fromtimestamp(now, timezone.utc).isoformat(timespec="seconds")
+        }
+        return {"formatVersion": "0.0.12", "routes": [{"summary": summary, "legs": legs}]}
+
+    async def traffic_flow(self, point: Tuple[float, float], zoom: int) -> Dict[str, Any]:
+        hourly = eta_model.profile()["hourly_speed_kmh"]
+        current = hourly[datetime.now(timezone.utc).hour]
+        free_flow = max(hourly)
+        return {
+            "flowSegmentData": {
+                "frc": "FRC2",
+                "currentSpeed": round(current),
+                "freeFlowSpeed": round(free_flow),
+                "currentTravelTime": round(3600 / current) if current else None,
+                "freeFlowTravelTime": round(3600 / free_flow) if free_flow else None,
+                "confidence": 0.5,
+                "roadClosure": False,
+                "coordinates": {"coordinate": [{"latitude": point[0], "longitude": point[1]}]}
+            }
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value: Dict[str, Any], fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+def quantize(value: float, quantum: float) -> float:
+    """Snap a coordinate to a grid so nearby requests share one cache entry"""
+    return round(round(value / quantum) * quantum, 6)
+
+
+class MapProxy:
+    """
+    Shared cache in front of the routing and traffic provider.
+
+    Coordinates are snapped to a grid (and the snapped points are what the
+    provider sees), so every dashboard asking about roughly the same place
+    hits one entry. Entries are fresh for a TTL, then served stale for a
+    further window while a single background request refreshes them.
+    Concurrent misses for the same key share one upstream request, so
+    provider traffic grows with distinct routes, not with open clients.
+    """
+
+    def __init__(
+        self,
+        upstream,
+        max_entries: int = 10000,
+        route_quantum: float = 0.0005,
+        traffic_quantum: float = 0.001,
+        route_ttl: float = 120.0,
+        route_stale: float = 600.0,
+        traffic_ttl: float = 60.0,
+        traffic_stale: float = 300.0
+    ):
+        self.upstream = upstream
+        self.max_entries = max_entries
+        self.route_quantum = route_quantum
+        self.traffic_quantum = traffic_quantum
+        self.route_ttl = route_ttl
+        self.route_stale = route_stale
+        self.traffic_ttl = traffic_ttl
+        self.traffic_stale = traffic_stale
+        self._cache: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self.stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0,
+            "upstream_calls": 0, "upstream_errors": 0, "stale_on_error": 0, "evictions": 0
+        }
+
+    async def route(
+        self,
+        waypoints: List[Tuple[float, float]],
+        route_type: str = "fastest",
+        travel_mode: str = "car"
+    ) -> Tuple[Dict[str, Any], str, float]:
+        """
+        Route through the waypoints
+
+        Returns:
+            (TomTom calculateRoute response, cache status HIT/STALE/MISS, seconds until stale)
+        """
+        points = [(quantize(lat, self.route_quantum), quantize(lon, self.route_quantum)) for lat, lon in waypoints]
+        key = ("route", tuple(points), route_type, travel_mode)
+        return await self._get(
+            key, self.route_ttl, self.route_stale,
+            lambda: self.upstream.route(points, route_type, travel_mode)
+        )
+
+    async def traffic_flow(self, latitude: float, longitude: float, zoom: int = 10) -> Tuple[Dict[str, Any], str, float]:
+        """Traffic flow of the road segment nearest a point; same return shape as route()"""
+        point = (quantize(latitude, self.traffic_quantum), quantize(longitude, self.traffic_quantum))
+        key = ("traffic", point, zoom)
+        return await self._get(
+            key, self.traffic_ttl, self.traffic_stale,
+            lambda: self.upstream.traffic_flow(point, zoom)
+        )
+
+    async def _get(
+        self,
+        key: Tuple,
+        ttl: float,
+        stale: float,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], str, float]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < ttl:
+                self.stats["hits"] += 1
+                self._cache.move_to_end(key)
+                return entry.value, "HIT", ttl - age
+            if age < ttl + stale:
+                self.stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    self.stats["refreshes"] += 1
+                    self._start(key, fetch)
+                return entry.value, "STALE", 0.0
+
+        self.stats["misses"] += 1
+        try:
+            # Shielded: a client disconnecting must not cancel the fetch others are waiting on
+            value = await asyncio.shield(self._start(key, fetch))
+        except UpstreamError:
+            if entry is None:
+                raise
+            # Provider down: an old answer beats none
+            self.stats["stale_on_error"] += 1
+            return entry.value, "STALE", 0.0
+        return value, "MISS", ttl
+
+    def _start(self, key: Tuple, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+        task = asyncio.ensure_future(self._load(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._done(key, done))
+        return task
+
+    def _done(self, key: Tuple, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here so background refreshes that fail are not reported as unhandled
+            print(f"⚠️ Map upstream failed for {key[0]}: {task.exception()}")
+
+    async def _load(self, key: Tuple, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        self.stats["upstream_calls"] += 1
+        try:
+            value = await fetch()
+        except UpstreamError:
+            self.stats["upstream_errors"] += 1
+            raise
+        except Exception as e:
+            self.stats["upstream_errors"] += 1
+            raise UpstreamError(502, f"{self.upstream.name} request failed: {e}")
+        self._cache[key] = _Entry(value, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.stats["evictions"] += 1
+        return value
+
+    def metrics(self) -> Dict[str, Any]:
+        requests = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            "upstream": self.upstream.name,
+            "entries": len(self._cache),
+            "in_flight": len(self._inflight),
+            "hit_ratio": round((self.stats["hits"] + self.stats["stale_hits"]) / requests, 4) if requests else None,
+            **self.stats
+        }
+
+    async def close(self) -> None:
+        await self.upstream.close()
+
+
+def _upstream():
+    api_key = os.getenv("TOMTOM_API_KEY")
+    if not api_key:
+        print("⚠️ TOMTOM_API_KEY not set. Routes and traffic come from the local stand-in.")
+        return LocalUpstream()
+    return TomTomUpstream(
+        api_key,
+        base_url=os.getenv("TOMTOM_BASE_URL", "https://api.tomtom.com"),
+        timeout=float(os.getenv("TOMTOM_TIMEOUT", "10"))
+    )
+
+
+# Singleton instance
+map_proxy = MapProxy(
+    _upstream(),
+    max_entries=int(os.getenv("MAP_CACHE_MAX_ENTRIES", "10000")),
+    route_quantum=float(os.getenv("MAP_ROUTE_QUANTUM_DEG", "0.0005")),
+    traffic_quantum=float(os.getenv("MAP_TRAFFIC_QUANTUM_DEG", "0.001")),
+    route_ttl=float(os.getenv("MAP_ROUTE_TTL_SECONDS", "120")),
+    route_stale=float(os.getenv("MAP_ROUTE_STALE_SECONDS", "600")),
+    traffic_ttl=float(os.getenv("MAP_TRAFFIC_TTL_SECONDS", "60")),
+    traffic_stale=float(os.getenv("MAP_TRAFFIC_STALE_SECONDS", "300"))
+)
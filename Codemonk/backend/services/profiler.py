@@ -0,0 +1,369 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent) + os.sep
+
+# Leaf frames of threads that are parked, not working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("selectors.py", "select"), ("thread.py", "_worker")
+}
+
+# First match walking up from the leaf names what stalled the loop
+CULPRITS = (
+    ("groq", "Groq"), ("twilio", "Twilio"), ("sqlite3", "SQLite"), ("redis", "Redis"),
+    ("httpx", "HTTP"), ("httpcore", "HTTP"), ("requests", "HTTP"), ("urllib3", "HTTP"),
+    ("ssl.py", "network"), ("socket.py", "network"),
+    ("pathlib.py", "file I/O"), ("shutil.py", "file I/O"), ("tempfile.py", "file I/O"),
+    ("codecs.py", "file I/O"), ("aiofiles", "file I/O"), ("json", "JSON")
+)
+
+# Requests that are long by design
+SLOW_REQUEST_EXCLUDE = ("/api/events/stream",)
+
+_labels: Dict[Any, str] = {}
+
+
+def _label(code) -> str:
+    """'path/to/module.py:function', relative to the backend or site-packages"""
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(BACKEND_DIR):
+            filename = filename[len(BACKEND_DIR):]
+        elif "site-packages" + os.sep in filename:
+            filename = filename.split("site-packages" + os.sep, 1)[1]
+        else:
+            filename = os.path.basename(filename)
+        label = _labels[code] = f"{filename}:{code.co_name}"
+    return label
+
+
+def _frame_stack(frame) -> List[str]:
+    """Labels root first"""
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+def _await_chain(task: asyncio.Task) -> List[str]:
+    """Labels of the coroutines a task is suspended in, outermost first"""
+    chain = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        chain.append(_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return chain
+
+
+def folded(counts: Counter) -> str:
+    """Collapsed stacks ('a;b;c count' per line) for flamegraph.pl, speedscope or inferno"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def culprit(stack: str) -> Dict[str, Optional[str]]:
+    """Name the library and the deepest backend frame in a folded stack"""
+    frames = stack.split(";")
+    library = None
+    for frame in reversed(frames):
+        for needle, name in CULPRITS:
+            if frame.startswith(needle) or f"/{needle}" in frame.split(":", 1)[0]:
+                library = name
+                break
+        if library:
+            break
+    caller = next((
+        frame for frame in reversed(frames)
+        if frame.startswith(("routers/", "services/", "main.py:")) and not frame.startswith("services/profiler.py")
+    ), None)
+    return {"library": library or "CPU", "caller": caller, "leaf": frames[-1] if frames else None}
+
+
+class SamplingProfiler:
+    """
+    Whole-process sampling profiler, switched on for a fixed number of seconds.
+
+    A daemon thread reads every thread's current frame through
+    sys._current_frames() at `interval` and counts the collapsed stacks, so
+    overhead is a few microseconds per thread per sample and nothing is
+    traced while it is off. Parked threads (executor workers waiting for
+    work, the loop waiting in select) are skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.ends_at: Optional[float] = None
+        self.interval = 0.005
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005) -> bool:
+        """Start a new profile, discarding the previous one; False if one is running"""
+        with self._lock:
+            if self.running:
+                return False
+            self.counts = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self.ends_at = self.started_at + seconds
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, seconds: float) -> None:
+        me = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me or _is_idle(frame):
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    thread = threading._active.get(ident)
+                    name = names[ident] = f"[{thread.name if thread else ident}]"
+                self.counts[name + ";" + ";".join(_frame_stack(frame))] += 1
+            self.samples += 1
+        self.ends_at = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "ends_at": self.ends_at,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "distinct_stacks": len(self.counts)
+        }
+
+
+class _InFlight:
+    __slots__ = ("id", "method", "path", "task", "started", "counts")
+
+    def __init__(self, request_id: int, method: str, path: str, task: Optional[asyncio.Task]):
+        self.id = request_id
+        self.method = method
+        self.path = path
+        self.task = task
+        self.started = time.monotonic()
+        self.counts: Counter = Counter()
+
+
+class LoopWatchdog:
+    """
+    Slow-request capture and event-loop-block detection.
+
+    A coroutine on the loop stamps a heartbeat every `beat_interval`; a
+    daemon thread checks it every `interval`. When the heartbeat is older
+    than `block_ms`, some synchronous call is holding the loop, and the
+    thread samples the loop thread's stack until the heartbeat resumes; the
+    block is then recorded with the library it was stuck in.
+
+    Requests running longer than `slow_ms` get their own samples: the
+    coroutine chain the request is suspended in, the loop stack if it is
+    blocked, and busy provider/executor threads (shared by all requests).
+    Captures of finished slow requests are kept in a ring buffer.
+    """
+
+    def __init__(self, slow_ms: float = 1000.0, block_ms: float = 100.0, interval: float = 0.01, keep: int = 50):
+        self.slow = slow_ms / 1000
+        self.block = block_ms / 1000
+        self.interval = interval
+        self.beat_interval = min(0.02, self.block / 4)
+        self.enabled = False
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._in_flight: Dict[int, _InFlight] = {}
+        self._next_id = 0
+        self._block_started: Optional[float] = None
+        self._block_counts: Counter = Counter()
+        self.captures: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.blocks: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._beat_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        """Start from the event loop that serves requests"""
+        if self._thread is not None:
+            return
+        self.enabled = True
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._beat_task = asyncio.create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._beat_task.cancel()
+        self.enabled = False
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.beat_interval)
+
+    def begin(self, method: str, path: str) -> Optional[int]:
+        if not self.enabled or path.startswith(SLOW_REQUEST_EXCLUDE):
+            return None
+        self._next_id += 1
+        request_id = self._next_id
+        self._in_flight[request_id] = _InFlight(request_id, method, path, asyncio.current_task())
+        return request_id
+
+    def end(self, request_id: Optional[int], status: Optional[int]) -> None:
+        if request_id is None:
+            return
+        request = self._in_flight.pop(request_id, None)
+        if request is None:
+            return
+        elapsed = time.monotonic() - request.started
+        if elapsed >= self.slow:
+            self.captures.append({
+                "id": request.id,
+                "method": request.method,
+                "path": request.path,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 1),
+                "finished_at": time.time(),
+                "samples": sum(request.counts.values()),
+                "top_stacks": [{"stack": stack, "samples": count} for stack, count in request.counts.most_common(5)],
+                "folded": folded(request.counts)
+            })
+
+    def _busy_threads(self, frames: Dict[int, Any]) -> Iterable[Tuple[str, List[str]]]:
+        me = threading.get_ident()
+        for ident, frame in frames.items():
+            if ident in (me, self._loop_thread) or _is_idle(frame):
+                continue
+            thread = threading._active.get(ident)
+            name = thread.name if thread else str(ident)
+            if name.startswith(("sampling-profiler", "journal-", "loop-watchdog")):
+                continue
+            yield name, _frame_stack(frame)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            blocked = now - self._beat > self.block
+            slow = [request for request in list(self._in_flight.values()) if now - request.started >= self.slow]
+            if not blocked and not slow and self._block_started is None:
+                continue
+
+            frames = sys._current_frames()
+            loop_stack = _frame_stack(frames[self._loop_thread]) if self._loop_thread in frames else []
+
+            if blocked:
+                if self._block_started is None:
+                    self._block_started = self._beat
+                    self._block_counts = Counter()
+                self._block_counts[";".join(loop_stack)] += 1
+            elif self._block_started is not None:
+                self._record_block()
+
+            if slow:
+                threads = [f"[{name}];" + ";".join(stack) for name, stack in self._busy_threads(frames)]
+                for request in slow:
+                    if blocked:
+                        request.counts["[loop blocked];" + ";".join(loop_stack)] += 1
+                    elif request.task is not None:
+                        chain = _await_chain(request.task)
+                        if chain:
+                            request.counts["[awaiting];" + ";".join(chain)] += 1
+                    for stack in threads:
+                        request.counts[stack] += 1
+
+    def _record_block(self) -> None:
+        duration = self._beat - self._block_started
+        top = self._block_counts.most_common(1)[0][0] if self._block_counts else ""
+        self.blocks.append({
+            "duration_ms": round(duration * 1000, 1),
+            "finished_at": time.time(),
+            "samples": sum(self._block_counts.values()),
+            **culprit(top),
+            "stack": top,
+            "folded": folded(self._block_counts)
+        })
+        self._block_started = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "slow_request_ms": self.slow * 1000,
+            "loop_block_ms": self.block * 1000,
+            "in_flight": len(self._in_flight),
+            "slow_requests_captured": len(self.captures),
+            "loop_blocks_captured": len(self.blocks)
+        }
+
+
+class SlowRequestMiddleware:
+    """ASGI middleware registering each HTTP request with the watchdog"""
+
+    def __init__(self, app, watchdog: "LoopWatchdog"):
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.watchdog.enabled:
+            return await self.app(scope, receive, send)
+
+        request_id = self.watchdog.begin(scope["method"], scope["path"])
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.watchdog.end(request_id, status)
+
+
+# Singleton instances (the watchdog only runs when SARS_PROFILING is set)
+PROFILING_ENABLED = os.getenv("SARS_PROFILING", "").lower() in ("1", "true", "yes")
+profiler = SamplingProfiler()
+watchdog = LoopWatchdog(
+    slow_ms=float(os.getenv("SARS_SLOW_REQUEST_MS", "1000")),
+    block_ms=float(os.getenv("SARS_LOOP_BLOCK_MS", "100"))
+)
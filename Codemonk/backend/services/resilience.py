@@ -0,0 +1,316 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+# Provider SDK calls (Groq, Twilio) are blocking; they run here so a slow
+# provider never stalls the event loop and deadlines can be enforced.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PROVIDER_THREADS", "32")),
+    thread_name_prefix="provider"
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open"""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a provider call does not finish within its deadline"""
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding window of recent calls.
+
+    closed: calls flow; the circuit opens once at least `min_calls` are in
+    the window and the failure rate reaches `failure_rate`.
+    open: calls fail fast until `reset_timeout` has passed.
+    half_open: one trial call is let through; success closes the circuit,
+    failure opens it again. A trial that never reports back (cancelled, or
+    older than the caller's deadline) is given up so another can run.
+    """
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5, reset_timeout: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._outcomes: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self, trial_timeout: Optional[float] = None) -> bool:
+        """
+        Whether a call may go to the provider now
+
+        Args:
+            trial_timeout: Seconds after which an unanswered half-open trial counts as lost
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if (
+                self.state == "half_open" and self._trial_in_flight
+                and trial_timeout is not None and now - self._trial_started > trial_timeout
+            ):
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give up a call that ended without an outcome (e.g. cancelled); frees the half-open trial"""
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+                if success:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = "open"
+        self._opened_at = time.monotonic()
+
+    def current_failure_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+
+class ResiliencePolicy:
+    """
+    Deadline, circuit breaker and optional hedging for one provider call.
+
+    Hedging is for idempotent calls only: if the primary request has not
+    answered after the observed p95 latency, a backup request is fired and
+    whichever succeeds first wins. Hedges are capped at `hedge_budget` of
+    calls so provider spend stays close to one request per call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        hedge: bool = False,
+        hedge_budget: float = 0.1,
+        hedge_min_delay: float = 0.2,
+        min_samples: int = 20,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_budget = hedge_budget
+        self.hedge_min_delay = hedge_min_delay
+        self.min_samples = min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies: deque = deque(maxlen=512)
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "abandoned": 0,
+            "short_circuited": 0,
+            "hedges_fired": 0,
+            "hedge_wins": 0
+        }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _percentile(self, p: int) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * p / 100))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = self._percentile(95)
+        if p95 is None:
+            return None
+        with self._lock:
+            if self.stats["hedges_fired"] >= self.hedge_budget * max(1, self.stats["calls"]):
+                return None
+        return max(self.hedge_min_delay, p95)
+
+    def _admit(self) -> None:
+        self._count("calls")
+        if not self.breaker.allow(self.timeout):
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def _succeeded(self, started: float) -> None:
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+            self.stats["successes"] += 1
+        self.breaker.record(True)
+
+    def _failed(self, timed_out: bool) -> None:
+        self._count("timeouts" if timed_out else "failures")
+        self.breaker.record(False)
+
+    def _abandoned(self) -> None:
+        # Cancelled before the provider answered: says nothing about its health
+        self._count("abandoned")
+        self.breaker.release()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call with a deadline from synchronous code"""
+        self._admit()
+        started = time.monotonic()
+        future = _executor.submit(fn, *args, **kwargs)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._failed(timed_out=True)
+            raise DeadlineExceeded(f"{self.name} exceeded {self.timeout}s deadline")
+        except Exception:
+            self._failed(timed_out=False)
+            raise
+        except BaseException:
+            self._abandoned()
+            raise
+        self._succeeded(started)
+        return result
+
+    async def call_async(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call off the event loop with a deadline and optional hedge"""
+        self._admit()
+        started = time.monotonic()
+        try:
+            result = await self._race(partial(fn, *args, **kwargs))
+        except DeadlineExceeded:
+            self._failed(timed_out=True)
+            raise
+        except Exception:
+            self._failed(timed_out=False)
+            raise
+        except BaseException:
+            # Cancelled (client gone, shutdown) or interrupted: no outcome to record
+            self._abandoned()
+            raise
+        self._succeeded(started)
+        return result
+
+    async def _race(self, job: Callable[[], Any]) -> Any:
+        """Primary request plus optional hedge; the first success wins"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        primary = loop.run_in_executor(_executor, job)
+        pending = {primary}
+        backup = None
+        error: Optional[BaseException] = None
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None and hedge_delay < self.timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    backup = loop.run_in_executor(_executor, job)
+                    pending.add(backup)
+                    self._count("hedges_fired")
+
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        if future is backup:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+        finally:
+            self._discard(pending)
+
+        if pending or error is None:
+            raise DeadlineExceeded(f"{self.name} exceeded {self.timeout}s deadline")
+        raise error
+
+    @staticmethod
+    def _discard(futures) -> None:
+        # Losing or abandoned requests finish in the background; swallow their errors
+        for future in futures:
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        p50, p95, p99 = (self._percentile(p) for p in (50, 95, 99))
+        return {
+            "state": self.breaker.state,
+            "failure_rate": round(self.breaker.current_failure_rate(), 3),
+            "timeout_seconds": self.timeout,
+            "hedging": self.hedge,
+            **stats,
+            "hedge_win_rate": round(stats["hedge_wins"] / stats["hedges_fired"], 3) if stats["hedges_fired"] else 0.0,
+            "latency_ms": {
+                name: round(value * 1000, 2) if value is not None else None
+                for name, value in (("p50", p50), ("p95", p95), ("p99", p99))
+            }
+        }
+
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+        window=int(os.getenv("BREAKER_WINDOW", "20")),
+        min_calls=int(os.getenv("BREAKER_MIN_CALLS", "5")),
+        reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+    )
+
+
+# Policies shared by TranscriptionService and WhatsAppService
+groq_transcription_policy = ResiliencePolicy(
+    "groq.transcription", timeout=float(os.getenv("GROQ_TRANSCRIPTION_TIMEOUT", "60")), breaker=_breaker()
+)
+groq_extraction_policy = ResiliencePolicy(
+    "groq.extraction",
+    timeout=float(os.getenv("GROQ_EXTRACTION_TIMEOUT", "20")),
+    hedge=os.getenv("GROQ_EXTRACTION_HEDGE", "true").lower() == "true",
+    hedge_budget=float(os.getenv("GROQ_EXTRACTION_HEDGE_BUDGET", "0.1")),
+    breaker=_breaker()
+)
+twilio_policy = ResiliencePolicy(
+    "twilio.messages", timeout=float(os.getenv("TWILIO_SEND_TIMEOUT", "10")), breaker=_breaker()
+)
+
+policies = {
+    policy.name: policy
+    for policy in (groq_transcription_policy, groq_extraction_policy, twilio_policy)
+}
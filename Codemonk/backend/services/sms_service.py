@@ -1,10 +1,243 @@
 import os
-from typing import Optional
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from services.resilience import twilio_policy
 
 load_dotenv()
 
 
+class TokenBucket:
+    """Token-bucket rate shaper for a single destination number"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_available(self) -> float:
+        """Seconds until the next token can be taken"""
+        self._refill(time.monotonic())
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _PendingUpdate:
+    """Updates for one recipient/ambulance waiting to be merged into a single message"""
+
+    def __init__(self, phone_number: str, ambulance_id: str, due: float):
+        self.phone_number = phone_number
+        self.ambulance_id = ambulance_id
+        self.first_queued = time.monotonic()
+        self.due = due
+        self.updates: List[Tuple[str, str]] = []
+        # Sends of this batch that failed so far
+        self.attempts = 0
+
+
+class MessageCoalescer:
+    """
+    Merges emergency updates for the same recipient and ambulance that arrive
+    within a short window into one WhatsApp message, and shapes sends per
+    destination number with a token bucket.
+
+    A single background thread flushes due batches. When a destination has
+    no token left its batch is pushed back until one is available, so updates
+    arriving meanwhile are folded into the same message instead of queuing
+    more sends against the provider's per-number limit.
+
+    A failed send is queued again after an exponential backoff (merging with
+    any updates that arrived meanwhile) and dropped after max_attempts.
+    """
+
+    def __init__(
+        self,
+        send,
+        window: float,
+        rate: float,
+        burst: int,
+        sample_size: int = 1024,
+        max_attempts: int = 3,
+        retry_backoff: float = 1.0
+    ):
+        self._send = send
+        self.window = window
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Condition()
+        self._pending: Dict[Tuple[str, str], _PendingUpdate] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._delays: deque = deque(maxlen=sample_size)
+        self._stats = {
+            "updates_queued": 0,
+            "messages_sent": 0,
+            "updates_coalesced": 0,
+            "throttle_deferrals": 0,
+            "send_failures": 0,
+            "send_retries": 0,
+            "messages_dropped": 0
+        }
+
+    def bucket(self, phone_number: str) -> TokenBucket:
+        with self._lock:
+            if phone_number not in self._buckets:
+                self._buckets[phone_number] = TokenBucket(self.rate, self.burst)
+            return self._buckets[phone_number]
+
+    async def wait_for_token(self, phone_number: str, max_wait: float) -> float:
+        """
+        Wait until the destination has a token or max_wait elapses
+
+        Sleeps on the event loop, so other requests keep being served while
+        an urgent send waits out a burst.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        bucket = self.bucket(phone_number)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                if bucket.try_acquire():
+                    break
+                delay = bucket.time_until_available()
+            remaining = max_wait - (time.monotonic() - started)
+            if remaining <= 0:
+                # Urgent sends go out anyway once the wait budget is spent
+                break
+            await asyncio.sleep(min(delay, remaining))
+        waited = time.monotonic() - started
+        with self._lock:
+            self._delays.append(waited)
+        return waited
+
+    def submit(self, phone_number: str, ambulance_id: str, update_type: str, details: str) -> int:
+        """
+        Queue an update for merging
+
+        Returns:
+            int: Number of updates now pending in this recipient's batch
+        """
+        key = (phone_number, ambulance_id)
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = _PendingUpdate(phone_number, ambulance_id, time.monotonic() + self.window)
+                self._pending[key] = batch
+            batch.updates.append((update_type, details))
+            self._stats["updates_queued"] += 1
+            self._ensure_worker()
+            self._lock.notify()
+            return len(batch.updates)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="whatsapp-coalescer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._lock.wait()
+                now = time.monotonic()
+                batch = min(self._pending.values(), key=lambda b: b.due)
+                if batch.due > now:
+                    self._lock.wait(batch.due - now)
+                    continue
+                bucket = self.bucket(batch.phone_number)
+                if not bucket.try_acquire():
+                    batch.due = now + bucket.time_until_available()
+                    self._stats["throttle_deferrals"] += 1
+                    continue
+                del self._pending[(batch.phone_number, batch.ambulance_id)]
+
+            # Send outside the lock so new updates can keep queuing
+            result = self._send(batch.phone_number, format_update_batch(batch.ambulance_id, batch.updates))
+            with self._lock:
+                if result.get("success"):
+                    self._delays.append(time.monotonic() - batch.first_queued)
+                    self._stats["messages_sent"] += 1
+                    self._stats["updates_coalesced"] += len(batch.updates) - 1
+                    continue
+                self._stats["send_failures"] += 1
+                batch.attempts += 1
+                if batch.attempts >= self.max_attempts:
+                    self._stats["messages_dropped"] += 1
+                    print(f"❌ WhatsApp update to {batch.phone_number} dropped after {batch.attempts} attempts: {result.get('error')}")
+                    continue
+                self._requeue(batch, time.monotonic() + self.retry_backoff * 2 ** (batch.attempts - 1))
+                self._stats["send_retries"] += 1
+                print(f"⚠️ WhatsApp update to {batch.phone_number} failed, retrying: {result.get('error')}")
+
+    def _requeue(self, batch: _PendingUpdate, due: float) -> None:
+        """Put a failed batch back, ahead of any updates queued for the same recipient since (lock held)"""
+        key = (batch.phone_number, batch.ambulance_id)
+        newer = self._pending.get(key)
+        if newer is not None:
+            batch.updates += newer.updates
+            due = max(due, newer.due)
+        batch.due = due
+        self._pending[key] = batch
+        self._lock.notify()
+
+    def metrics(self) -> dict:
+        """Counters, pending batches and queue-delay percentiles"""
+        with self._lock:
+            delays = sorted(self._delays)
+            pending = len(self._pending)
+            tokens = {number: round(bucket.tokens, 2) for number, bucket in self._buckets.items()}
+            stats = dict(self._stats)
+        last = len(delays) - 1
+        return {
+            **stats,
+            "pending_batches": pending,
+            "window_seconds": self.window,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": tokens,
+            "queue_delay_ms": {
+                f"p{p}": round(delays[min(last, int(last * p / 100))] * 1000, 2) if delays else 0.0
+                for p in (50, 95, 99)
+            }
+        }
+
+
+def format_update_batch(ambulance_id: str, updates: List[Tuple[str, str]]) -> str:
+    """Render one or more queued updates as a single WhatsApp message"""
+    if len(updates) == 1:
+        update_type, details = updates[0]
+        body = details
+    else:
+        types = {update_type for update_type, _ in updates}
+        update_type = types.pop() if len(types) == 1 else f"{len(updates)} UPDATES"
+        body = "\n".join(f"• [{kind}] {details}" for kind, details in updates)
+
+    return f"""🚨 *{update_type}* - {ambulance_id}
+
+{body}
+
+Please acknowledge and take necessary action."""
+
+
 class WhatsAppService:
     def __init__(self):
         """Initialize Twilio client for WhatsApp messaging"""
@@ -12,6 +245,21 @@ class WhatsAppService:
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.whatsapp_number = os.getenv(
             "TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
+        # All hospital assignments are monitored from this number
+        self.admin_number = os.getenv("WHATSAPP_ADMIN_NUMBER", "+917483588380")
+        # Maximum time an urgent send waits for its destination's rate budget
+        self.max_send_delay = float(os.getenv("WHATSAPP_MAX_SEND_DELAY", "5"))
+        # Public URL of POST /api/dispatch/whatsapp/status; Twilio reports delivery there
+        self.status_callback = os.getenv("TWILIO_STATUS_CALLBACK_URL")
+
+        self.coalescer = MessageCoalescer(
+            send=self.send_custom_message,
+            window=float(os.getenv("WHATSAPP_COALESCE_WINDOW_SECONDS", "2")),
+            rate=float(os.getenv("WHATSAPP_RATE_PER_SECOND", "1")),
+            burst=int(os.getenv("WHATSAPP_RATE_BURST", "5")),
+            max_attempts=int(os.getenv("WHATSAPP_SEND_ATTEMPTS", "3")),
+            retry_backoff=float(os.getenv("WHATSAPP_RETRY_BACKOFF_SECONDS", "1"))
+        )
 
         # Check if Twilio is configured
         self.is_configured = all([
@@ -34,7 +282,33 @@ class WhatsAppService:
             print("   Set TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN in .env file")
             self.client = None
 
-    def send_hospital_assignment(
+    def _message_kwargs(self, body: str, to: str) -> dict:
+        kwargs = {"body": body, "from_": self.whatsapp_number, "to": to}
+        if self.status_callback:
+            kwargs["status_callback"] = self.status_callback
+        return kwargs
+
+    def _create_message(self, body: str, to: str):
+        """
+        Create a Twilio message with a deadline and circuit breaker, blocking
+
+        Only for the coalescer's background thread; request handlers use
+        _create_message_async. Raises CircuitOpenError without calling
+        Twilio while the circuit is open.
+        """
+        return twilio_policy.call(self.client.messages.create, **self._message_kwargs(body, to))
+
+    async def _create_message_async(self, body: str, to: str):
+        """
+        Create a Twilio message off the event loop with a deadline and circuit breaker
+
+        Raises CircuitOpenError without calling Twilio while the circuit is
+        open; callers report the error and the dispatch proceeds without
+        the WhatsApp message.
+        """
+        return await twilio_policy.call_async(self.client.messages.create, **self._message_kwargs(body, to))
+
+    async def send_hospital_assignment(
         self,
         driver_phone: str,
         ambulance_id: str,
@@ -61,12 +335,7 @@ class WhatsAppService:
         """
         # If Twilio is not configured, return mock success
         if not self.is_configured:
-            return {
-                "success": False,
-                "error": "Twilio not configured. WhatsApp not sent (development mode).",
-                "to": driver_phone,
-                "mock": True
-            }
+            return self._not_configured(driver_phone)
 
         try:
             # Extract driver name from phone number or use a fallback
@@ -106,21 +375,20 @@ class WhatsAppService:
             message_body += "\n\n⚠️ Message sent to admin for monitoring."
 
             # Send WhatsApp message to ADMIN NUMBER instead of driver
-            # All messages go to +917483588380
-            admin_number = "whatsapp:+917483588380"
+            admin_number = f"whatsapp:{self.admin_number}"
+
+            # Assignments are urgent: wait briefly for the admin number's rate budget
+            queue_delay = await self.coalescer.wait_for_token(self.admin_number, self.max_send_delay)
 
-            message = self.client.messages.create(
-                body=message_body,
-                from_=self.whatsapp_number,
-                to=admin_number
-            )
+            message = await self._create_message_async(body=message_body, to=admin_number)
 
             return {
                 "success": True,
                 "message_sid": message.sid,
                 "status": message.status,
                 "to": driver_phone,  # Return driver phone for UI display
-                "actual_recipient": "+917483588380",  # Actual recipient
+                "actual_recipient": self.admin_number,  # Actual recipient
+                "queue_delay_ms": round(queue_delay * 1000, 2),
                 "type": "whatsapp"
             }
 
@@ -132,9 +400,37 @@ class WhatsAppService:
                 "type": "whatsapp"
             }
 
+    def _not_configured(self, phone_number: str) -> dict:
+        return {
+            "success": False,
+            "error": "Twilio not configured. WhatsApp not sent (development mode).",
+            "to": phone_number,
+            "mock": True
+        }
+
+    @staticmethod
+    def _whatsapp_address(phone_number: str) -> str:
+        # Format: whatsapp:+1234567890
+        return phone_number if phone_number.startswith("whatsapp:") else f"whatsapp:{phone_number}"
+
+    @staticmethod
+    def _message_result(phone_number: str, msg=None, error: Optional[Exception] = None) -> dict:
+        if error is not None:
+            return {"success": False, "error": str(error), "to": phone_number, "type": "whatsapp"}
+        return {
+            "success": True,
+            "message_sid": msg.sid,
+            "status": msg.status,
+            "to": phone_number,
+            "type": "whatsapp"
+        }
+
     def send_custom_message(self, phone_number: str, message: str) -> dict:
         """
-        Send a custom WhatsApp message
+        Send a custom WhatsApp message, blocking until Twilio answers
+
+        Used by the coalescer's background thread; request handlers await
+        send_custom_message_async instead.
 
         Args:
             phone_number: Recipient's phone number (E.164 format)
@@ -143,43 +439,34 @@ class WhatsAppService:
         Returns:
             dict: Response with success status and message SID or error
         """
-        # If Twilio is not configured, return mock success
         if not self.is_configured:
-            return {
-                "success": False,
-                "error": "Twilio not configured. WhatsApp not sent (development mode).",
-                "to": phone_number,
-                "mock": True
-            }
-
+            return self._not_configured(phone_number)
         try:
-            # Format: whatsapp:+1234567890
-            to_number = f"whatsapp:{phone_number}" if not phone_number.startswith(
-                "whatsapp:") else phone_number
+            msg = self._create_message(body=message, to=self._whatsapp_address(phone_number))
+        except Exception as e:
+            return self._message_result(phone_number, error=e)
+        return self._message_result(phone_number, msg)
 
-            msg = self.client.messages.create(
-                body=message,
-                from_=self.whatsapp_number,
-                to=to_number
-            )
+    async def send_custom_message_async(self, phone_number: str, message: str) -> dict:
+        """
+        Send a custom WhatsApp message without blocking the event loop
 
-            return {
-                "success": True,
-                "message_sid": msg.sid,
-                "status": msg.status,
-                "to": phone_number,
-                "type": "whatsapp"
-            }
+        Args:
+            phone_number: Recipient's phone number (E.164 format)
+            message: Message content
 
+        Returns:
+            dict: Response with success status and message SID or error
+        """
+        if not self.is_configured:
+            return self._not_configured(phone_number)
+        try:
+            msg = await self._create_message_async(body=message, to=self._whatsapp_address(phone_number))
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "to": phone_number,
-                "type": "whatsapp"
-            }
+            return self._message_result(phone_number, error=e)
+        return self._message_result(phone_number, msg)
 
-    def send_emergency_update(
+    async def send_emergency_update(
         self,
         driver_phone: str,
         ambulance_id: str,
@@ -189,6 +476,12 @@ class WhatsAppService:
         """
         Send emergency update to ambulance driver via WhatsApp
 
+        Updates to the same driver and ambulance arriving within the coalescing
+        window are merged into one message and sent from a background thread,
+        so the result reports the update as queued, not sent: success stays
+        False until the message actually goes out, and the outcome shows up
+        in the coalescer metrics.
+
         Args:
             driver_phone: Driver's phone number
             ambulance_id: Ambulance identifier
@@ -198,13 +491,22 @@ class WhatsAppService:
         Returns:
             dict: Response with success status
         """
-        message = f"""🚨 *{update_type}* - {ambulance_id}
-
-{details}
-
-Please acknowledge and take necessary action."""
-
-        return self.send_custom_message(driver_phone, message)
+        if not self.is_configured or self.coalescer.window <= 0:
+            return await self.send_custom_message_async(
+                driver_phone, format_update_batch(ambulance_id, [(update_type, details)]))
+
+        pending = self.coalescer.submit(driver_phone, ambulance_id, update_type, details)
+        return {
+            "success": False,
+            "queued": True,
+            "pending_in_batch": pending,
+            "to": driver_phone,
+            "type": "whatsapp"
+        }
+
+    def get_metrics(self) -> dict:
+        """Coalescing and rate-shaping metrics"""
+        return self.coalescer.metrics()
 
 
 # Singleton instance
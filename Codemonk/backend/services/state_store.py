@@ -0,0 +1,868 @@
+import os
+import json
+import time
+import bisect
+import sqlite3
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class StateBackend:
+    """
+    Interface for the shared state used by the routers.
+
+    Records are plain JSON-serializable dicts grouped into named collections
+    ("dispatches", "emergencies", "ambulances"). Every write stamps the record
+    with a per-collection "version" counter so clients can ask for changes
+    since a version they already have. Backends also keep a short event log
+    which the event bus polls, so every worker sees every change.
+    """
+
+    name = "base"
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, collection: str, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace a record and return it stamped with its new version"""
+        raise NotImplementedError
+
+    def delete(self, collection: str, key: str) -> bool:
+        """Delete a record, leaving a tombstone for delta sync"""
+        raise NotImplementedError
+
+    def put_many(
+        self,
+        collection: str,
+        changes: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        atomic: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Compare-and-set several records at once
+
+        Each change is (key, new value, expected version); a change applies
+        only if the stored record still carries the expected version (None
+        expects the key to be absent). Backends check and write the whole
+        batch in one critical section, so no other write can slip in between.
+
+        Args:
+            collection: Collection name
+            changes: (key, value, expected version) per record, keys unique
+            atomic: Write nothing if any change conflicts (True) or write the rest (False)
+
+        Returns:
+            (records written with their new versions, conflicts as
+            {"id", "expected_version", "current_version"})
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _conflicts(
+        changes: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        current: Dict[str, Optional[int]]
+    ) -> List[Dict[str, Any]]:
+        return [
+            {"id": key, "expected_version": expected, "current_version": current.get(key)}
+            for key, _, expected in changes
+            if current.get(key) != expected
+        ]
+
+    def values(self, collection: str) -> List[Dict[str, Any]]:
+        """Return all records of a collection in insertion order"""
+        return [record for _, record in self.iter_records(collection)]
+
+    def iter_records(self, collection: str, after: int = 0, batch_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Lazily yield (position, record) pairs in insertion order
+
+        Args:
+            collection: Collection name
+            after: Only yield records whose position is greater than this (a page cursor)
+            batch_size: Number of records fetched from storage at a time
+        """
+        raise NotImplementedError
+
+    def changes_since(self, collection: str, version: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Return (records changed, keys deleted) after the given collection version"""
+        raise NotImplementedError
+
+    def collection_version(self, collection: str) -> int:
+        """Return the version of the latest write to a collection"""
+        raise NotImplementedError
+
+    def count(self, collection: str) -> int:
+        raise NotImplementedError
+
+    def next_id(self, collection: str, count: int = 1) -> int:
+        """
+        Atomically advance the id sequence of a collection and return its new value
+
+        With count > 1 the ids from (value - count + 1) to value are reserved
+        in one step, e.g. for a bulk import.
+        """
+        raise NotImplementedError
+
+    def seed(self, collection: str, records: List[Dict[str, Any]], key_field: str = "id") -> None:
+        """Insert records whose key is not present yet (safe to call from every worker)"""
+        for record in records:
+            if self.get(collection, record[key_field]) is None:
+                self.put(collection, record[key_field], record)
+
+    def append_event(self, topic: str, payload: Dict[str, Any]) -> Any:
+        """Append an event to the shared log and return its cursor"""
+        raise NotImplementedError
+
+    def read_events(self, after: Any, limit: int = 100) -> List[Tuple[Any, str, Dict[str, Any]]]:
+        """Return (cursor, topic, payload) tuples appended after the given cursor"""
+        raise NotImplementedError
+
+    def last_event_cursor(self) -> Any:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush and release resources on shutdown"""
+
+
+class _MemoryCollection:
+    """Records of one collection plus the bookkeeping for cursors and deltas"""
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.positions: Dict[str, int] = {}
+        self.order: List[int] = []
+        self.keys_by_position: Dict[int, str] = {}
+        self.last_position = 0
+        self.version = 0
+        # key -> (version, deleted); most recently changed keys last
+        self.changes: "OrderedDict[str, Tuple[int, bool]]" = OrderedDict()
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local backend. Default for development and single-worker runs."""
+
+    name = "memory"
+
+    def __init__(self, max_events: int = 10000):
+        self._lock = threading.RLock()
+        self._collections: Dict[str, _MemoryCollection] = {}
+        self._sequences: Dict[str, int] = {}
+        self._events: deque = deque(maxlen=max_events)
+        self._event_counter = 0
+
+    def _collection(self, collection: str) -> _MemoryCollection:
+        if collection not in self._collections:
+            self._collections[collection] = _MemoryCollection()
+        return self._collections[collection]
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._collection(collection).records.get(key)
+            return dict(record) if record is not None else None
+
+    def put(self, collection: str, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            coll = self._collection(collection)
+            coll.version += 1
+            record = {**value, "version": coll.version}
+            if key not in coll.positions:
+                # Positions only grow, so appending keeps the order list sorted
+                coll.last_position += 1
+                coll.positions[key] = coll.last_position
+                coll.order.append(coll.last_position)
+                coll.keys_by_position[coll.last_position] = key
+            coll.records[key] = record
+            coll.changes[key] = (coll.version, False)
+            coll.changes.move_to_end(key)
+            return dict(record)
+
+    def delete(self, collection: str, key: str) -> bool:
+        with self._lock:
+            coll = self._collection(collection)
+            if coll.records.pop(key, None) is None:
+                return False
+            position = coll.positions.pop(key)
+            del coll.keys_by_position[position]
+            coll.order.pop(bisect.bisect_left(coll.order, position))
+            coll.version += 1
+            coll.changes[key] = (coll.version, True)
+            coll.changes.move_to_end(key)
+            return True
+
+    def put_many(
+        self,
+        collection: str,
+        changes: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        atomic: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        with self._lock:
+            records = self._collection(collection).records
+            current = {key: records[key]["version"] for key, _, _ in changes if key in records}
+            conflicts = self._conflicts(changes, current)
+            if conflicts and atomic:
+                return [], conflicts
+            rejected = {conflict["id"] for conflict in conflicts}
+            written = [self.put(collection, key, value) for key, value, _ in changes if key not in rejected]
+            return written, conflicts
+
+    def iter_records(self, collection: str, after: int = 0, batch_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        while True:
+            # Take the lock per batch so long scans never block writers for long
+            with self._lock:
+                coll = self._collection(collection)
+                start = bisect.bisect_right(coll.order, after)
+                batch = [
+                    (position, dict(coll.records[coll.keys_by_position[position]]))
+                    for position in coll.order[start:start + batch_size]
+                ]
+            if not batch:
+                return
+            yield from batch
+            after = batch[-1][0]
+
+    def changes_since(self, collection: str, version: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        with self._lock:
+            coll = self._collection(collection)
+            changed, deleted = [], []
+            for key in reversed(coll.changes):
+                key_version, is_deleted = coll.changes[key]
+                if key_version <= version:
+                    break
+                if is_deleted:
+                    deleted.append(key)
+                else:
+                    changed.append(dict(coll.records[key]))
+            changed.reverse()
+            deleted.reverse()
+            return changed, deleted
+
+    def collection_version(self, collection: str) -> int:
+        with self._lock:
+            return self._collection(collection).version
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return len(self._collection(collection).records)
+
+    def next_id(self, collection: str, count: int = 1) -> int:
+        with self._lock:
+            self._sequences[collection] = self._sequences.get(collection, 0) + count
+            return self._sequences[collection]
+
+    def seed(self, collection: str, records: List[Dict[str, Any]], key_field: str = "id") -> None:
+        with self._lock:
+            super().seed(collection, records, key_field)
+
+    def append_event(self, topic: str, payload: Dict[str, Any]) -> int:
+        with self._lock:
+            self._event_counter += 1
+            self._events.append((self._event_counter, topic, payload))
+            return self._event_counter
+
+    def read_events(self, after: Any, limit: int = 100) -> List[Tuple[Any, str, Dict[str, Any]]]:
+        with self._lock:
+            after = after or 0
+            if not self._events or self._events[-1][0] <= after:
+                return []
+            # Cursors are contiguous, so the first unread event can be located directly
+            start = max(0, after - self._events[0][0] + 1)
+            return [self._events[i] for i in range(start, min(len(self._events), start + limit))]
+
+    def last_event_cursor(self) -> int:
+        with self._lock:
+            return self._event_counter
+
+    def export_state(self) -> Dict[str, Any]:
+        """Consistent copy of every collection and sequence, for journal snapshots"""
+        with self._lock:
+            # Stored records are replaced, never mutated, so shallow copies are safe to serialize later
+            return {
+                "sequences": dict(self._sequences),
+                "collections": {
+                    name: {
+                        "version": coll.version,
+                        "last_position": coll.last_position,
+                        "records": [[key, coll.positions[key], coll.records[key]] for key in coll.records],
+                        "changes": [[key, version, deleted] for key, (version, deleted) in coll.changes.items()]
+                    }
+                    for name, coll in self._collections.items()
+                }
+            }
+
+    def import_state(self, state: Dict[str, Any]) -> None:
+        """Replace all collections and sequences with an exported state"""
+        with self._lock:
+            self._sequences = dict(state.get("sequences", {}))
+            self._collections = {}
+            for name, exported in state.get("collections", {}).items():
+                coll = _MemoryCollection()
+                coll.version = exported["version"]
+                coll.last_position = exported["last_position"]
+                for key, position, record in exported["records"]:
+                    coll.records[key] = record
+                    coll.positions[key] = position
+                    coll.keys_by_position[position] = key
+                coll.order = sorted(coll.keys_by_position)
+                for key, version, deleted in exported["changes"]:
+                    coll.changes[key] = (version, deleted)
+                self._collections[name] = coll
+
+    def set_sequence(self, collection: str, value: int) -> None:
+        with self._lock:
+            self._sequences[collection] = max(self._sequences.get(collection, 0), value)
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Backend stored in a single SQLite file in WAL mode.
+
+    Every uvicorn worker opens the same file, so all workers share records,
+    id sequences and the event log without running any extra service.
+
+    Meant for development and small single-host setups: request handlers
+    call get/put/put_many directly, so each WAL commit runs on the event
+    loop (the event-bus poller reads on a worker thread). Use Redis for
+    production multi-worker deployments.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_events: int = 10000):
+        self.path = path
+        self.max_events = max_events
+        self._local = threading.local()
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _init_schema(self) -> None:
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                collection TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (collection, key)
+            );
+            CREATE INDEX IF NOT EXISTS records_order ON records (collection);
+            CREATE INDEX IF NOT EXISTS records_version ON records (collection, version);
+            CREATE TABLE IF NOT EXISTS tombstones (
+                collection TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (collection, key)
+            );
+            CREATE TABLE IF NOT EXISTS sequences (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            """
+        )
+
+    def _bump(self, conn: sqlite3.Connection, name: str, count: int = 1) -> int:
+        conn.execute(
+            "INSERT INTO sequences (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, count),
+        )
+        return conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()[0]
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT data FROM records WHERE collection = ? AND key = ?", (collection, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, conn: sqlite3.Connection, collection: str, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        version = self._bump(conn, f"version:{collection}")
+        record = {**value, "version": version}
+        # Upsert keeps the original rowid, which preserves insertion order
+        conn.execute(
+            "INSERT INTO records (collection, key, version, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(collection, key) DO UPDATE SET version = excluded.version, data = excluded.data",
+            (collection, key, version, json.dumps(record)),
+        )
+        conn.execute("DELETE FROM tombstones WHERE collection = ? AND key = ?", (collection, key))
+        return record
+
+    def put(self, collection: str, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        with self._transaction() as conn:
+            return self._write(conn, collection, key, value)
+
+    def put_many(
+        self,
+        collection: str,
+        changes: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        atomic: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        # BEGIN IMMEDIATE takes the write lock, so versions cannot move between the check and the writes
+        with self._transaction() as conn:
+            keys = [key for key, _, _ in changes]
+            current = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                current.update(conn.execute(
+                    f"SELECT key, version FROM records WHERE collection = ? AND key IN ({','.join('?' * len(chunk))})",
+                    (collection, *chunk),
+                ).fetchall())
+            conflicts = self._conflicts(changes, current)
+            if conflicts and atomic:
+                return [], conflicts
+            rejected = {conflict["id"] for conflict in conflicts}
+            written = [self._write(conn, collection, key, value) for key, value, _ in changes if key not in rejected]
+        return written, conflicts
+
+    def delete(self, collection: str, key: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM records WHERE collection = ? AND key = ?", (collection, key)
+            )
+            if cursor.rowcount == 0:
+                return False
+            version = self._bump(conn, f"version:{collection}")
+            conn.execute(
+                "INSERT OR REPLACE INTO tombstones (collection, key, version) VALUES (?, ?, ?)",
+                (collection, key, version),
+            )
+        return True
+
+    def iter_records(self, collection: str, after: int = 0, batch_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        conn = self._conn()
+        while True:
+            rows = conn.execute(
+                "SELECT rowid, data FROM records WHERE collection = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                (collection, after, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for position, data in rows:
+                yield position, json.loads(data)
+            after = rows[-1][0]
+
+    def changes_since(self, collection: str, version: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT data FROM records WHERE collection = ? AND version > ? ORDER BY version",
+            (collection, version),
+        ).fetchall()
+        deleted = conn.execute(
+            "SELECT key FROM tombstones WHERE collection = ? AND version > ? ORDER BY version",
+            (collection, version),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows], [row[0] for row in deleted]
+
+    def collection_version(self, collection: str) -> int:
+        row = self._conn().execute(
+            "SELECT value FROM sequences WHERE name = ?", (f"version:{collection}",)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def count(self, collection: str) -> int:
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM records WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row[0]
+
+    def next_id(self, collection: str, count: int = 1) -> int:
+        with self._transaction() as conn:
+            return self._bump(conn, collection, count)
+
+    def seed(self, collection: str, records: List[Dict[str, Any]], key_field: str = "id") -> None:
+        with self._transaction() as conn:
+            for record in records:
+                exists = conn.execute(
+                    "SELECT 1 FROM records WHERE collection = ? AND key = ?", (collection, record[key_field])
+                ).fetchone()
+                if exists:
+                    continue
+                version = self._bump(conn, f"version:{collection}")
+                conn.execute(
+                    "INSERT INTO records (collection, key, version, data) VALUES (?, ?, ?, ?)",
+                    (collection, record[key_field], version, json.dumps({**record, "version": version})),
+                )
+
+    def append_event(self, topic: str, payload: Dict[str, Any]) -> int:
+        conn = self._conn()
+        cursor = conn.execute(
+            "INSERT INTO events (topic, payload, created_at) VALUES (?, ?, ?)",
+            (topic, json.dumps(payload), time.time()),
+        )
+        event_id = cursor.lastrowid
+        # Trim the log now and then instead of on every write
+        if event_id % 1000 == 0:
+            conn.execute("DELETE FROM events WHERE id <= ?", (event_id - self.max_events,))
+        return event_id
+
+    def read_events(self, after: Any, limit: int = 100) -> List[Tuple[Any, str, Dict[str, Any]]]:
+        rows = self._conn().execute(
+            "SELECT id, topic, payload FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (after or 0, limit),
+        ).fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def last_event_cursor(self) -> int:
+        row = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()
+        return row[0]
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Backend for Redis or any server speaking the Redis protocol
+    (KeyDB, Dragonfly, a local redis-server stand-in).
+
+    Requires the optional `redis` package.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "sars", max_events: int = 10000):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SARS_STATE_BACKEND is a redis:// URL but the 'redis' package is not installed")
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.max_events = max_events
+
+    def _key(self, kind: str, collection: str) -> str:
+        return f"{self.prefix}:{kind}:{collection}"
+
+    def _events_key(self) -> str:
+        return f"{self.prefix}:events"
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.hget(self._key("data", collection), key)
+        return json.loads(raw) if raw else None
+
+    def put(self, collection: str, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        version = self.client.incr(self._key("version", collection))
+        record = {**value, "version": version}
+        pipe = self.client.pipeline()
+        pipe.hset(self._key("data", collection), key, json.dumps(record))
+        # NX keeps the first insertion position; versions only grow, so they order inserts
+        pipe.zadd(self._key("order", collection), {key: version}, nx=True)
+        pipe.zadd(self._key("changes", collection), {key: version})
+        pipe.zrem(self._key("tombstones", collection), key)
+        pipe.execute()
+        return record
+
+    def put_many(
+        self,
+        collection: str,
+        changes: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        atomic: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        import redis
+
+        data_key, version_key = self._key("data", collection), self._key("version", collection)
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    # Any other write bumps the version counter and aborts this transaction
+                    pipe.watch(version_key, data_key)
+                    raw_values = pipe.hmget(data_key, [key for key, _, _ in changes])
+                    current = {
+                        key: json.loads(raw)["version"]
+                        for (key, _, _), raw in zip(changes, raw_values) if raw
+                    }
+                    conflicts = self._conflicts(changes, current)
+                    if conflicts and atomic:
+                        pipe.unwatch()
+                        return [], conflicts
+                    rejected = {conflict["id"] for conflict in conflicts}
+                    version = int(pipe.get(version_key) or 0)
+                    written = []
+                    pipe.multi()
+                    for key, value, _ in changes:
+                        if key in rejected:
+                            continue
+                        version += 1
+                        record = {**value, "version": version}
+                        pipe.hset(data_key, key, json.dumps(record))
+                        pipe.zadd(self._key("order", collection), {key: version}, nx=True)
+                        pipe.zadd(self._key("changes", collection), {key: version})
+                        pipe.zrem(self._key("tombstones", collection), key)
+                        written.append(record)
+                    pipe.set(version_key, version)
+                    pipe.execute()
+                    return written, conflicts
+                except redis.WatchError:
+                    continue
+
+    def delete(self, collection: str, key: str) -> bool:
+        if not self.client.hdel(self._key("data", collection), key):
+            return False
+        version = self.client.incr(self._key("version", collection))
+        pipe = self.client.pipeline()
+        pipe.zrem(self._key("order", collection), key)
+        pipe.zrem(self._key("changes", collection), key)
+        pipe.zadd(self._key("tombstones", collection), {key: version})
+        pipe.execute()
+        return True
+
+    def iter_records(self, collection: str, after: int = 0, batch_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        while True:
+            entries = self.client.zrangebyscore(
+                self._key("order", collection), f"({after}", "+inf", start=0, num=batch_size, withscores=True
+            )
+            if not entries:
+                return
+            raw_values = self.client.hmget(self._key("data", collection), [key for key, _ in entries])
+            for (_, position), raw in zip(entries, raw_values):
+                if raw:
+                    yield int(position), json.loads(raw)
+            after = int(entries[-1][1])
+
+    def changes_since(self, collection: str, version: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        keys = self.client.zrangebyscore(self._key("changes", collection), f"({version}", "+inf")
+        raw_values = self.client.hmget(self._key("data", collection), keys) if keys else []
+        deleted = self.client.zrangebyscore(self._key("tombstones", collection), f"({version}", "+inf")
+        return [json.loads(raw) for raw in raw_values if raw], list(deleted)
+
+    def collection_version(self, collection: str) -> int:
+        return int(self.client.get(self._key("version", collection)) or 0)
+
+    def count(self, collection: str) -> int:
+        return self.client.hlen(self._key("data", collection))
+
+    def next_id(self, collection: str, count: int = 1) -> int:
+        return self.client.incr(self._key("seq", collection), count)
+
+    def append_event(self, topic: str, payload: Dict[str, Any]) -> str:
+        return self.client.xadd(
+            self._events_key(),
+            {"topic": topic, "payload": json.dumps(payload)},
+            maxlen=self.max_events,
+            approximate=True,
+        )
+
+    def read_events(self, after: Any, limit: int = 100) -> List[Tuple[Any, str, Dict[str, Any]]]:
+        entries = self.client.xrange(self._events_key(), min=f"({after}" if after else "-", count=limit)
+        return [(entry_id, fields["topic"], json.loads(fields["payload"])) for entry_id, fields in entries]
+
+    def last_event_cursor(self) -> Optional[str]:
+        entries = self.client.xrevrange(self._events_key(), count=1)
+        return entries[0][0] if entries else None
+
+
+class JournaledBackend(StateBackend):
+    """
+    Wraps a backend and writes every put, delete and id allocation to a Journal.
+
+    On start the memory backend is rebuilt from the latest snapshot plus the
+    journal tail after it; SQLite and Redis are already durable, so for them
+    the journal is only an ordered change feed for consumers. A snapshot is
+    taken in the background every `snapshot_every` entries so the tail that
+    has to be replayed stays short.
+    """
+
+    def __init__(self, backend: StateBackend, journal, snapshot_every: int = 10000):
+        self.backend = backend
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        self.name = f"{backend.name}+journal"
+        # Keeps journal order identical to apply order and snapshots consistent
+        self._lock = threading.RLock()
+        self._snapshot_offset = journal.latest_snapshot_offset()
+        self._snapshotting = False
+        self.recovery: Dict[str, Any] = {}
+        if isinstance(backend, MemoryStateBackend):
+            self._recover()
+
+    def _recover(self) -> None:
+        started = time.perf_counter()
+        offset, state = self.journal.load_snapshot()
+        if state is not None:
+            self.backend.import_state(state)
+        replayed = 0
+        for entry in self.journal.replay(offset):
+            self._apply(entry)
+            replayed += 1
+        self.recovery = {
+            "snapshot_offset": offset,
+            "replayed_entries": replayed,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        if offset or replayed:
+            print(f"✅ State recovered from journal: snapshot @{offset} + {replayed} entries in {self.recovery['seconds']}s")
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op, collection, key = entry["op"], entry["collection"], entry["key"]
+        if op == "put":
+            self.backend.put(collection, key, entry["data"])
+        elif op == "delete":
+            self.backend.delete(collection, key)
+        elif op == "seq":
+            self.backend.set_sequence(collection, entry["data"])
+
+    def _appended(self, offset: int) -> None:
+        if offset - self._snapshot_offset >= self.snapshot_every and not self._snapshotting:
+            self._snapshotting = True
+            threading.Thread(target=self.snapshot, name="journal-snapshot", daemon=True).start()
+
+    def snapshot(self) -> Optional[int]:
+        """Write a snapshot of the memory backend; returns its offset"""
+        if not isinstance(self.backend, MemoryStateBackend):
+            self._snapshotting = False
+            return None
+        try:
+            with self._lock:
+                offset = self.journal.last_offset
+                state = self.backend.export_state()
+            self.journal.write_snapshot(offset, state)
+            self._snapshot_offset = offset
+            return offset
+        finally:
+            self._snapshotting = False
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get(collection, key)
+
+    def put(self, collection: str, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            record = self.backend.put(collection, key, value)
+            offset = self.journal.append("put", collection, key, record)
+        self._appended(offset)
+        return record
+
+    def put_many(
+        self,
+        collection: str,
+        changes: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        atomic: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        with self._lock:
+            written, conflicts = self.backend.put_many(collection, changes, atomic)
+            rejected = {conflict["id"] for conflict in conflicts}
+            keys = [key for key, _, _ in changes if key not in rejected]
+            offset = None
+            for key, record in zip(keys, written):
+                offset = self.journal.append("put", collection, key, record)
+        if offset:
+            self._appended(offset)
+        return written, conflicts
+
+    def delete(self, collection: str, key: str) -> bool:
+        with self._lock:
+            deleted = self.backend.delete(collection, key)
+            offset = self.journal.append("delete", collection, key) if deleted else None
+        if offset:
+            self._appended(offset)
+        return deleted
+
+    def values(self, collection: str) -> List[Dict[str, Any]]:
+        return self.backend.values(collection)
+
+    def iter_records(self, collection: str, after: int = 0, batch_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return self.backend.iter_records(collection, after, batch_size)
+
+    def changes_since(self, collection: str, version: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        return self.backend.changes_since(collection, version)
+
+    def collection_version(self, collection: str) -> int:
+        return self.backend.collection_version(collection)
+
+    def count(self, collection: str) -> int:
+        return self.backend.count(collection)
+
+    def next_id(self, collection: str, count: int = 1) -> int:
+        with self._lock:
+            value = self.backend.next_id(collection, count)
+            offset = self.journal.append("seq", collection, None, value)
+        self._appended(offset)
+        return value
+
+    def append_event(self, topic: str, payload: Dict[str, Any]) -> Any:
+        return self.backend.append_event(topic, payload)
+
+    def read_events(self, after: Any, limit: int = 100) -> List[Tuple[Any, str, Dict[str, Any]]]:
+        return self.backend.read_events(after, limit)
+
+    def last_event_cursor(self) -> Any:
+        return self.backend.last_event_cursor()
+
+    def close(self) -> None:
+        self.journal.close()
+        self.backend.close()
+
+
+def create_backend(url: str) -> StateBackend:
+    """
+    Build a state backend from a URL
+
+    Args:
+        url: "memory", "sqlite:///path/to/file.db" or "redis://host:port/db"
+
+    Returns:
+        StateBackend instance
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteStateBackend(url[len("sqlite:///"):])
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisStateBackend(url)
+    if url == "memory":
+        return MemoryStateBackend()
+    raise ValueError(f"Unsupported SARS_STATE_BACKEND: {url}")
+
+
+def _journaled(backend: StateBackend) -> StateBackend:
+    """
+    Wrap the backend in a journal when SARS_JOURNAL_DIR is set
+
+    The journal is a local file owned by one process, so it only sees that
+    process's writes. A second process writing to the same state would
+    leave gaps in the change feed and in recovery, so it refuses to start
+    instead of running unjournaled: use a single worker with the journal.
+    """
+    directory = os.getenv("SARS_JOURNAL_DIR")
+    if not directory:
+        return backend
+    from services.journal import Journal, JournalLocked
+    try:
+        journal = Journal(
+            directory,
+            segment_bytes=int(float(os.getenv("SARS_JOURNAL_SEGMENT_MB", "64")) * 1024 * 1024),
+            fsync_interval=float(os.getenv("SARS_JOURNAL_FSYNC_MS", "50")) / 1000,
+            retain_segments=int(os.getenv("SARS_JOURNAL_RETAIN_SEGMENTS", "4"))
+        )
+    except JournalLocked as e:
+        raise RuntimeError(
+            f"SARS_JOURNAL_DIR {e}. The journal records a single process's writes; "
+            f"run one worker with SARS_JOURNAL_DIR, or unset it to run several workers on {backend.name}"
+        ) from e
+    return JournaledBackend(backend, journal, snapshot_every=int(os.getenv("SARS_JOURNAL_SNAPSHOT_EVERY", "10000")))
+
+
+# Singleton instance shared by all routers
+state_store = _journaled(create_backend(os.getenv("SARS_STATE_BACKEND", "memory")))
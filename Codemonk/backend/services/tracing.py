@@ -0,0 +1,270 @@
+import os
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from services.event_bus import event_bus
+
+# Stage spans whose end-to-end gap is the call-to-dispatch KPI (a call enters by audio or by text)
+KPI_STARTS = ("transcription.upload", "transcription.extract_text")
+KPI_END = "whatsapp.send_hospital_assignment"
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace id, parent span id) from a W3C traceparent header"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+class Span:
+    """One timed stage of an incident; finished spans are plain dicts"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start", "_started", "status", "root", "_finished")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], root: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        # Wall clock lines spans up across workers; perf_counter measures the duration
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.status = "ok"
+        self.root = root or self
+        self._finished: List[Dict[str, Any]] = [] if root is None else root._finished
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def _finish(self) -> Dict[str, Any]:
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+        self._finished.append(record)
+        return record
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanStore:
+    """
+    In-process exporter: the most recent `max_traces` traces, oldest evicted first.
+
+    Spans from one request are exported together when its root span ends,
+    as a single "trace.spans" event, so every worker holds every trace no
+    matter which worker served which stage.
+    """
+
+    def __init__(self, max_traces: int = 5000, max_spans_per_trace: int = 500):
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, spans: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for span in spans:
+                trace = self._traces.get(span["trace_id"])
+                if trace is None:
+                    trace = self._traces[span["trace_id"]] = []
+                    while len(self._traces) > self.max_traces:
+                        self._traces.popitem(last=False)
+                if len(trace) < self.max_spans_per_trace:
+                    trace.append(span)
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener collecting spans exported by every worker"""
+        if topic == "trace.spans":
+            self.add(data.get("spans") or [])
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return sorted(spans, key=lambda span: span["start"]) if spans else None
+
+    def recent(self, limit: int) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        with self._lock:
+            items = list(self._traces.items())[-limit:]
+        return [(trace_id, list(spans)) for trace_id, spans in reversed(items)]
+
+    def all(self) -> List[List[Dict[str, Any]]]:
+        with self._lock:
+            return [list(spans) for spans in self._traces.values()]
+
+
+class Tracer:
+    """
+    Creates spans and carries the current one in a ContextVar, so nested
+    `with tracer.span(...)` blocks and awaited coroutines pick up their parent
+    automatically. Work started in another HTTP request continues the same
+    trace by passing its trace id (stored on the emergency record) or a
+    traceparent header.
+    """
+
+    def __init__(self, store: SpanStore, publish=None):
+        self.store = store
+        self.publish = publish
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        **attributes: Any
+    ) -> Iterator[Span]:
+        """
+        Time a block as a span
+
+        Args:
+            name: Stage name, e.g. "dispatch.create"
+            trace_id: Trace to join; defaults to the current span's trace or a new one
+            parent_id: Remote parent span id (from a traceparent header)
+            **attributes: Initial span attributes
+        """
+        current = _current.get()
+        if current is not None and trace_id in (None, current.trace_id):
+            span = Span(name, current.trace_id, current.span_id, current.root, attributes)
+        else:
+            span = Span(name, trace_id or new_trace_id(), parent_id, None, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current.reset(token)
+            span._finish()
+            if span.root is span:
+                self._export(span._finished)
+
+    def _export(self, spans: List[Dict[str, Any]]) -> None:
+        if self.publish is None:
+            self.store.add(spans)
+            return
+        try:
+            self.publish("trace.spans", {"spans": spans})
+        except Exception as e:
+            print(f"⚠️ Could not export {len(spans)} spans: {e}")
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current.get()
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        span = _current.get()
+        return span.trace_id if span is not None else None
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(values)
+
+    def at(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int((len(ordered) - 1) * p))], 1)
+
+    return {"count": len(ordered), "p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(ordered[-1], 1)}
+
+
+def summarize(trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Timeline of one trace: offsets, per-stage totals and time spent between requests"""
+    spans = sorted(spans, key=lambda span: span["start"])
+    origin = spans[0]["start"]
+    end = max(span["start"] + span["duration_ms"] / 1000 for span in spans)
+    ids = {span["span_id"] for span in spans}
+
+    # Root spans are whole requests; uncovered time between them is people and network
+    roots = [span for span in spans if span["parent_id"] not in ids]
+    busy, cursor = 0.0, origin
+    for span in roots:
+        span_end = span["start"] + span["duration_ms"] / 1000
+        busy += max(0.0, span_end - max(cursor, span["start"]))
+        cursor = max(cursor, span_end)
+
+    stages: Dict[str, float] = {}
+    for span in spans:
+        stages[span["name"]] = round(stages.get(span["name"], 0.0) + span["duration_ms"], 3)
+
+    attributes: Dict[str, Any] = {}
+    for span in spans:
+        for key in ("emergency_id", "dispatch_id", "call_id", "ambulance_id"):
+            if key in span["attributes"] and key not in attributes:
+                attributes[key] = span["attributes"][key]
+
+    return {
+        "trace_id": trace_id,
+        "started_at": origin,
+        "duration_ms": round((end - origin) * 1000, 1),
+        "in_requests_ms": round(busy * 1000, 1),
+        "between_requests_ms": round(max(0.0, (end - origin) - busy) * 1000, 1),
+        "call_to_dispatch_ms": kpi_ms(spans),
+        "errors": sum(1 for span in spans if span["status"] == "error"),
+        "stages_ms": stages,
+        **attributes,
+        "spans": [
+            {**span, "offset_ms": round((span["start"] - origin) * 1000, 1)}
+            for span in spans
+        ]
+    }
+
+
+def kpi_ms(spans: List[Dict[str, Any]]) -> Optional[float]:
+    """Call arriving for transcription to the WhatsApp assignment leaving, if both happened"""
+    starts = [span["start"] for span in spans if span["name"] in KPI_STARTS]
+    ends = [span["start"] + span["duration_ms"] / 1000 for span in spans if span["name"] == KPI_END]
+    if not starts or not ends:
+        return None
+    return round((max(ends) - min(starts)) * 1000, 1)
+
+
+def aggregate(traces: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Per-stage latency percentiles and the call-to-dispatch KPI across traces"""
+    by_stage: Dict[str, List[float]] = {}
+    kpis = []
+    for spans in traces:
+        for span in spans:
+            by_stage.setdefault(span["name"], []).append(span["duration_ms"])
+        kpi = kpi_ms(spans)
+        if kpi is not None:
+            kpis.append(kpi)
+    return {
+        "traces": len(traces),
+        "call_to_dispatch": _percentiles(kpis),
+        "stages": {name: _percentiles(values) for name, values in sorted(by_stage.items())}
+    }
+
+
+# Singleton instances
+span_store = SpanStore(max_traces=int(os.getenv("SARS_TRACE_MAX_TRACES", "5000")))
+tracer = Tracer(span_store, publish=event_bus.publish)
@@ -0,0 +1,281 @@
+import re
+import bisect
+import threading
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from services.geocoder import normalize, STOPWORDS
+
+# Collection holding processed calls (transcript + extraction) in the state backend
+CALLS = "calls"
+
+# Extraction fields indexed alongside the transcript
+INDEXED_FIELDS = (
+    "emergency_type", "symptoms", "location", "patient_name", "caller_name",
+    "special_requirements", "consciousness", "breathing", "geocoded_place"
+)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# A prefix term expands to at most this many indexed terms (most frequent first)
+MAX_EXPANSIONS = 64
+
+SNIPPET_CHARS = 160
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in normalize(text).split() if token not in STOPWORDS]
+
+
+def _epoch(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def call_text(record: Dict[str, Any]) -> str:
+    """Everything searchable about a call, as one string"""
+    extracted = record.get("extracted_data") or {}
+    parts = [record.get("transcription") or ""]
+    for field in INDEXED_FIELDS:
+        value = extracted.get(field)
+        if isinstance(value, list):
+            parts.extend(str(item) for item in value)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+def snippet(text: str, terms: Iterable[str]) -> str:
+    """Window of the transcript around the first matched term"""
+    lowered = text.lower()
+    first = min(
+        (match.start() for term in terms for match in [re.search(rf"\b{re.escape(term)}", lowered)] if match),
+        default=0
+    )
+    start = max(0, first - SNIPPET_CHARS // 3)
+    end = min(len(text), start + SNIPPET_CHARS)
+    return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+
+class _Postings:
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self):
+        # Doc ids are assigned in insertion order, so appends keep these sorted
+        self.docs = array("I")
+        self.tfs = array("H")
+
+
+class TranscriptIndex:
+    """
+    Inverted index over call transcripts and extraction results, ranked with BM25.
+
+    Postings are compact arrays (4-byte doc id + 2-byte term frequency) and
+    per-document metadata lives in parallel arrays, so a million calls cost
+    tens of megabytes. Queries view the postings of their own terms as NumPy
+    arrays, count matches per call to intersect them, apply the
+    severity/type/time filters as masks and score all candidates at once. The last query word (or any word ending
+    in '*') also matches as a prefix, through a sorted vocabulary.
+
+    Documents are added incrementally as calls are recorded, through the
+    event bus on every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, _Postings] = {}
+        self._vocabulary: List[str] = []
+        self._keys: List[str] = []
+        self._doc_of: Dict[str, int] = {}
+        self._lengths = array("I")
+        self._times = array("d")
+        self._severity = array("B")
+        self._types = array("H")
+        self._severity_codes: Dict[str, int] = {}
+        self._type_codes: Dict[str, int] = {}
+        self._total_length = 0
+
+    @staticmethod
+    def _code(codes: Dict[str, int], value: Any) -> int:
+        key = normalize(str(value or ""))
+        if key not in codes:
+            codes[key] = len(codes)
+        return codes[key]
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Index one call record; False if it was already indexed"""
+        key = record["id"]
+        extracted = record.get("extracted_data") or {}
+        counts = Counter(tokenize(call_text(record)))
+        with self._lock:
+            if key in self._doc_of:
+                return False
+            doc = len(self._keys)
+            self._keys.append(key)
+            self._doc_of[key] = doc
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+            self._times.append(_epoch(record.get("created_at")))
+            self._severity.append(self._code(self._severity_codes, extracted.get("severity")))
+            self._types.append(self._code(self._type_codes, extracted.get("emergency_type")))
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                    bisect.insort(self._vocabulary, term)
+                postings.docs.append(doc)
+                postings.tfs.append(min(tf, 65535))
+            return True
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for record in records if self.add(record))
+
+    def on_event(self, topic: str, data: Dict[str, Any]) -> None:
+        """Event bus listener indexing calls recorded on any worker"""
+        if topic == "call.recorded" and data.get("id"):
+            self.add(data)
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        terms = self._vocabulary[start:end]
+        if len(terms) > MAX_EXPANSIONS:
+            terms = sorted(terms, key=lambda term: len(self._postings[term].docs), reverse=True)[:MAX_EXPANSIONS]
+        return terms
+
+    def search(
+        self,
+        query: str = "",
+        severity: Optional[str] = None,
+        emergency_type: Optional[str] = None,
+        after: Optional[float] = None,
+        before: Optional[float] = None,
+        match_all: bool = True,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Ranked call ids for a query
+
+        Args:
+            query: Words to match; the last word (or any ending in '*') also matches as a prefix
+            severity: Only calls with this extracted severity
+            emergency_type: Only calls with this extracted emergency type
+            after: Only calls created at or after this Unix time
+            before: Only calls created before this Unix time
+            match_all: Require every word (True) or any word (False)
+            limit: Maximum hits
+
+        Returns:
+            total (matching calls), hits as (call id, score) and the terms searched
+        """
+        raw_words = query.split()
+        groups: List[Tuple[str, bool]] = []
+        for i, raw_word in enumerate(raw_words):
+            prefix = raw_word.endswith("*") or i == len(raw_words) - 1
+            groups.extend((word, prefix) for word in normalize(raw_word).split() if word not in STOPWORDS)
+
+        with self._lock:
+            # NumPy views over the arrays must not outlive the lock, so all work happens here
+            return self._search(groups, severity, emergency_type, after, before, match_all, limit)
+
+    def _search(
+        self,
+        groups: List[Tuple[str, bool]],
+        severity: Optional[str],
+        emergency_type: Optional[str],
+        after: Optional[float],
+        before: Optional[float],
+        match_all: bool,
+        limit: int
+    ) -> Dict[str, Any]:
+        terms_by_group = []
+        for word, prefix in groups:
+            terms = self._expand(word) if prefix else []
+            if word in self._postings and word not in terms:
+                terms.insert(0, word)
+            terms_by_group.append(terms)
+        searched = [term for terms in terms_by_group for term in terms]
+
+        count = len(self._keys)
+        severity_code = self._severity_codes.get(normalize(severity)) if severity else None
+        type_code = self._type_codes.get(normalize(emergency_type)) if emergency_type else None
+        empty = {"total": 0, "hits": [], "terms": searched}
+        if not count or (severity and severity_code is None) or (emergency_type and type_code is None):
+            return empty
+
+        postings = {
+            term: (np.frombuffer(self._postings[term].docs, dtype=np.uint32),
+                   np.frombuffer(self._postings[term].tfs, dtype=np.uint16))
+            for term in searched
+        }
+        if groups:
+            # Count matched groups per call; a call's ids are unique within each group
+            matched = np.zeros(count, dtype=np.uint8)
+            for terms in terms_by_group:
+                if len(terms) == 1:
+                    matched[postings[terms[0]][0]] += 1
+                elif terms:
+                    matched[np.unique(np.concatenate([postings[term][0] for term in terms]))] += 1
+            candidates = np.flatnonzero(matched >= (len(groups) if match_all else 1))
+        else:
+            candidates = np.arange(count, dtype=np.int64)
+
+        times = np.frombuffer(self._times, dtype=np.float64, count=count)
+        if severity_code is not None:
+            candidates = candidates[np.frombuffer(self._severity, dtype=np.uint8, count=count)[candidates] == severity_code]
+        if type_code is not None:
+            candidates = candidates[np.frombuffer(self._types, dtype=np.uint16, count=count)[candidates] == type_code]
+        if after is not None:
+            candidates = candidates[times[candidates] >= after]
+        if before is not None:
+            candidates = candidates[times[candidates] < before]
+        if not len(candidates):
+            return empty
+
+        if searched:
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32, count=count)[candidates]
+            norm = K1 * (1 - B + B * lengths / (self._total_length / count or 1.0))
+            scores = np.zeros(len(candidates))
+            for term in searched:
+                docs, tfs = postings[term]
+                idf = np.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+                position = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+                tf = np.where(docs[position] == candidates, tfs[position], 0).astype(np.float64)
+                scores += idf * tf * (K1 + 1) / (tf + norm)
+        else:
+            # Filters only: newest first
+            scores = times[candidates]
+
+        top = np.argpartition(-scores, limit - 1)[:limit] if len(candidates) > limit else np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return {
+            "total": int(len(candidates)),
+            "hits": [
+                (self._keys[candidates[i]], round(float(scores[i]), 4) if searched else None)
+                for i in top.tolist()
+            ],
+            "terms": searched
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            postings = sum(len(p.docs) for p in self._postings.values())
+            return {
+                "calls": len(self._keys),
+                "terms": len(self._vocabulary),
+                "postings": postings,
+                "postings_bytes": postings * 6
+            }
+
+
+# Singleton instance
+transcript_index = TranscriptIndex()
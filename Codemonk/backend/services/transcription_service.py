@@ -5,6 +5,10 @@ from typing import Dict, Any
 from groq import Groq
 from pathlib import Path
 from dotenv import load_dotenv
+from services.resilience import groq_transcription_policy, groq_extraction_policy
+from services.geocoder import geocoder
+from services.incident_index import extraction_cache
+from services.tracing import tracer
 
 # Load environment variables
 load_dotenv()
@@ -21,6 +25,17 @@ class TranscriptionService:
         self.api_key = os.getenv("GROQ_API_KEY")
         self.client = Groq(api_key=self.api_key)
 
+    def _transcribe_file(self, audio_file_path: str):
+        # Runs on the policy's worker thread. The file is opened here, not by the
+        # caller, so a missed deadline cannot close it while the upload is still reading.
+        with open(audio_file_path, "rb") as audio_file:
+            return self.client.audio.transcriptions.create(
+                model="whisper-large-v3",
+                file=audio_file,
+                language="en",  # Can be made dynamic based on requirement
+                response_format="json"
+            )
+
     async def transcribe_audio(self, audio_file_path: str) -> Dict[str, Any]:
         """
         Transcribe audio file to text using OpenAI Whisper API
@@ -32,14 +47,10 @@ class TranscriptionService:
             Dictionary containing transcription and extracted information
         """
         try:
-            # Read audio file
-            with open(audio_file_path, "rb") as audio_file:
-                # Use Groq Whisper API for transcription
-                transcript_response = self.client.audio.transcriptions.create(
-                    model="whisper-large-v3",
-                    file=audio_file,
-                    language="en",  # Can be made dynamic based on requirement
-                    response_format="json"
+            # Use Groq Whisper API for transcription (deadline + circuit breaker)
+            with tracer.span("groq.transcribe", model="whisper-large-v3"):
+                transcript_response = await groq_transcription_policy.call_async(
+                    self._transcribe_file, audio_file_path
                 )
 
             transcribed_text = transcript_response.text if hasattr(
@@ -82,6 +93,12 @@ class TranscriptionService:
         Returns:
             Dictionary with extracted patient information
         """
+        # A re-upload of the same call reuses the earlier result; similar calls are always re-extracted
+        cached = extraction_cache.get(transcribed_text)
+        if cached is not None:
+            cached["reused_extraction"] = True
+            return cached
+
         try:
             # Prompt for Groq Llama to extract structured information
             extraction_prompt = f"""
@@ -138,21 +155,25 @@ Return ONLY valid JSON. No markdown, no explanations, just the JSON object.
 """
 
             # Call Groq API for information extraction using Llama
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert medical AI for emergency services. Extract information from calls and intelligently fill missing details using medical knowledge. When extracting phone numbers, recognize alternative phrases like 'contact number', 'mobile number', 'cell number', 'telephone', 'number to reach', etc. Always provide specific, actionable information. Return ONLY valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": extraction_prompt
-                    }
-                ],
-                temperature=0.3,  # Balanced for extraction and inference
-                max_tokens=1200
-            )
+            # Extraction is idempotent, so slow calls are hedged; an open circuit
+            # or missed deadline falls through to the default patient info below
+            with tracer.span("groq.extract", model="llama-3.3-70b-versatile"):
+                response = await groq_extraction_policy.call_async(
+                    self.client.chat.completions.create,
+                    model="llama-3.3-70b-versatile",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are an expert medical AI for emergency services. Extract information from calls and intelligently fill missing details using medical knowledge. When extracting phone numbers, recognize alternative phrases like 'contact number', 'mobile number', 'cell number', 'telephone', 'number to reach', etc. Always provide specific, actionable information. Return ONLY valid JSON."
+                        },
+                        {
+                            "role": "user",
+                            "content": extraction_prompt
+                        }
+                    ],
+                    temperature=0.3,  # Balanced for extraction and inference
+                    max_tokens=1200
+                )
 
             # Parse the response
             extracted_json = response.choices[0].message.content.strip()
@@ -183,6 +204,10 @@ Return ONLY valid JSON. No markdown, no explanations, just the JSON object.
             }
             extracted_data["priority"] = priority_map.get(severity, 3)
 
+            # Resolve the spoken location against the offline gazetteer
+            self._add_coordinates(extracted_data)
+
+            extraction_cache.put(transcribed_text, extracted_data)
             return extracted_data
 
         except json.JSONDecodeError as e:
@@ -192,6 +217,23 @@ Return ONLY valid JSON. No markdown, no explanations, just the JSON object.
             print(f"Extraction error: {e}")
             return self._get_default_patient_info()
 
+    def _add_coordinates(self, data: Dict[str, Any]) -> None:
+        """
+        Fill latitude/longitude from the gazetteer unless the model already gave them
+
+        Only confident matches are used (see geocoder.resolve); a vague
+        location such as "near the main market" is left without coordinates
+        for the dispatcher to place rather than snapped to some landmark.
+        """
+        if data.get("latitude") is not None and data.get("longitude") is not None:
+            return
+        match = geocoder.resolve(str(data.get("location", "")))
+        data["latitude"] = match["latitude"] if match else None
+        data["longitude"] = match["longitude"] if match else None
+        if match:
+            data["geocoded_place"] = match["name"]
+            data["geocode_score"] = match["score"]
+
     def _get_default_patient_info(self) -> Dict[str, Any]:
         """Return default patient information structure when extraction fails"""
         return {
@@ -0,0 +1,11 @@
+"""
+City simulator for benchmarking dispatch policies at scale
+
+Generates a synthetic fleet and Poisson emergency arrivals, then drives the
+real routers and services in-process on a virtual clock.
+
+Run: python -m simulation --ambulances 2000 --calls-per-minute 50 --hours 4
+"""
+
+from simulation.engine import CitySimulator, POLICIES
+from simulation.scenario import generate_fleet, poisson_arrivals
@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+# The simulation rewrites the fleet; keep it away from any shared backend
+os.environ["SARS_STATE_BACKEND"] = "memory"
+os.environ.pop("SARS_JOURNAL_DIR", None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SARS discrete-event city simulator")
+    parser.add_argument("--ambulances", type=int, default=2000, help="Fleet size")
+    parser.add_argument("--calls-per-minute", type=float, default=50.0, help="Mean emergency arrival rate")
+    parser.add_argument("--hours", type=float, default=1.0, help="Simulated hours")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--policy", default="nearest_capable", help="nearest or nearest_capable")
+    parser.add_argument("--json", dest="json_path", help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    from simulation.engine import CitySimulator
+
+    simulator = CitySimulator(
+        fleet_size=args.ambulances,
+        calls_per_minute=args.calls_per_minute,
+        hours=args.hours,
+        seed=args.seed,
+        policy=args.policy
+    )
+    report = asyncio.run(simulator.run())
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\n📝 Report written to {args.json_path}")
+
+
+def print_report(report):
+    config, summary = report["config"], report["summary"]
+    print("\n" + "=" * 78)
+    print("   SARS City Simulation")
+    print("=" * 78)
+    print(f"   Fleet {config['fleet_size']} units | {config['calls_per_minute']} calls/min | "
+          f"{config['hours']} h | policy {config['policy']}")
+    print("-" * 78)
+    print(f"   {'hour':>4} {'calls':>6} {'queued':>6} {'p50 min':>8} {'p90 min':>8} {'p95 min':>8} "
+          f"{'util':>6} {'cpu ms':>9} {'ms/call':>8}")
+    for hour in report["per_hour"]:
+        response = hour["response_time"]
+        print(f"   {hour['hour']:>4} {hour['calls']:>6} {hour['queued_for_unit']:>6} "
+              f"{_fmt(response['p50_min']):>8} {_fmt(response['p90_min']):>8} {_fmt(response['p95_min']):>8} "
+              f"{hour['utilisation']:>6.1%} {hour['backend_cpu_ms']:>9.1f} {_fmt(hour['backend_cpu_per_call_ms']):>8}")
+    print("-" * 78)
+    response = summary["response_time"]
+    print(f"   Response time: mean {_fmt(response['mean_min'])} min, p50 {_fmt(response['p50_min'])}, "
+          f"p95 {_fmt(response['p95_min'])}, max {_fmt(response['max_min'])}")
+    print(f"   Calls {summary['calls']}, still waiting at end {summary['unserved_at_end']}, "
+          f"utilisation {summary['utilisation']:.1%}")
+    print(f"   Backend CPU {summary['backend_cpu_seconds']} s of {summary['process_cpu_seconds']} s process CPU")
+    print(f"   Wall time {summary['wall_seconds']} s ({summary['speedup_vs_real_time']}x real time)")
+    print("=" * 78)
+
+
+def _fmt(value):
+    return "-" if value is None else value
+
+
+if __name__ == "__main__":
+    sys.exit(main())
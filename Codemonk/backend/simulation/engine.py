@@ -0,0 +1,351 @@
+import time
+import heapq
+import random
+import orjson
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import Response
+from routers import ambulances, dispatch, emergencies, hospitals
+from models.dispatch import DispatchCreate
+from models.emergency import EmergencyCreate
+from models.ambulance import AmbulanceBulkUpdate, AmbulanceChange, Location
+from services.state_store import state_store, MemoryStateBackend
+from services.capability_index import capability_index
+from services.hospital_registry import hospital_registry, ROAD_FACTOR, AVERAGE_SPEED_KMH
+from services.geo import haversine_km
+from services.sms_service import sms_service
+from simulation.scenario import generate_fleet, poisson_arrivals
+
+# Unit selection policies: name -> whether special_requirements filter candidates first
+POLICIES = {
+    "nearest": False,
+    "nearest_capable": True,
+}
+
+
+def _percentile(ordered: List[float], p: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * p / 100))]
+
+
+class _HourStats:
+    def __init__(self):
+        self.calls = 0
+        self.dispatched = 0
+        self.queued = 0
+        self.response_seconds: List[float] = []
+        self.busy_seconds = 0.0
+        self.backend_cpu = 0.0
+        self.backend_calls = 0
+
+
+class CitySimulator:
+    """
+    Discrete-event simulation of a city driving the real routers in-process.
+
+    Calls arrive as a Poisson process. Each call goes through the same
+    handlers the dispatcher UI hits: create the emergency, list available
+    (capable) ambulances, rank hospitals, dispatch. The unit then drives to
+    the scene, spends time on scene, transports to the hospital, hands over
+    and becomes available again at the hospital. Time is virtual, so hours
+    of city time run in seconds; only the backend calls take real CPU, and
+    that CPU is measured and reported per simulated hour.
+
+    Runs against the memory state backend only, with WhatsApp sending
+    switched off.
+    """
+
+    def __init__(
+        self,
+        fleet_size: int = 2000,
+        calls_per_minute: float = 50.0,
+        hours: float = 1.0,
+        seed: int = 42,
+        policy: str = "nearest_capable",
+        turnout_seconds: float = 60.0,
+        scene_minutes: Tuple[float, float] = (10.0, 25.0),
+        handover_minutes: float = 15.0,
+        bed_stay_hours: float = 6.0
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; choose from {', '.join(POLICIES)}")
+        self.fleet_size = fleet_size
+        self.calls_per_minute = calls_per_minute
+        self.duration = hours * 3600.0
+        self.policy = policy
+        self.turnout_seconds = turnout_seconds
+        self.scene_minutes = scene_minutes
+        self.handover_minutes = handover_minutes
+        self.bed_stay_hours = bed_stay_hours
+        self.rng = random.Random(seed)
+
+        self.now = 0.0
+        self._events: List[Tuple[float, int, str, Dict[str, Any]]] = []
+        self._sequence = 0
+        self._pending: List[Tuple[int, float, int, Dict[str, Any]]] = []
+        self._busy_since: Dict[str, float] = {}
+        self._positions: Dict[str, Tuple[float, float]] = {}
+        self._hours = [_HourStats() for _ in range(max(1, int(-(-self.duration // 3600))))]
+        self.unserved = 0
+
+    def _hour(self, at: Optional[float] = None) -> _HourStats:
+        index = int((self.now if at is None else at) // 3600)
+        return self._hours[min(index, len(self._hours) - 1)]
+
+    def _schedule(self, delay: float, kind: str, data: Dict[str, Any]) -> None:
+        self._sequence += 1
+        heapq.heappush(self._events, (self.now + delay, self._sequence, kind, data))
+
+    async def _backend(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one backend handler and charge its CPU to the current simulated hour"""
+        started = time.process_time()
+        result = await call()
+        stats = self._hour()
+        stats.backend_cpu += time.process_time() - started
+        stats.backend_calls += 1
+        return result
+
+    @staticmethod
+    def _travel_seconds(origin: Tuple[float, float], target: Tuple[float, float]) -> float:
+        distance = haversine_km(origin[0], origin[1], target[0], target[1])
+        return distance * ROAD_FACTOR / AVERAGE_SPEED_KMH * 3600
+
+    def setup(self) -> None:
+        """Replace the fleet with a synthetic one"""
+        if not isinstance(state_store, MemoryStateBackend):
+            raise RuntimeError("The simulator only runs on the memory state backend (SARS_STATE_BACKEND=memory)")
+        # Never message real drivers from a simulation
+        sms_service.is_configured = False
+
+        for record in state_store.values(ambulances.AMBULANCES):
+            state_store.delete(ambulances.AMBULANCES, record["id"])
+            capability_index.remove(record["id"])
+
+        fleet = generate_fleet(self.fleet_size, self.rng)
+        for record in fleet:
+            state_store.put(ambulances.AMBULANCES, record["id"], record)
+            location = record["current_location"]
+            self._positions[record["id"]] = (location["latitude"], location["longitude"])
+        capability_index.load(state_store.values(ambulances.AMBULANCES))
+
+    async def _set_status(self, ambulance_id: str, status: str, position: Optional[Tuple[float, float]] = None) -> None:
+        """Change a unit's status (and position) through the fleet status endpoint, as a console would"""
+        location = Location(latitude=position[0], longitude=position[1]) if position is not None else None
+        await ambulances.bulk_update_ambulances(AmbulanceBulkUpdate(
+            updates=[AmbulanceChange(id=ambulance_id, status=status, current_location=location)]
+        ))
+        # The event bus is not polled during a run, so apply the endpoint's ambulance.updated here
+        capability_index.upsert(state_store.get(ambulances.AMBULANCES, ambulance_id))
+
+    async def _available_units(self, requirements: Optional[List[str]]) -> List[Dict[str, Any]]:
+        response = await ambulances.get_all_ambulances(
+            status="available",
+            capabilities=None,
+            requirements=",".join(requirements) if requirements else None
+        )
+        return orjson.loads(response.body)
+
+    async def _choose_unit(self, call: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        candidates: List[Dict[str, Any]] = []
+        if POLICIES[self.policy]:
+            candidates = await self._backend(lambda: self._available_units(call["special_requirements"]))
+        if not candidates:
+            candidates = await self._backend(lambda: self._available_units(None))
+        if not candidates:
+            return None
+        origin = (call["latitude"], call["longitude"])
+        return min(
+            candidates,
+            key=lambda unit: haversine_km(
+                origin[0], origin[1],
+                unit["current_location"]["latitude"], unit["current_location"]["longitude"]
+            )
+        )
+
+    async def _dispatch(self, call: Dict[str, Any]) -> bool:
+        unit = await self._choose_unit(call)
+        if unit is None:
+            return False
+
+        recommendation = await self._backend(lambda: hospitals.recommend_hospitals(
+            emergency_id=call["emergency_id"],
+            latitude=call["latitude"],
+            longitude=call["longitude"],
+            requirements=None,
+            emergency_type=None,
+            limit=1,
+            radius_km=50.0
+        ))
+        hospital = recommendation["hospitals"][0] if recommendation["hospitals"] else None
+
+        unit_position = self._positions[unit["id"]]
+        scene = (call["latitude"], call["longitude"])
+        to_scene = self.turnout_seconds + self._travel_seconds(unit_position, scene)
+
+        await self._backend(lambda: dispatch.dispatch_ambulance(
+            DispatchCreate(
+                ambulance_id=unit["id"],
+                emergency_id=call["emergency_id"],
+                hospital_id=hospital["id"] if hospital else None,
+                hospital_name=None if hospital else "Nearest hospital",
+                hospital_address=None if hospital else "Unknown",
+                driver_phone=unit["driver"]["phone"],
+                driver_name=unit["driver"]["name"],
+                eta=f"{round(to_scene / 60)} minutes"
+            ),
+            Response(),
+            None,
+            None
+        ))
+        await self._backend(lambda: self._set_status(unit["id"], "dispatched"))
+
+        self._busy_since[unit["id"]] = self.now
+        self._hour(call["arrived_at"]).dispatched += 1
+        self._schedule(to_scene, "on_scene", {"call": call, "unit": unit["id"], "hospital": hospital})
+        return True
+
+    def _record_busy(self, ambulance_id: str) -> None:
+        """Spread a unit's busy interval over the hour buckets it covers"""
+        start = self._busy_since.pop(ambulance_id, None)
+        if start is None:
+            return
+        end = min(self.now, self.duration)
+        while start < end:
+            hour_end = min(end, (int(start // 3600) + 1) * 3600)
+            self._hour(start).busy_seconds += hour_end - start
+            start = hour_end
+
+    async def _on_call(self, payload: Dict[str, Any]) -> None:
+        # Every synthetic call is a separate incident that needs its own unit. Their texts repeat
+        # and the dedup window runs on wall-clock time, which spans the whole accelerated run, so
+        # deduplication would merge unrelated calls.
+        result = await self._backend(lambda: emergencies.create_emergency(EmergencyCreate(**payload), False, None))
+        call = {**payload, "emergency_id": result["emergency"]["id"], "arrived_at": self.now}
+        self._hour().calls += 1
+        if not await self._dispatch(call):
+            self._hour().queued += 1
+            self._sequence += 1
+            heapq.heappush(self._pending, (payload["priority"], self.now, self._sequence, call))
+
+    async def _on_scene(self, data: Dict[str, Any]) -> None:
+        call = data["call"]
+        self._hour(call["arrived_at"]).response_seconds.append(self.now - call["arrived_at"])
+        self._positions[data["unit"]] = (call["latitude"], call["longitude"])
+        scene_time = self.rng.uniform(*self.scene_minutes) * 60
+        hospital = data["hospital"]
+        if hospital is None:
+            self._schedule(scene_time, "free", {"unit": data["unit"]})
+            return
+        transport = self._travel_seconds(self._positions[data["unit"]], (hospital["latitude"], hospital["longitude"]))
+        self._schedule(scene_time + transport, "at_hospital", data)
+
+    async def _on_hospital(self, data: Dict[str, Any]) -> None:
+        hospital = data["hospital"]
+        self._positions[data["unit"]] = (hospital["latitude"], hospital["longitude"])
+        await self._backend(lambda: _sync(self._adjust_beds, hospital["id"], -1))
+        self._schedule(self.handover_minutes * 60, "free", {"unit": data["unit"]})
+        self._schedule(self.rng.expovariate(1 / (self.bed_stay_hours * 3600)), "discharge", {"hospital": hospital["id"]})
+
+    def _adjust_beds(self, hospital_id: str, delta: int) -> None:
+        current = hospital_registry.get(hospital_id)
+        beds = min(current["beds_total"], max(0, current["beds_available"] + delta))
+        if beds != current["beds_available"]:
+            hospital_registry.update_capacity(hospital_id, {"beds_available": beds})
+
+    async def _on_free(self, data: Dict[str, Any]) -> None:
+        ambulance_id = data["unit"]
+        self._record_busy(ambulance_id)
+        await self._backend(lambda: self._set_status(ambulance_id, "available", self._positions[ambulance_id]))
+        # Serve the most urgent waiting call first
+        while self._pending:
+            _, _, _, call = self._pending[0]
+            if not await self._dispatch(call):
+                break
+            heapq.heappop(self._pending)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the simulation and return the report"""
+        self.setup()
+        arrivals = poisson_arrivals(self.calls_per_minute, self.duration, self.rng)
+        handlers = {
+            "on_scene": self._on_scene,
+            "at_hospital": self._on_hospital,
+            "free": self._on_free,
+            "discharge": lambda data: self._backend(lambda: _sync(self._adjust_beds, data["hospital"], 1)),
+        }
+
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        next_arrival = next(arrivals, None)
+        while True:
+            next_event = self._events[0][0] if self._events else None
+            if next_arrival is not None and (next_event is None or next_arrival[0] <= next_event):
+                self.now = next_arrival[0]
+                await self._on_call(next_arrival[1])
+                next_arrival = next(arrivals, None)
+            elif next_event is not None and next_event < self.duration:
+                self.now, _, kind, data = heapq.heappop(self._events)
+                await handlers[kind](data)
+            else:
+                break
+
+        self.now = self.duration
+        for ambulance_id in list(self._busy_since):
+            self._record_busy(ambulance_id)
+        self.unserved = len(self._pending)
+        return self.report(time.perf_counter() - wall_started, time.process_time() - cpu_started)
+
+    def report(self, wall_seconds: float, cpu_seconds: float) -> Dict[str, Any]:
+        def summarize(samples: List[float]) -> Dict[str, Optional[float]]:
+            ordered = sorted(samples)
+            minutes = lambda value: round(value / 60, 2) if value is not None else None
+            return {
+                "count": len(ordered),
+                "mean_min": minutes(sum(ordered) / len(ordered)) if ordered else None,
+                "p50_min": minutes(_percentile(ordered, 50)),
+                "p90_min": minutes(_percentile(ordered, 90)),
+                "p95_min": minutes(_percentile(ordered, 95)),
+                "max_min": minutes(ordered[-1] if ordered else None)
+            }
+
+        per_hour = []
+        for index, stats in enumerate(self._hours):
+            hour_seconds = min(3600.0, self.duration - index * 3600)
+            per_hour.append({
+                "hour": index,
+                "calls": stats.calls,
+                "dispatched": stats.dispatched,
+                "queued_for_unit": stats.queued,
+                "response_time": summarize(stats.response_seconds),
+                "utilisation": round(stats.busy_seconds / (self.fleet_size * hour_seconds), 4),
+                "backend_cpu_ms": round(stats.backend_cpu * 1000, 1),
+                "backend_cpu_per_call_ms": round(stats.backend_cpu * 1000 / stats.calls, 3) if stats.calls else None
+            })
+
+        all_responses = [value for stats in self._hours for value in stats.response_seconds]
+        return {
+            "config": {
+                "fleet_size": self.fleet_size,
+                "calls_per_minute": self.calls_per_minute,
+                "hours": round(self.duration / 3600, 2),
+                "policy": self.policy
+            },
+            "summary": {
+                "calls": sum(stats.calls for stats in self._hours),
+                "unserved_at_end": self.unserved,
+                "response_time": summarize(all_responses),
+                "utilisation": round(
+                    sum(stats.busy_seconds for stats in self._hours) / (self.fleet_size * self.duration), 4
+                ),
+                "backend_cpu_seconds": round(sum(stats.backend_cpu for stats in self._hours), 3),
+                "process_cpu_seconds": round(cpu_seconds, 3),
+                "wall_seconds": round(wall_seconds, 3),
+                "speedup_vs_real_time": round(self.duration / wall_seconds, 1) if wall_seconds else None
+            },
+            "per_hour": per_hour
+        }
+
+
+async def _sync(fn: Callable[..., Any], *args) -> Any:
+    """Adapt a plain function to the awaitable form _backend expects"""
+    return fn(*args)
@@ -0,0 +1,113 @@
+import math
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+from services.geo import SERVICE_CENTER, SERVICE_RADIUS_KM
+
+KM_PER_DEG_LAT = 111.32
+
+# Emergency mix modelled on what extract_patient_info produces:
+# (emergency_type, weight, severity weights, special_requirements)
+EMERGENCY_MIX = [
+    ("Heart Attack", 0.18, {"critical": 0.5, "high": 0.4, "medium": 0.1}, ["Cardiac Care", "Defibrillator"]),
+    ("Stroke", 0.08, {"critical": 0.5, "high": 0.4, "medium": 0.1}, ["Stroke Protocol", "Critical Care"]),
+    ("Breathing Difficulty", 0.14, {"critical": 0.2, "high": 0.5, "medium": 0.3}, ["Oxygen Support", "Respiratory Care"]),
+    ("Severe Car Accident", 0.16, {"critical": 0.3, "high": 0.4, "medium": 0.2, "low": 0.1}, ["Trauma Care", "Multiple Units"]),
+    ("Fall Injury", 0.14, {"high": 0.2, "medium": 0.5, "low": 0.3}, ["Basic Life Support"]),
+    ("Burn Injury", 0.04, {"critical": 0.3, "high": 0.4, "medium": 0.3}, ["Basic Life Support"]),
+    ("Pregnancy Complication", 0.06, {"critical": 0.2, "high": 0.5, "medium": 0.3}, ["Basic Life Support"]),
+    ("Medical Emergency", 0.20, {"high": 0.3, "medium": 0.4, "low": 0.3}, ["Basic Life Support"]),
+]
+
+# Same mapping as TranscriptionService._ensure_complete_data
+PRIORITY_MAP = {"critical": 1, "high": 2, "medium": 3, "low": 4}
+
+
+def random_point(rng: random.Random, center: Tuple[float, float], radius_km: float) -> Tuple[float, float]:
+    """Uniform point in a disc around center"""
+    distance = radius_km * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    latitude = center[0] + distance * math.cos(bearing) / KM_PER_DEG_LAT
+    longitude = center[1] + distance * math.sin(bearing) / (KM_PER_DEG_LAT * math.cos(math.radians(center[0])))
+    return round(latitude, 5), round(longitude, 5)
+
+
+def generate_fleet(
+    size: int,
+    rng: random.Random,
+    center: Tuple[float, float] = SERVICE_CENTER,
+    radius_km: float = SERVICE_RADIUS_KM / 2,
+    als_share: float = 0.4
+) -> List[Dict[str, Any]]:
+    """
+    Synthetic ambulance records in the same shape as mock_ambulances
+
+    Args:
+        size: Number of units
+        rng: Random source (seed it for repeatable runs)
+        center: Centre of the area units are spread over
+        radius_km: Radius of that area
+        als_share: Share of Advanced Life Support units
+    """
+    fleet = []
+    for i in range(size):
+        latitude, longitude = random_point(rng, center, radius_km)
+        advanced = rng.random() < als_share
+        equipment = ["Oxygen", "Stretcher"]
+        if advanced:
+            equipment.append("Defibrillator")
+            equipment += [item for item in ("Ventilator", "ECG Monitor") if rng.random() < 0.5]
+        else:
+            equipment.append("First Aid Kit")
+        fleet.append({
+            "id": f"SIM-{i + 1:05d}",
+            "vehicle_number": f"DL-SIM-{i + 1:05d}",
+            "type": "Advanced Life Support" if advanced else "Basic Life Support",
+            "status": "available",
+            "current_location": {"latitude": latitude, "longitude": longitude, "address": "Simulated station"},
+            "driver": {"name": f"Driver {i + 1}", "phone": "+910000000000"},
+            "equipment": equipment
+        })
+    return fleet
+
+
+def _weighted(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def poisson_arrivals(
+    rate_per_minute: float,
+    duration_seconds: float,
+    rng: random.Random,
+    center: Tuple[float, float] = SERVICE_CENTER,
+    radius_km: float = SERVICE_RADIUS_KM / 2
+) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """
+    Yield (virtual time, emergency payload) for a Poisson arrival process
+
+    Inter-arrival times are exponential with mean 60 / rate_per_minute
+    seconds. Payloads match what the dispatcher UI posts after extraction.
+    """
+    types = [entry[0] for entry in EMERGENCY_MIX]
+    weights = [entry[1] for entry in EMERGENCY_MIX]
+    profiles = {entry[0]: entry for entry in EMERGENCY_MIX}
+    rate_per_second = rate_per_minute / 60.0
+    now = 0.0
+    while True:
+        now += rng.expovariate(rate_per_second)
+        if now >= duration_seconds:
+            return
+        emergency_type = rng.choices(types, weights=weights)[0]
+        _, _, severities, requirements = profiles[emergency_type]
+        severity = _weighted(rng, severities)
+        latitude, longitude = random_point(rng, center, radius_km)
+        yield now, {
+            "patient_name": "Simulated patient",
+            "patient_age": rng.randint(1, 90),
+            "emergency_type": emergency_type,
+            "severity": severity,
+            "priority": PRIORITY_MAP[severity],
+            "latitude": latitude,
+            "longitude": longitude,
+            "location": f"{latitude},{longitude}",
+            "special_requirements": list(requirements)
+        }
@@ -4,6 +4,7 @@ Run this script to test the SMS service functionality
 """
 
 import os
+import asyncio
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -65,14 +66,14 @@ def test_send_sms(test_phone_number):
         from services.sms_service import sms_service
 
         # Test hospital assignment SMS
-        result = sms_service.send_hospital_assignment(
+        result = asyncio.run(sms_service.send_hospital_assignment(
             driver_phone=test_phone_number,
             ambulance_id="AMB-TEST-001",
             hospital_name="Test Hospital",
             hospital_address="123 Test Street, Test City",
             patient_info="Test Patient - 30 years, stable condition",
             eta="10 minutes"
-        )
+        ))
 
         if result.get("success"):
             print("✅ SMS sent successfully!")
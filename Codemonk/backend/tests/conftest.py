@@ -0,0 +1,21 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+# Services read their configuration when first imported: keep tests in memory and offline
+os.environ["SARS_STATE_BACKEND"] = "memory"
+os.environ.pop("SARS_JOURNAL_DIR", None)
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["TWILIO_ACCOUNT_SID"] = ""
+os.environ["TWILIO_AUTH_TOKEN"] = ""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client over the full app; startup hooks (event bus poller) are not run"""
+    from fastapi.testclient import TestClient
+    from main import app
+    return TestClient(app)
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from services.admission import AdmissionController, AdmissionRejected, lane_for
+
+
+def test_lane_mapping():
+    assert lane_for("1") == "critical"
+    assert lane_for("HIGH") == "live"
+    assert lane_for("low") == "batch"
+    assert lane_for("unknown", default="batch") == "batch"
+    assert lane_for(None) == "live"
+
+
+def test_reserved_slot_is_kept_for_critical_calls():
+    controller = AdmissionController(capacity=2, reserved_critical=1, max_wait={"live": 0.05})
+
+    async def main():
+        await controller.acquire("live")
+        # The only other slot is reserved, so a second live call would wait longer than it may and is shed
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("live")
+        assert rejected.value.reason == "over deadline"
+        assert await controller.acquire("critical") == 0.0
+
+    asyncio.run(main())
+
+
+def test_freed_slot_goes_to_the_most_urgent_waiter():
+    controller = AdmissionController(capacity=1, reserved_critical=0)
+    order = []
+
+    async def call(lane):
+        async with controller.slot(lane):
+            order.append(lane)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        first = asyncio.create_task(call("live"))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(call(lane)) for lane in ("batch", "live", "critical")]
+        await asyncio.gather(first, *waiters)
+
+    asyncio.run(main())
+    assert order == ["live", "critical", "live", "batch"]
+
+
+def test_full_queue_is_shed_with_retry_hint():
+    controller = AdmissionController(capacity=1, reserved_critical=0, queue_limits={"batch": 1})
+
+    async def main():
+        await controller.acquire("batch")
+        waiter = asyncio.create_task(controller.acquire("batch"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("batch")
+        waiter.cancel()
+        return rejected.value
+
+    rejected = asyncio.run(main())
+    assert rejected.reason == "queue full"
+    assert rejected.retry_after > 0
+    assert controller.metrics()["lanes"]["batch"]["rejected_queue_full"] == 1
+
+
+def test_waiters_that_give_up_leave_the_queue():
+    controller = AdmissionController(capacity=1, reserved_critical=0, queue_limits={"batch": 1}, max_wait={"batch": 0.05})
+    # Short jobs, so the wait estimate admits the waiters and they time out for real
+    controller._service_estimate = 0.001
+
+    async def main():
+        await controller.acquire("batch")
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire("batch")
+        assert timed_out.value.reason == "wait timed out"
+        assert len(controller._queues["batch"]) == 0
+
+        cancelled = asyncio.create_task(controller.acquire("batch"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert len(controller._queues["batch"]) == 0
+
+        # The queue is not full of dead waiters: a new caller is queued and gets the slot
+        waiter = asyncio.create_task(controller.acquire("batch"))
+        await asyncio.sleep(0)
+        controller.release()
+        await waiter
+
+    asyncio.run(main())
+    assert controller.metrics()["lanes"]["batch"]["rejected_queue_full"] == 0
@@ -0,0 +1,96 @@
+import asyncio
+import zlib
+import orjson
+import pytest
+from models.ambulance import Ambulance
+from routers.emergencies import EMERGENCIES
+from services.bulk_export import _chunked, _csv, _gzipped, _ndjson
+from services.bulk_import import BulkImporter, ImportTarget
+from services.state_store import state_store
+
+FLEET = [
+    {
+        "id": f"EXP-{i}",
+        "vehicle_number": f"DL-{i}",
+        "type": "Advanced Life Support",
+        "status": "available",
+        "current_location": {"latitude": 28.6 + i / 100, "longitude": 77.2, "address": "Ring Road, \"Gate 2\""},
+        "driver": {"name": "Driver, Senior", "phone": f"+9100000000{i}"},
+        "equipment": ["Oxygen", "Defibrillator"]
+    }
+    for i in range(3)
+]
+COLUMNS = ["id", "vehicle_number", "type", "status", "current_location.latitude", "current_location.longitude",
+           "current_location.address", "driver.name", "driver.phone", "equipment"]
+
+
+async def single(body: bytes):
+    yield body
+
+
+def reimport(body: bytes, fmt: str, collection: str):
+    target = ImportTarget(collection, Ambulance, "test.reimported")
+    result = asyncio.run(BulkImporter().run(single(body), fmt, target))
+    records = {record["id"]: record for record in state_store.values(collection)}
+    for key in records:
+        state_store.delete(collection, key)
+    return result, records
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_round_trips_through_the_importer(fmt):
+    pieces = _csv(iter(FLEET), COLUMNS) if fmt == "csv" else _ndjson(iter(FLEET), None)
+    result, records = reimport(b"".join(pieces), fmt, f"test_round_trip_{fmt}")
+
+    assert result["failed"] == 0 and result["written"] == len(FLEET)
+    for original in FLEET:
+        restored = records[original["id"]]
+        assert {key: restored[key] for key in original} == original
+
+
+def test_ndjson_projection_keeps_only_requested_fields():
+    lines = list(_ndjson(iter(FLEET), ["id", "status"]))
+    assert orjson.loads(lines[0]) == {"id": "EXP-0", "status": "available"}
+
+
+def test_first_piece_is_sent_at_once_and_the_rest_grouped():
+    chunks = list(_chunked(iter([b"header\n"] + [b"x" * 10] * 10), chunk_bytes=40, flush_seconds=60))
+    assert chunks[0] == b"header\n"
+    assert [len(chunk) for chunk in chunks[1:]] == [40, 40, 20]
+
+
+def test_every_gzip_chunk_can_be_decoded_on_arrival():
+    pieces = [b"first line\n", b"second line\n"]
+    chunks = list(_gzipped(iter(pieces), 6))
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(chunks[0]) == pieces[0]
+    assert zlib.decompress(b"".join(chunks), 31) == b"".join(pieces)
+
+
+@pytest.fixture
+def drill_emergencies():
+    records = [
+        state_store.put(EMERGENCIES, f"EMG-EXP-{i}", {
+            "id": f"EMG-EXP-{i}", "status": status, "emergency_type": "export drill",
+            "created_at": f"2024-01-0{i + 1}T00:00:00.000+00:00"
+        })
+        for i, status in enumerate(["exp_open", "exp_open", "exp_closed"])
+    ]
+    yield records
+    for record in records:
+        state_store.delete(EMERGENCIES, record["id"])
+
+
+def test_export_endpoint_filters_and_compresses(client, drill_emergencies):
+    response = client.get("/api/emergencies/export?status=exp_open&compress=gzip")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    lines = zlib.decompress(response.content, 31).splitlines()
+    assert [orjson.loads(line)["id"] for line in lines] == ["EMG-EXP-0", "EMG-EXP-1"]
+
+    csv_export = client.get("/api/emergencies/export?format=csv&fields=id,status&status=exp_open,exp_closed"
+                            "&created_after=2024-01-02T00:00:00Z")
+    assert csv_export.text.splitlines() == ["id,status", "EMG-EXP-1,exp_open", "EMG-EXP-2,exp_closed"]
+
+    assert client.get("/api/emergencies/export?created_after=yesterday").status_code == 400
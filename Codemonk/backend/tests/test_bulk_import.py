@@ -0,0 +1,135 @@
+import asyncio
+import orjson
+import pytest
+from services import bulk_import
+from models.ambulance import Ambulance
+from routers.emergencies import EMERGENCIES
+from services.bulk_import import BulkImporter, ImportTarget
+from services.state_store import state_store
+
+COLLECTION = "test_fleet_import"
+TARGET = ImportTarget(COLLECTION, Ambulance, "test.imported")
+
+
+def vehicle(number, **overrides):
+    return {
+        "id": f"IMP-{number}",
+        "vehicle_number": f"DL-{number}",
+        "type": "Basic Life Support",
+        "current_location": {"latitude": 28.6, "longitude": 77.2},
+        "driver": {"name": "Driver", "phone": "+910000000000"},
+        **overrides
+    }
+
+
+async def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def run(body, fmt, chunk_size=1 << 16, **options):
+    importer = BulkImporter(batch_size=2)
+    return asyncio.run(importer.run(chunked(body, chunk_size), fmt, TARGET, **options))
+
+
+@pytest.fixture(autouse=True)
+def clean_collection():
+    yield
+    for record in state_store.values(COLLECTION):
+        state_store.delete(COLLECTION, record["id"])
+
+
+NDJSON = b"\n".join([
+    orjson.dumps(vehicle(1)),
+    b"{not json",
+    b"[1, 2]",
+    orjson.dumps({**vehicle(4), "driver": None}),
+    b"",
+    orjson.dumps(vehicle(5)),
+    orjson.dumps(vehicle(1, status="maintenance")),
+]) + b"\n"
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_bad_rows_are_reported_and_the_rest_imported(chunk_size):
+    result = run(NDJSON, "ndjson", chunk_size)
+    assert (result["rows"], result["written"], result["failed"]) == (6, 2, 4)
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4, 7]
+    assert result["errors"][0]["errors"][0].startswith("invalid JSON")
+    assert result["errors"][2]["errors"] == ["driver: Input should be a valid dictionary or instance of Driver"]
+    # Same batch or an earlier one, the repeated id is refused either way
+    assert result["errors"][3]["id"] == "IMP-1"
+    assert state_store.get(COLLECTION, "IMP-1")["status"] == "available"
+
+
+def test_replace_overwrites_existing_ids():
+    run(orjson.dumps(vehicle(1)), "ndjson")
+    result = run(orjson.dumps(vehicle(1, status="maintenance")), "ndjson", replace=True)
+    assert (result["written"], result["replaced"], result["failed"]) == (1, 1, 0)
+    assert state_store.get(COLLECTION, "IMP-1")["status"] == "maintenance"
+
+
+def test_dry_run_validates_without_writing():
+    result = run(NDJSON, "ndjson", dry_run=True)
+    assert result["written"] == 0 and result["failed"] == 4
+    assert state_store.values(COLLECTION) == []
+
+
+def test_csv_nests_dotted_columns_and_parses_json_cells():
+    body = (
+        "\ufeffid,vehicle_number,type,current_location.latitude,current_location.longitude,driver.name,driver.phone,equipment,notes\n"
+        'IMP-1,DL-1,ALS,28.6,77.2,Asha,+911,"[""Oxygen"", ""Ventilator""]","two\nlines"\n'
+        "IMP-2,DL-2,BLS,north,77.2,Ravi,+912,,\n"
+        "IMP-3,DL-3,BLS,28.7,77.3,Meena,+913,[],,extra\n"
+    ).encode()
+    result = run(body, "csv", chunk_size=5)
+    assert (result["rows"], result["written"], result["failed"]) == (3, 1, 2)
+    assert result["errors"][0]["errors"][0].startswith("current_location.latitude:")
+    assert result["errors"][1]["errors"] == ["10 values for 9 columns"]
+
+    record = state_store.get(COLLECTION, "IMP-1")
+    assert record["current_location"] == {"latitude": 28.6, "longitude": 77.2}
+    assert record["equipment"] == ["Oxygen", "Ventilator"]
+    assert record["notes"] == "two\nlines"
+
+
+def test_emergency_import_assigns_ids_and_keeps_created_at(client):
+    body = b"\n".join([
+        orjson.dumps({"emergency_type": "drill", "created_at": "2024-03-01T10:00:00+05:30"}),
+        orjson.dumps({"emergency_type": "drill"}),
+    ])
+    response = client.post("/api/emergencies/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    result = response.json()
+    assert response.status_code == 200 and result["written"] == 2
+
+    imported = [record for record in state_store.values(EMERGENCIES) if record.get("emergency_type") == "drill"]
+    try:
+        assert all(record["id"].startswith("EMG-") for record in imported)
+        assert "2024-03-01T04:30:00.000+00:00" in {record["created_at"] for record in imported}
+    finally:
+        for record in imported:
+            state_store.delete(EMERGENCIES, record["id"])
+
+    unsupported = client.post("/api/emergencies/import", content=b"<xml/>", headers={"Content-Type": "application/xml"})
+    assert unsupported.status_code == 415
+
+
+@pytest.mark.parametrize("chunk_size", [5, 1 << 16])
+def test_oversized_csv_row_is_skipped_up_to_its_closing_quote(monkeypatch, chunk_size):
+    monkeypatch.setattr(bulk_import, "MAX_ROW_BYTES", 50)
+
+    async def parse(body):
+        return [row async for batch in bulk_import._csv_rows(chunked(body, chunk_size), 100) for row in batch]
+
+    body = ('id,name\nA1,ok\nA2,ok\nA3,"' + "x" * 60 + '\nmore\nend of it",x\nA4,ok\n').encode()
+    rows = asyncio.run(parse(body))
+    assert [(number, record) for number, record, _ in rows] == [
+        (1, {"id": "A1", "name": "ok"}), (2, {"id": "A2", "name": "ok"}), (3, None), (4, {"id": "A4", "name": "ok"})
+    ]
+    assert rows[2][2].startswith("row longer than 50 bytes")
+
+    # Never closed: nothing after the bad row is imported
+    rows = asyncio.run(parse(('id,name\nA1,ok\nA2,ok\nA3,"' + "x" * 60 + '\nmore\n').encode()))
+    assert [(number, record) for number, record, _ in rows] == [
+        (1, {"id": "A1", "name": "ok"}), (2, {"id": "A2", "name": "ok"}), (3, None)
+    ]
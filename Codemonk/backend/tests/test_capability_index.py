@@ -0,0 +1,88 @@
+import random
+import pytest
+from services.capability_index import CapabilityIndex, _bitset, _iter_bits
+
+EQUIPMENT = ["Defibrillator", "Oxygen", "Ventilator", "ECG Monitor", "Stretcher"]
+TYPES = ["Advanced Life Support", "Basic Life Support"]
+STATUSES = ["available", "dispatched", "maintenance"]
+
+
+def fleet(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"AMB-{i:04d}",
+            "status": rng.choice(STATUSES),
+            "type": rng.choice(TYPES),
+            "equipment": rng.sample(EQUIPMENT, rng.randint(0, len(EQUIPMENT)))
+        }
+        for i in range(count)
+    ]
+
+
+def brute_force(records, status, capabilities):
+    index = CapabilityIndex()
+    return sorted(
+        record["id"] for record in records
+        if (status is None or record["status"] == status)
+        and set(capabilities) <= set(index.capabilities_of(record))
+    )
+
+
+@pytest.mark.parametrize("positions", [[], [0], [5, 63, 64, 200], list(range(0, 300, 7))])
+def test_bitset_round_trip(positions):
+    assert list(_iter_bits(_bitset(positions))) == sorted(positions)
+
+
+@pytest.mark.parametrize("status,capabilities", [
+    ("available", ["als", "ventilator"]),
+    ("available", ["defibrillator"]),
+    (None, ["oxygen", "ecg monitor"]),
+    ("dispatched", []),
+])
+def test_query_matches_a_linear_scan(status, capabilities):
+    records = fleet(500)
+    index = CapabilityIndex()
+    index.load(records)
+    assert sorted(index.query(status, capabilities)) == brute_force(records, status, capabilities)
+
+
+def test_bulk_load_and_upserts_build_the_same_index():
+    records = fleet(200)
+    loaded, upserted = CapabilityIndex(), CapabilityIndex()
+    loaded.load(records)
+    for record in records:
+        upserted.upsert(record)
+    for status in [None, *STATUSES]:
+        assert sorted(loaded.query(status, ["als"])) == sorted(upserted.query(status, ["als"]))
+
+
+def test_status_change_moves_the_vehicle():
+    index = CapabilityIndex()
+    index.load([{"id": "A", "status": "available", "equipment": ["Ventilator"]}])
+    index.upsert({"id": "A", "status": "dispatched", "equipment": ["Ventilator"]})
+    assert index.query("available", ["ventilator"]) == []
+    assert index.query("dispatched", ["ventilator"]) == ["A"]
+
+
+def test_removed_slot_is_reused_without_leaking_bits():
+    index = CapabilityIndex()
+    index.load([
+        {"id": "A", "status": "available", "equipment": ["Ventilator"]},
+        {"id": "B", "status": "available", "equipment": []},
+    ])
+    index.remove("A")
+    index.upsert({"id": "C", "status": "available", "equipment": ["Oxygen"]})
+    assert index.query("available", ["ventilator"]) == []
+    assert sorted(index.query("available")) == ["B", "C"]
+    assert index.stats()["vehicles"] == 2
+
+
+def test_resolve_maps_requirements_and_reports_unknowns():
+    index = CapabilityIndex()
+    index.load([{"id": "A", "status": "available", "equipment": ["Spine Board"]}])
+    capabilities, unmatched = index.resolve(["Cardiac Care", "ventilator", "spine board", "jetpack"])
+    assert capabilities == ["defibrillator", "ventilator", "spine board"]
+    assert unmatched == ["jetpack"]
+    # A capability nobody has matches nothing rather than everything
+    assert index.query("available", ["ventilator"]) == []
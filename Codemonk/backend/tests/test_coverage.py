@@ -0,0 +1,89 @@
+import random
+import numpy as np
+import pytest
+from services.coverage import CoverageGrid, UNREACHABLE
+
+CENTER = (28.61, 77.21)
+
+
+def grid():
+    return CoverageGrid(center=CENTER, radius_km=5, cell_km=0.25, target_minutes=4, horizon_minutes=6)
+
+
+def unit(ambulance_id, rng, status="available"):
+    return {
+        "id": ambulance_id,
+        "status": status,
+        "current_location": {
+            "latitude": CENTER[0] + rng.uniform(-0.05, 0.05),
+            "longitude": CENTER[1] + rng.uniform(-0.05, 0.05)
+        }
+    }
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    rng = random.Random(11)
+    fleet = {f"AMB-{i}": unit(f"AMB-{i}", rng) for i in range(15)}
+    incremental = grid()
+    incremental.load(fleet.values())
+
+    for _ in range(200):
+        ambulance_id = rng.choice(list(fleet))
+        fleet[ambulance_id] = unit(ambulance_id, rng, status=rng.choice(["available", "available", "dispatched"]))
+        incremental.update(fleet[ambulance_id])
+
+    rebuilt = grid()
+    rebuilt.load(fleet.values())
+    assert incremental.stats["rebuilds"] == 1, "no full rebuild while the hourly speed is unchanged"
+    np.testing.assert_array_equal(np.isinf(incremental._seconds), np.isinf(rebuilt._seconds))
+    finite = np.isfinite(rebuilt._seconds)
+    np.testing.assert_allclose(incremental._seconds[finite], rebuilt._seconds[finite], rtol=1e-5)
+
+
+def test_reach_time_grows_with_distance_and_stops_at_the_horizon():
+    g = grid()
+    g.load([{"id": "AMB-1", "status": "available", "current_location": {"latitude": CENTER[0], "longitude": CENTER[1]}}])
+    codes = g.codes()
+    row, col = (int(v) for v in g.cell_of(*CENTER))
+    east = codes[row, col:].astype(int)
+    reachable = east[east != UNREACHABLE]
+    assert list(reachable) == sorted(reachable)
+    assert codes[0, 0] == UNREACHABLE
+
+
+def test_unit_going_busy_leaves_a_gap():
+    g = grid()
+    ambulance = {"id": "AMB-1", "status": "available", "current_location": {"latitude": CENTER[0], "longitude": CENTER[1]}}
+    g.load([ambulance])
+    covered = g.summary()["within_target_pct"]
+    version = g.version
+
+    g.update({**ambulance, "status": "dispatched"})
+    summary = g.summary()
+    assert covered > 0
+    assert summary["within_target_pct"] == 0
+    assert summary["unreachable_pct"] == 100
+    assert g.version == version + 1
+
+
+@pytest.mark.parametrize("z,x,y", [(11, 1463, 857), (0, 0, 0)])
+def test_tiles_are_png(z, x, y):
+    g = grid()
+    g.load([])
+    assert g.tile(z, x, y).startswith(b"\x89PNG\r\n\x1a\n")
+
+
+def test_digest_follows_content_not_the_local_version():
+    rng = random.Random(5)
+    fleet = [unit(f"AMB-{i}", rng) for i in range(4)]
+    first, second = grid(), grid()
+    first.load(fleet)
+    # A worker that saw extra moves ends on a different version but the same raster
+    second.load(fleet)
+    second.update({**fleet[0], "status": "dispatched"})
+    second.update(fleet[0])
+    assert second.version != first.version
+    assert second.digest() == first.digest()
+
+    second.update({**fleet[1], "status": "dispatched"})
+    assert second.digest() != first.digest()
@@ -0,0 +1,99 @@
+from urllib.parse import urlencode
+import pytest
+from services.delivery_tracker import DeliveryTracker, delivery_tracker, twilio_signature
+from services.list_query import utc_now
+from services.state_store import state_store
+
+COLLECTION = "test_dispatches"
+CALLBACK_URL = "https://sars.example/api/dispatch/whatsapp/status"
+
+
+@pytest.fixture
+def tracker():
+    dispatch = state_store.put(COLLECTION, "DSP-T1", {
+        "dispatch_id": "DSP-T1", "whatsapp_sid": "SM1", "whatsapp_status": "queued", "created_at": utc_now()
+    })
+    t = DeliveryTracker(COLLECTION)
+    t.index(dispatch)
+    yield t
+    state_store.delete(COLLECTION, "DSP-T1")
+
+
+def callback(tracker, status, sid="SM1", **extra):
+    return tracker.receive({"MessageSid": sid, "MessageStatus": status, **extra})
+
+
+def test_out_of_order_callbacks_keep_the_furthest_status(tracker):
+    for status in ("delivered", "sent", "read", "sending"):
+        callback(tracker, status)
+    assert tracker.flush() == 1
+
+    dispatch = state_store.get(COLLECTION, "DSP-T1")
+    assert dispatch["whatsapp_status"] == "read"
+    assert set(dispatch["whatsapp_timeline"]) == {"sending", "sent", "delivered", "read"}
+    state = tracker.delivery_state(dispatch)
+    assert state["needs_resend"] is False
+    assert state["delivery_latency_ms"] is not None
+
+
+def test_a_burst_of_callbacks_is_one_write(tracker):
+    for status in ("sending", "sent", "delivered"):
+        callback(tracker, status)
+    tracker.flush()
+    assert tracker.metrics()["records_written"] == 1
+    assert tracker.flush() == 0
+
+
+def test_callback_before_its_dispatch_is_held_until_indexed(tracker):
+    assert callback(tracker, "delivered", sid="SM2")
+    assert tracker.flush() == 0
+    assert tracker.metrics()["orphans"] == 1
+
+    tracker.index(state_store.put(COLLECTION, "DSP-T2", {"dispatch_id": "DSP-T2", "whatsapp_sid": "SM2"}))
+    try:
+        assert tracker.flush() == 1
+        assert state_store.get(COLLECTION, "DSP-T2")["whatsapp_status"] == "delivered"
+    finally:
+        state_store.delete(COLLECTION, "DSP-T2")
+
+
+def test_failed_message_needs_a_resend(tracker):
+    callback(tracker, "failed", ErrorCode="63016")
+    tracker.flush()
+    state = tracker.delivery_state(state_store.get(COLLECTION, "DSP-T1"))
+    assert state == {**state, "status": "failed", "error_code": "63016", "needs_resend": True}
+
+
+def test_conflicting_write_is_retried_on_the_next_flush(tracker, monkeypatch):
+    callback(tracker, "delivered")
+    get = state_store.get
+
+    def stale_get(collection, key):
+        record = get(collection, key)
+        # Someone edits the dispatch right after the tracker read it
+        state_store.put(collection, key, {**record, "status": "en_route"})
+        return record
+
+    monkeypatch.setattr(state_store, "get", stale_get)
+    assert tracker.flush() == 0
+    monkeypatch.undo()
+
+    assert tracker.flush() == 1
+    dispatch = state_store.get(COLLECTION, "DSP-T1")
+    assert dispatch["status"] == "en_route"
+    assert dispatch["whatsapp_status"] == "delivered"
+
+
+def test_webhook_checks_the_twilio_signature(client, monkeypatch):
+    monkeypatch.setattr(delivery_tracker, "auth_token", "secret")
+    monkeypatch.setattr(delivery_tracker, "callback_url", CALLBACK_URL)
+    params = [("MessageSid", "SM-UNKNOWN"), ("MessageStatus", "sent")]
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    signed = client.post("/api/dispatch/whatsapp/status", content=urlencode(params),
+                         headers={**headers, "X-Twilio-Signature": twilio_signature("secret", CALLBACK_URL, params)})
+    assert signed.status_code == 204
+
+    forged = client.post("/api/dispatch/whatsapp/status", content=urlencode(params),
+                         headers={**headers, "X-Twilio-Signature": twilio_signature("guess", CALLBACK_URL, params)})
+    assert forged.status_code == 403
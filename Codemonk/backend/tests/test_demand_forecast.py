@@ -0,0 +1,85 @@
+import random
+from datetime import datetime, timezone
+import pytest
+from services.demand_forecast import DemandForecaster
+
+CENTER = (28.61, 77.21)
+# Monday 2024-02-26 00:00 UTC, after eight full weeks of history
+NOW = 1708905600
+HOTSPOT = (28.6300, 77.2200)
+QUIET = (28.5800, 77.1800)
+
+
+def emergency(key, at, point, severity="high"):
+    return {
+        "id": key,
+        "latitude": point[0],
+        "longitude": point[1],
+        "severity": severity,
+        "created_at": datetime.fromtimestamp(at, timezone.utc).isoformat()
+    }
+
+
+@pytest.fixture(scope="module")
+def forecaster():
+    rng = random.Random(5)
+    f = DemandForecaster(center=CENTER, radius_km=10, cell_km=1.0)
+    history = []
+    for day in range(56):
+        midnight = NOW - (56 - day) * 86400
+        # Morning rush at the hotspot: one critical call an hour from 08:00 to 11:00
+        for hour in (8, 9, 10):
+            history.append(emergency(f"H-{day}-{hour}", midnight + hour * 3600 + 600, HOTSPOT, "critical"))
+        if day % 4 == 0:
+            history.append(emergency(f"Q-{day}", midnight + rng.randrange(24) * 3600, QUIET, "low"))
+    # load() fits against the wall clock, which would drop this backdated history
+    for record in history:
+        f.add(record)
+    f.fit(now=NOW)
+    return f
+
+
+def cell_near(result, point):
+    return min(result["cells"], key=lambda cell: abs(cell["latitude"] - point[0]) + abs(cell["longitude"] - point[1]))
+
+
+def test_busy_hours_at_the_hotspot_are_forecast(forecaster):
+    morning = forecaster.forecast(hours=3, now=NOW + 7 * 3600 + 60)
+    top = morning["cells"][0]
+    assert cell_near(morning, HOTSPOT) == top
+    assert top["expected_calls"] == pytest.approx(3.0, rel=0.15)
+    assert top["p_any"] > 0.9
+
+
+def test_quiet_hours_forecast_far_less(forecaster):
+    night = forecaster.forecast(hours=3, now=NOW + 60)
+    morning = forecaster.forecast(hours=3, now=NOW + 7 * 3600 + 60)
+    assert night["expected_total"] < morning["expected_total"] / 5
+    assert len(night["hourly"]) == 3
+
+
+def test_severity_filter_uses_its_own_fit(forecaster):
+    low = forecaster.forecast(hours=24, severity="low", now=NOW)
+    assert [cell_near(low, QUIET)] == low["cells"][:1]
+    assert low["expected_total"] == pytest.approx(0.25, rel=0.5)
+    critical = forecaster.forecast(hours=24, severity="critical", now=NOW)
+    assert critical["expected_total"] == pytest.approx(3.0, rel=0.15)
+
+
+def test_unusable_and_repeated_emergencies_are_skipped():
+    f = DemandForecaster(center=CENTER, radius_km=10)
+    at = NOW - 3600
+    assert f.add(emergency("E-1", at, HOTSPOT))
+    assert not f.add(emergency("E-1", at, HOTSPOT))
+    assert not f.add(emergency("E-2", at, (19.07, 72.87)))
+    assert not f.add({"id": "E-3", "created_at": "2024-02-25T10:00:00+00:00"})
+    assert f.metrics()["events"] == 1
+    assert f.stats["outside_area"] == 1 and f.stats["unlocated"] == 1
+
+
+def test_history_older_than_the_window_is_dropped():
+    f = DemandForecaster(center=CENTER, radius_km=10, history_days=7)
+    f.add(emergency("OLD", NOW - 30 * 86400, HOTSPOT))
+    f.add(emergency("NEW", NOW - 3600, HOTSPOT))
+    f.fit(now=NOW)
+    assert f.metrics()["history_events"] == 1
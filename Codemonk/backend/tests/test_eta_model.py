@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from services.eta_model import EtaModel, format_eta
+from services.geo import haversine_km
+from services.hospital_registry import ROAD_FACTOR, AVERAGE_SPEED_KMH
+
+DAY = 1_700_000_000 - 1_700_000_000 % 86400
+MORNING = DAY + 8 * 3600
+EVENING = DAY + 20 * 3600
+ORIGIN, TARGET = (28.6010, 77.2055), (28.6090, 77.2055)
+
+
+def slow_track(start, speed_kmh=10.0, steps=9):
+    """A unit crawling north through one road cell"""
+    latitudes = [28.6005 + 0.001 * i for i in range(steps + 1)]
+    step_seconds = haversine_km(28.6005, 77.2055, 28.6015, 77.2055) / speed_kmh * 3600
+    return latitudes, [77.2055] * len(latitudes), [start + step_seconds * i for i in range(len(latitudes))]
+
+
+def expected_seconds(speed_kmh):
+    return haversine_km(*ORIGIN, *TARGET) * ROAD_FACTOR / speed_kmh * 3600
+
+
+def test_untrained_model_uses_the_default_speed():
+    model = EtaModel()
+    assert model.predict_one(ORIGIN, TARGET, MORNING) == pytest.approx(expected_seconds(AVERAGE_SPEED_KMH), rel=1e-3)
+
+
+def test_learned_speed_applies_to_its_cell_and_hour():
+    model = EtaModel()
+    assert model.ingest(*slow_track(MORNING)) == 9
+
+    assert model.predict_one(ORIGIN, TARGET, MORNING) == pytest.approx(expected_seconds(10.0), rel=1e-3)
+    assert model.predict_one(ORIGIN, TARGET, EVENING) == pytest.approx(expected_seconds(AVERAGE_SPEED_KMH), rel=1e-3)
+    assert model.city_speed_kmh(MORNING) == pytest.approx(10.0, rel=1e-3)
+
+
+def test_stops_and_gps_jumps_are_ignored():
+    model = EtaModel()
+    latitudes = [28.6005, 28.6005, 28.9000, 28.9010]
+    timestamps = [MORNING, MORNING + 60, MORNING + 70, MORNING + 1000]
+    assert model.ingest(latitudes, [77.2055] * 4, timestamps) == 0
+    assert model.stats["rejected_segments"] == 3
+
+
+def test_too_few_samples_are_not_trusted():
+    model = EtaModel(min_samples=20)
+    model.ingest(*slow_track(MORNING))
+    assert model.predict_one(ORIGIN, TARGET, MORNING) == pytest.approx(expected_seconds(AVERAGE_SPEED_KMH), rel=1e-3)
+
+
+def test_batch_prediction_matches_single_predictions():
+    model = EtaModel()
+    model.ingest(*slow_track(MORNING))
+    origins = np.array([ORIGIN, (28.55, 77.15), (28.70, 77.30)])
+    batch = model.predict(origins, TARGET, MORNING)
+    assert batch == pytest.approx([model.predict_one(tuple(o), TARGET, MORNING) for o in origins])
+
+
+def test_profile_survives_save_and_load(tmp_path):
+    model = EtaModel()
+    model.ingest(*slow_track(MORNING))
+    path = str(tmp_path / "speeds.npz")
+    model.save(path)
+
+    restored = EtaModel()
+    assert restored.load(path) == model.profile()["cells"]
+    assert restored.predict_one(ORIGIN, TARGET, MORNING) == pytest.approx(model.predict_one(ORIGIN, TARGET, MORNING))
+
+
+def test_save_keeps_a_path_without_suffix_and_leaves_no_temp_file(tmp_path):
+    model = EtaModel()
+    model.ingest(*slow_track(MORNING))
+    path = tmp_path / "speed_profile"
+    model.save(str(path))
+    model.save(str(path))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["speed_profile"]
+    assert EtaModel().load(str(path)) == model.profile()["cells"]
+
+
+@pytest.mark.parametrize("seconds,text", [(0, "1 minute"), (61, "2 minutes"), (480, "8 minutes")])
+def test_format_eta(seconds, text):
+    assert format_eta(seconds) == text
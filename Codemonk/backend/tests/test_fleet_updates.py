@@ -0,0 +1,93 @@
+import pytest
+from routers.ambulances import AMBULANCES
+from services.capability_index import capability_index
+from services.state_store import state_store
+
+IDS = ("TST-AMB-1", "TST-AMB-2")
+
+
+@pytest.fixture
+def fleet():
+    records = {
+        ambulance_id: state_store.put(AMBULANCES, ambulance_id, {
+            "id": ambulance_id,
+            "status": "available",
+            "current_location": {"latitude": 28.60, "longitude": 77.20, "address": "Depot"}
+        })
+        for ambulance_id in IDS
+    }
+    yield records
+    for ambulance_id in IDS:
+        state_store.delete(AMBULANCES, ambulance_id)
+        capability_index.remove(ambulance_id)
+
+
+def test_bulk_update_applies_every_change(client, fleet):
+    response = client.patch("/api/ambulances/status", json={"updates": [
+        {"id": "TST-AMB-1", "version": fleet["TST-AMB-1"]["version"], "status": "dispatched"},
+        {"id": "TST-AMB-2", "current_location": {"latitude": 28.61, "longitude": 77.21}},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+    assert state_store.get(AMBULANCES, "TST-AMB-1")["status"] == "dispatched"
+    moved = state_store.get(AMBULANCES, "TST-AMB-2")["current_location"]
+    assert moved == {"latitude": 28.61, "longitude": 77.21, "address": "Depot"}
+
+
+def test_stale_version_rejects_the_whole_atomic_batch(client, fleet):
+    stale = fleet["TST-AMB-1"]["version"]
+    client.put("/api/ambulances/TST-AMB-1/status", json={"status": "maintenance"})
+
+    response = client.patch("/api/ambulances/status", json={"updates": [
+        {"id": "TST-AMB-1", "version": stale, "status": "dispatched"},
+        {"id": "TST-AMB-2", "version": fleet["TST-AMB-2"]["version"], "status": "dispatched"},
+    ]})
+    assert response.status_code == 409
+    assert [conflict["id"] for conflict in response.json()["detail"]["conflicts"]] == ["TST-AMB-1"]
+    assert state_store.get(AMBULANCES, "TST-AMB-1")["status"] == "maintenance"
+    assert state_store.get(AMBULANCES, "TST-AMB-2")["status"] == "available"
+
+
+def test_non_atomic_batch_applies_what_it_can(client, fleet):
+    client.put("/api/ambulances/TST-AMB-1/status", json={"status": "maintenance"})
+    response = client.patch("/api/ambulances/status", json={"atomic": False, "updates": [
+        {"id": "TST-AMB-1", "version": fleet["TST-AMB-1"]["version"], "status": "dispatched"},
+        {"id": "TST-AMB-2", "version": fleet["TST-AMB-2"]["version"], "status": "dispatched"},
+    ]})
+    body = response.json()
+    assert response.status_code == 200 and body["success"] is False
+    assert [record["id"] for record in body["updated"]] == ["TST-AMB-2"]
+    assert [conflict["id"] for conflict in body["conflicts"]] == ["TST-AMB-1"]
+
+
+def test_bad_batches_are_rejected(client, fleet):
+    duplicate = client.patch("/api/ambulances/status", json={"updates": [
+        {"id": "TST-AMB-1", "status": "available"}, {"id": "TST-AMB-1", "status": "dispatched"}
+    ]})
+    assert duplicate.status_code == 400
+    unknown = client.patch("/api/ambulances/status", json={"updates": [{"id": "TST-AMB-404", "status": "available"}]})
+    assert unknown.status_code == 404
+
+
+def test_track_upload_does_not_overwrite_a_concurrent_status_change(client, fleet, monkeypatch):
+    put_many = state_store.put_many
+    raced = []
+
+    def racing_put_many(collection, changes, atomic=True):
+        # Another console dispatches the unit between the track's read and its write
+        if not raced:
+            raced.append(True)
+            state_store.put(AMBULANCES, "TST-AMB-1", {**state_store.get(AMBULANCES, "TST-AMB-1"), "status": "dispatched"})
+        return put_many(collection, changes, atomic)
+
+    monkeypatch.setattr(state_store, "put_many", racing_put_many)
+    response = client.post("/api/ambulances/TST-AMB-1/track", json={"points": [
+        {"latitude": 28.605, "longitude": 77.205, "timestamp": 1700000060},
+        {"latitude": 28.600, "longitude": 77.200, "timestamp": 1700000000},
+    ]})
+
+    assert response.status_code == 200
+    record = state_store.get(AMBULANCES, "TST-AMB-1")
+    assert record["status"] == "dispatched"
+    assert record["current_location"]["latitude"] == 28.605
+    assert record["current_location"]["recorded_at"] == 1700000060
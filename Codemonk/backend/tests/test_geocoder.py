@@ -0,0 +1,61 @@
+import pytest
+from services.geocoder import GazetteerGeocoder, geocoder, point_of, AUTOFILL_MIN_SCORE
+
+
+@pytest.fixture
+def gazetteer():
+    g = GazetteerGeocoder(center=(28.61, 77.21), radius_km=25)
+    g.add("India Gate", 28.6129, 77.2295, "landmark", ["India Gate Circle"])
+    g.add("Khan Market", 28.6003, 77.2270, "area")
+    g.add("Safdarjung Hospital", 28.5685, 77.2066, "hospital", ["Safdarjung"])
+    return g
+
+
+def test_exact_phrase_inside_a_sentence(gazetteer):
+    match = gazetteer.resolve("he collapsed near the India Gate circle")
+    assert match["name"] == "India Gate"
+    assert match["exact"] is True
+
+
+def test_misspelling_is_a_fuzzy_candidate(gazetteer):
+    match = gazetteer.geocode("khan markt")[0]
+    assert match["name"] == "Khan Market"
+    assert match["exact"] is False
+
+
+@pytest.mark.parametrize("text", ["near the main market", "hospital", "new delhi", "market"])
+def test_generic_phrases_are_not_resolved(text):
+    assert geocoder.resolve(text) is None
+    assert point_of({"location": text}) is None
+
+
+def test_geocode_endpoint_only_sets_match_when_confident(client):
+    vague = client.get("/api/geocode", params={"q": "hospital"}).json()
+    assert vague["match"] is None
+    assert all(candidate["score"] < AUTOFILL_MIN_SCORE for candidate in vague["candidates"])
+
+    landmark = client.get("/api/geocode", params={"q": "near India Gate"}).json()
+    assert landmark["match"]["name"] == "India Gate"
+    assert landmark["match"]["exact"] is True
+
+
+def test_point_of_prefers_explicit_coordinates():
+    assert point_of({"latitude": 1.5, "longitude": 2.5, "location": "India Gate"}) == (1.5, 2.5)
+    assert point_of({"location": {"latitude": 3, "longitude": 4}}) == (3.0, 4.0)
+
+
+def test_suggest_by_prefix(gazetteer):
+    assert [entry["name"] for entry in gazetteer.suggest("safd")] == ["Safdarjung Hospital"]
+
+
+def test_extraction_leaves_vague_locations_unplaced():
+    from routers.transcription import transcription_service
+
+    vague = {"location": "near the main market"}
+    transcription_service._add_coordinates(vague)
+    assert vague["latitude"] is None and "geocoded_place" not in vague
+
+    landmark = {"location": "Outside AIIMS, Ansari Nagar"}
+    transcription_service._add_coordinates(landmark)
+    assert landmark["geocoded_place"] == "AIIMS Hospital"
+    assert landmark["geocode_score"] >= AUTOFILL_MIN_SCORE
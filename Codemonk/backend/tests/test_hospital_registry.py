@@ -0,0 +1,88 @@
+import pytest
+from services.hospital_registry import HospitalRegistry, specialties_for
+
+PATIENT = (28.6000, 77.2000)
+
+
+def hospital(hospital_id, latitude, longitude, specialties=(), **capacity):
+    return {
+        "id": hospital_id,
+        "name": hospital_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "specialties": list(specialties),
+        "beds_total": 100,
+        "beds_available": 50,
+        "icu_total": 10,
+        "icu_available": 5,
+        **capacity
+    }
+
+
+@pytest.fixture
+def registry():
+    r = HospitalRegistry()
+    r.load([
+        hospital("TST-NEAR", 28.6050, 77.2000, ["trauma"]),
+        hospital("TST-CARDIAC", 28.6150, 77.2000, ["cardiac", "trauma"]),
+        hospital("TST-FAR", 28.9000, 77.2000, ["cardiac"]),
+    ])
+    return r
+
+
+def ids(result):
+    return [h["id"] for h in result["hospitals"]]
+
+
+def test_requirements_map_to_specialties():
+    assert specialties_for(["Defibrillator", "ICU bed"], "chest pain") == ({"cardiac"}, True)
+    assert specialties_for([], "road accident") == ({"trauma"}, False)
+
+
+def test_nearest_wins_without_requirements(registry):
+    assert ids(registry.recommend(*PATIENT))[:2] == ["TST-NEAR", "TST-CARDIAC"]
+
+
+def test_specialty_match_beats_a_slightly_nearer_hospital(registry):
+    result = registry.recommend(*PATIENT, requirements=["defibrillator"], emergency_type="cardiac arrest")
+    assert result["required_specialties"] == ["cardiac"]
+    top = result["hospitals"][0]
+    assert top["id"] == "TST-CARDIAC"
+    assert top["missing_specialties"] == []
+
+
+def test_radius_excludes_distant_hospitals(registry):
+    assert "TST-FAR" not in ids(registry.recommend(*PATIENT, radius_km=10))
+
+
+def test_no_free_icu_is_penalised(registry):
+    registry.update_capacity("TST-NEAR", {"icu_available": 0})
+    assert ids(registry.recommend(*PATIENT, requirements=["ventilator"]))[0] == "TST-CARDIAC"
+    assert ids(registry.recommend(*PATIENT))[0] == "TST-NEAR"
+
+
+def test_diverting_hospitals_are_only_a_fallback(registry):
+    registry.update_capacity("TST-NEAR", {"diverting": True})
+    assert "TST-NEAR" not in ids(registry.recommend(*PATIENT))
+
+    registry.update_capacity("TST-CARDIAC", {"beds_available": 0})
+    registry.update_capacity("TST-FAR", {"beds_available": 0})
+    result = registry.recommend(*PATIENT, radius_km=50)
+    assert result["hospitals"], "fallback should still offer somewhere to go"
+    assert ids(result)[0] == "TST-NEAR"
+    assert result["hospitals"][0]["diverting"] is True
+
+
+def test_capacity_update_is_versioned_and_replayed(registry):
+    updated = registry.update_capacity("TST-NEAR", {"beds_available": 10})
+    assert updated["beds_available"] == 10
+    assert registry.update_capacity("TST-UNKNOWN", {"beds_available": 1}) is None
+
+    other_worker = HospitalRegistry()
+    other_worker.add(hospital("TST-NEAR", 28.6050, 77.2000, ["trauma"]))
+    other_worker.on_event("hospital.capacity", {"id": "TST-NEAR", "version": updated["version"], "beds_available": 10,
+                                                "beds_total": 100, "icu_total": 10, "icu_available": 5, "diverting": False})
+    assert other_worker.get("TST-NEAR")["beds_available"] == 10
+    # Older reports arriving late are ignored
+    other_worker.on_event("hospital.capacity", {"id": "TST-NEAR", "version": updated["version"] - 1, "beds_available": 99})
+    assert other_worker.get("TST-NEAR")["beds_available"] == 10
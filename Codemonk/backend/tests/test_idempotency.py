@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from services.idempotency import IdempotencyStore, IdempotencyKeyReused
+
+
+def test_concurrent_duplicates_run_the_handler_once():
+    store = IdempotencyStore()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"dispatch_id": f"DSP-{len(calls)}"}
+
+    async def main():
+        fingerprint = store.fingerprint("dispatch", "{}")
+        return await asyncio.gather(*(store.execute("key-1", fingerprint, handler) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert {result["dispatch_id"] for result, _ in results} == {"DSP-1"}
+    assert [replayed for _, replayed in results].count(False) == 1
+
+
+def test_key_reused_with_another_body_is_rejected():
+    store = IdempotencyStore()
+
+    async def handler():
+        return "ok"
+
+    asyncio.run(store.execute("key-1", store.fingerprint("a"), handler))
+    with pytest.raises(IdempotencyKeyReused):
+        asyncio.run(store.execute("key-1", store.fingerprint("b"), handler))
+
+
+def test_failures_are_not_stored():
+    store = IdempotencyStore()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("provider down")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.execute("key-1", "fp", flaky))
+    assert asyncio.run(store.execute("key-1", "fp", flaky)) == ("ok", False)
+
+
+def test_entries_expire_and_stay_bounded():
+    store = IdempotencyStore(max_entries=2, ttl_seconds=60)
+
+    async def handler():
+        return "ok"
+
+    for key in ("a", "b", "c"):
+        asyncio.run(store.execute(key, "fp", handler))
+    assert list(store._entries) == ["b", "c"]
+    assert store.stats["evicted"] == 1
+
+
+def test_dispatch_retry_replays_the_original_response(client):
+    body = {
+        "ambulance_id": "AMB-002",
+        "driver_phone": "+919876543210",
+        "hospital_name": "Test Hospital",
+        "hospital_address": "1 Test Road"
+    }
+    headers = {"Idempotency-Key": "test-idempotency-dispatch"}
+    first = client.post("/api/dispatch/", json=body, headers=headers)
+    retry = client.post("/api/dispatch/", json=body, headers=headers)
+
+    assert retry.json()["dispatch_id"] == first.json()["dispatch_id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert client.post("/api/dispatch/", json={**body, "ambulance_id": "AMB-003"}, headers=headers).status_code == 422
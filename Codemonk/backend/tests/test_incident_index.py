@@ -0,0 +1,101 @@
+import time
+from services.incident_index import ExtractionCache, IncidentIndex
+
+NOW = time.time()
+
+
+def record(latitude, longitude, emergency_type="road accident", description="car hit a bike near the flyover", at=NOW):
+    return {"latitude": latitude, "longitude": longitude, "emergency_type": emergency_type, "description": description,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(at))}
+
+
+def test_extraction_cache_reuses_only_the_same_transcript():
+    cache = ExtractionCache()
+    cache.put("My father collapsed at Khan Market!", {"patient_name": "Ravi", "symptoms": ["collapse"]})
+
+    assert cache.get("my father  collapsed at khan market")["patient_name"] == "Ravi"
+    # A similar call from someone else must be extracted again
+    assert cache.get("My mother collapsed at Khan Market") is None
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_extraction_cache_returns_copies():
+    cache = ExtractionCache()
+    cache.put("chest pain", {"symptoms": ["chest pain"]})
+    cache.get("chest pain")["symptoms"].append("edited")
+    assert cache.get("chest pain") == {"symptoms": ["chest pain"]}
+
+
+def test_extraction_cache_expires_and_is_bounded():
+    expired = ExtractionCache(ttl_seconds=0)
+    expired.put("call", {"a": 1})
+    assert expired.get("call") is None
+
+    bounded = ExtractionCache(max_entries=2)
+    for text in ("one", "two", "three"):
+        bounded.put(text, {"text": text})
+    assert bounded.get("one") is None
+    assert bounded.get("three") == {"text": "three"}
+
+
+def test_nearby_similar_report_matches_the_open_incident():
+    index = IncidentIndex()
+    index.add_record({"id": "EMG-A", **record(28.6000, 77.2000)})
+    assert index.match(index.describe(record(28.6010, 77.2010, description="bike and car crash at the flyover"))) == "EMG-A"
+
+
+def test_reports_that_differ_do_not_match():
+    index = IncidentIndex()
+    index.add_record({"id": "EMG-A", **record(28.6000, 77.2000)})
+    describe = index.describe
+    assert index.match(describe(record(28.6200, 77.2000))) is None, "too far"
+    assert index.match(describe(record(28.6000, 77.2000, emergency_type="cardiac arrest"))) is None, "other category"
+    assert index.match(describe(record(28.6000, 77.2000, at=NOW + 3600))) is None, "outside the window"
+    assert index.match(describe(record(28.6000, 77.2000, description="elderly woman fainted at home"))) is None
+
+
+def test_closed_incident_stops_matching():
+    index = IncidentIndex()
+    index.add_record({"id": "EMG-A", **record(28.6000, 77.2000)})
+    index.on_event("emergency.updated", {"id": "EMG-A", "status": "resolved"})
+    assert index.match(index.describe(record(28.6000, 77.2000))) is None
+
+
+def test_duplicate_call_is_attached_to_the_first_emergency(client):
+    report = {"emergency_type": "building fire", "latitude": 28.4501, "longitude": 77.0301,
+              "description": "smoke pouring out of the third floor of the mall"}
+    first = client.post("/api/emergencies/", json=report).json()
+    second = client.post("/api/emergencies/", json={**report, "description": "fire on the third floor of the mall"}).json()
+
+    assert second["deduplicated"] is True
+    assert second["emergency"]["id"] == first["emergency"]["id"]
+    assert second["emergency"]["report_count"] == 2
+
+    forced = client.post("/api/emergencies/?dedupe=false", json=report).json()
+    assert "deduplicated" not in forced
+    assert forced["emergency"]["id"] != first["emergency"]["id"]
+
+
+def test_more_severe_second_report_escalates_the_incident(client):
+    report = {"emergency_type": "gas leak", "latitude": 28.5101, "longitude": 77.1101, "severity": "medium",
+              "priority": 3, "description": "smell of gas in the basement parking", "special_requirements": ["fire brigade"]}
+    first = client.post("/api/emergencies/", json=report).json()["emergency"]
+    second = client.post("/api/emergencies/", json={
+        **report, "severity": "critical", "priority": 1, "patient_name": "Asha", "symptoms": ["unconscious"],
+        "description": "gas in the basement parking, a man collapsed", "special_requirements": ["oxygen", "fire brigade"]
+    }).json()
+
+    assert second["deduplicated"] is True
+    incident = client.get(f"/api/emergencies/{first['id']}").json()
+    assert incident["severity"] == "critical"
+    assert incident["priority"] == 1
+    assert incident["special_requirements"] == ["fire brigade", "oxygen"]
+    assert incident["version"] > first["version"]
+    linked = incident["linked_reports"][-1]
+    assert linked["patient_name"] == "Asha" and linked["symptoms"] == ["unconscious"]
+
+    # A milder follow-up does not downgrade it
+    client.post("/api/emergencies/", json={**report, "severity": "low", "priority": 4,
+                                           "description": "still a smell of gas in the basement parking"})
+    incident = client.get(f"/api/emergencies/{first['id']}").json()
+    assert (incident["severity"], incident["priority"], incident["report_count"]) == ("critical", 1, 3)
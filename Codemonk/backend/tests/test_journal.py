@@ -0,0 +1,84 @@
+import pytest
+from services.journal import Journal, JournalLocked, fcntl
+from services.state_store import JournaledBackend, MemoryStateBackend, _journaled
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return tmp_path / "journal"
+
+
+def open_store(directory, snapshot_every=10000):
+    return JournaledBackend(MemoryStateBackend(), Journal(str(directory), fsync_interval=60), snapshot_every)
+
+
+def test_offsets_are_gap_free_across_segments(directory):
+    journal = Journal(str(directory), segment_bytes=512, fsync_interval=60)
+    offsets = [journal.append("put", "c", str(i), {"i": i}) for i in range(50)]
+    assert offsets == list(range(1, 51))
+    assert journal.snapshot_stats()["segments"] > 1
+
+    assert [entry["offset"] for entry in journal.read(after=17, limit=5)] == [18, 19, 20, 21, 22]
+    assert [entry["key"] for entry in journal.replay(45)] == ["45", "46", "47", "48", "49"]
+    journal.close()
+
+
+def test_torn_write_is_truncated_on_open(directory):
+    journal = Journal(str(directory), fsync_interval=60)
+    for i in range(3):
+        journal.append("put", "c", str(i), {"i": i})
+    journal.close()
+    segment = sorted(directory.glob("*.log"))[-1]
+    with open(segment, "ab") as handle:
+        handle.write(b'{"offset": 4, "op": "pu')
+
+    reopened = Journal(str(directory), fsync_interval=60)
+    assert reopened.last_offset == 3
+    assert reopened.append("put", "c", "3", {"i": 3}) == 4
+    assert [entry["offset"] for entry in reopened.replay()] == [1, 2, 3, 4]
+    reopened.close()
+
+
+def test_state_is_rebuilt_from_the_journal(directory):
+    store = open_store(directory)
+    store.put("ambulances", "AMB-1", {"id": "AMB-1", "status": "available"})
+    store.put("ambulances", "AMB-2", {"id": "AMB-2", "status": "available"})
+    store.put("ambulances", "AMB-1", {"id": "AMB-1", "status": "dispatched"})
+    store.delete("ambulances", "AMB-2")
+    store.next_id("emergencies", 5)
+    store.journal.close()
+
+    recovered = open_store(directory)
+    assert recovered.get("ambulances", "AMB-1")["status"] == "dispatched"
+    assert recovered.get("ambulances", "AMB-2") is None
+    assert recovered.next_id("emergencies") == 6
+    assert recovered.recovery["replayed_entries"] == 5
+    recovered.journal.close()
+
+
+def test_recovery_starts_from_the_snapshot(directory):
+    store = open_store(directory)
+    for i in range(10):
+        store.put("c", str(i), {"id": str(i), "n": i})
+    assert store.snapshot() == 10
+    store.put("c", "0", {"id": "0", "n": 100})
+    store.journal.close()
+
+    recovered = open_store(directory)
+    assert recovered.recovery["snapshot_offset"] == 10
+    assert recovered.recovery["replayed_entries"] == 1
+    assert recovered.get("c", "0")["n"] == 100
+    assert recovered.count("c") == 10
+    recovered.journal.close()
+
+
+@pytest.mark.skipif(fcntl is None, reason="no advisory file locks on this platform")
+def test_second_writer_is_refused(directory, monkeypatch):
+    journal = Journal(str(directory), fsync_interval=60)
+    with pytest.raises(JournalLocked):
+        Journal(str(directory))
+
+    monkeypatch.setenv("SARS_JOURNAL_DIR", str(directory))
+    with pytest.raises(RuntimeError, match="single process"):
+        _journaled(MemoryStateBackend())
+    journal.close()
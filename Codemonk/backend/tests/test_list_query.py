@@ -0,0 +1,77 @@
+import pytest
+from services.state_store import state_store
+from routers.dispatch import DISPATCHES
+
+
+@pytest.fixture(scope="module")
+def dispatches():
+    # A status of their own keeps these records apart from anything else the suite stores
+    for i in range(25):
+        key = f"DSP-LQ-{i:02d}"
+        state_store.put(DISPATCHES, key, {
+            "dispatch_id": key,
+            "status": "list-query",
+            "ambulance_id": f"AMB-{i}",
+            "created_at": f"2025-01-01T00:{i:02d}:00.000+00:00"
+        })
+    return "list-query"
+
+
+def test_cursor_pages_cover_every_record_once(client, dispatches):
+    seen, cursor = [], None
+    while True:
+        params = {"status": dispatches, "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/dispatch/", params=params).json()
+        seen += [record["dispatch_id"] for record in body["dispatches"]]
+        cursor = body.get("next_cursor")
+        if not cursor:
+            break
+    assert seen == [f"DSP-LQ-{i:02d}" for i in range(25)]
+
+
+def test_fields_and_time_filters(client, dispatches):
+    body = client.get("/api/dispatch/", params={
+        "status": dispatches,
+        "fields": "dispatch_id",
+        "created_after": "2025-01-01T00:20:00Z"
+    }).json()
+    assert body["dispatches"] == [{"dispatch_id": f"DSP-LQ-{i:02d}"} for i in range(20, 25)]
+
+
+def test_bad_timestamp_is_rejected(client):
+    assert client.get("/api/dispatch/", params={"created_after": "yesterday"}).status_code == 400
+
+
+def test_etag_and_delta_sync(client, dispatches):
+    first = client.get("/api/dispatch/", params={"status": dispatches, "limit": 5})
+    etag = first.headers["ETag"]
+    assert client.get("/api/dispatch/", params={"status": dispatches, "limit": 5}, headers={"If-None-Match": etag}).status_code == 304
+
+    version = state_store.collection_version(DISPATCHES)
+    record = dict(state_store.get(DISPATCHES, "DSP-LQ-03"), ambulance_id="AMB-99")
+    state_store.put(DISPATCHES, "DSP-LQ-03", record)
+
+    assert client.get("/api/dispatch/", params={"status": dispatches, "limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+    delta = client.get("/api/dispatch/", params={"since": version}).json()
+    assert delta["delta"] is True
+    assert [record["dispatch_id"] for record in delta["dispatches"]] == ["DSP-LQ-03"]
+
+
+def test_delta_reports_records_that_left_the_filter_as_deleted(client, dispatches):
+    version = state_store.collection_version(DISPATCHES)
+    state_store.put(DISPATCHES, "DSP-LQ-07", dict(state_store.get(DISPATCHES, "DSP-LQ-07"), status="completed"))
+    state_store.put(DISPATCHES, "DSP-LQ-08", dict(state_store.get(DISPATCHES, "DSP-LQ-08"), ambulance_id="AMB-98"))
+
+    delta = client.get("/api/dispatch/", params={"since": version, "status": dispatches}).json()
+    assert [record["dispatch_id"] for record in delta["dispatches"]] == ["DSP-LQ-08"]
+    assert delta["deleted"] == ["DSP-LQ-07"]
+
+    state_store.put(DISPATCHES, "DSP-LQ-07", dict(state_store.get(DISPATCHES, "DSP-LQ-07"), status=dispatches))
+
+
+def test_page_reports_the_collection_total(client, dispatches):
+    body = client.get("/api/dispatch/", params={"status": dispatches, "limit": 5}).json()
+    assert "total" not in body
+    assert body["collection_total"] == state_store.count(DISPATCHES)
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+import routers.maps
+from services.map_proxy import LocalUpstream, MapProxy, UpstreamError
+
+A, B = (28.61290, 77.22910), (28.56870, 77.20660)
+
+
+class FakeUpstream:
+    name = "fake"
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+        self.failing = False
+
+    async def route(self, waypoints, route_type, travel_mode):
+        self.calls.append(waypoints)
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            raise UpstreamError(502, "provider down")
+        return {"routes": [{"version": len(self.calls)}]}
+
+    async def traffic_flow(self, point, zoom):
+        self.calls.append([point])
+        return {"flowSegmentData": {"currentSpeed": 30}}
+
+    async def close(self):
+        pass
+
+
+def test_nearby_requests_share_one_entry():
+    upstream = FakeUpstream()
+    proxy = MapProxy(upstream, route_quantum=0.001)
+
+    async def scenario():
+        first = await proxy.route([A, B])
+        second = await proxy.route([(A[0] + 0.0001, A[1] - 0.0001), B])
+        return first[1], second[1]
+
+    assert asyncio.run(scenario()) == ("MISS", "HIT")
+    assert upstream.calls == [[(28.613, 77.229), (28.569, 77.207)]]
+
+
+def test_concurrent_misses_make_one_upstream_call():
+    upstream = FakeUpstream(delay=0.05)
+    proxy = MapProxy(upstream)
+
+    async def scenario():
+        return await asyncio.gather(*(proxy.route([A, B]) for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert len(upstream.calls) == 1
+    assert all(body == results[0][0] for body, _, _ in results)
+    assert proxy.stats["coalesced"] == 19
+
+
+def test_stale_entry_is_served_while_refreshing():
+    upstream = FakeUpstream()
+    proxy = MapProxy(upstream, route_ttl=0.0, route_stale=60.0)
+
+    async def scenario():
+        await proxy.route([A, B])
+        body, status, _ = await proxy.route([A, B])
+        await asyncio.sleep(0.05)
+        refreshed, _, _ = await proxy.route([A, B])
+        return body, status, refreshed
+
+    body, status, refreshed = asyncio.run(scenario())
+    assert status == "STALE" and body["routes"][0]["version"] == 1
+    assert refreshed["routes"][0]["version"] == 2
+
+
+def test_provider_outage_falls_back_to_the_old_answer():
+    upstream = FakeUpstream()
+    proxy = MapProxy(upstream, route_ttl=0.0, route_stale=0.0)
+
+    async def scenario():
+        await proxy.route([A, B])
+        upstream.failing = True
+        cached = await proxy.route([A, B])
+        with pytest.raises(UpstreamError):
+            await proxy.route([B, A])
+        return cached
+
+    body, status, _ = asyncio.run(scenario())
+    assert status == "STALE" and body["routes"][0]["version"] == 1
+    assert proxy.stats["stale_on_error"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    proxy = MapProxy(FakeUpstream(), max_entries=2)
+
+    async def scenario():
+        for latitude in (28.60, 28.61, 28.62):
+            await proxy.traffic_flow(latitude, 77.20)
+        return (await proxy.traffic_flow(28.60, 77.20))[1]
+
+    assert asyncio.run(scenario()) == "MISS"
+    assert proxy.metrics()["entries"] == 2
+
+
+def test_route_endpoint_reports_cache_status(client, monkeypatch):
+    monkeypatch.setattr(routers.maps, "map_proxy", MapProxy(LocalUpstream()))
+    url = f"/api/maps/route?waypoints={A[0]},{A[1]}:{B[0]},{B[1]}"
+
+    first, second = client.get(url), client.get(url)
+    assert first.headers["X-Cache"] == "MISS" and second.headers["X-Cache"] == "HIT"
+    assert second.json()["routes"][0]["summary"]["travelTimeInSeconds"] > 0
+    assert "max-age=" in second.headers["Cache-Control"]
+    assert client.get("/api/maps/route?waypoints=28.6,77.2").status_code == 400
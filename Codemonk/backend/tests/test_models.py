@@ -0,0 +1,36 @@
+import pytest
+from pydantic import ValidationError
+from models.dispatch import DispatchCreate
+from models.emergency import EmergencyCreate
+
+
+def test_dispatch_needs_a_destination():
+    with pytest.raises(ValidationError, match="hospital_id or both"):
+        DispatchCreate(ambulance_id="AMB-001", driver_phone="+911", hospital_name="Only a name")
+    assert DispatchCreate(ambulance_id="AMB-001", driver_phone="+911", hospital_id="HSP-001").hospital_id == "HSP-001"
+
+
+def test_emergency_keeps_unknown_form_fields():
+    emergency = EmergencyCreate(patient_name="Asha", ward="B2")
+    assert emergency.model_dump(exclude_unset=True) == {"patient_name": "Asha", "ward": "B2"}
+
+
+def test_invalid_dispatch_body_is_rejected_before_the_handler(client):
+    response = client.post("/api/dispatch/", json={"ambulance_id": "AMB-001", "hospital_id": "HSP-001"})
+    assert response.status_code == 422
+    assert any(error["loc"][-1] == "driver_phone" for error in response.json()["detail"])
+
+
+def test_dispatch_response_matches_its_schema(client):
+    response = client.post("/api/dispatch/", json={
+        "ambulance_id": "AMB-001",
+        "driver_phone": "+919876543210",
+        "hospital_name": "Test Hospital",
+        "hospital_address": "1 Test Road"
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["dispatch_id"].startswith("DSP-")
+    assert body["hospital_name"] == "Test Hospital"
+    # Twilio is not configured in tests, so nothing was sent
+    assert body["whatsapp_status"]["sent"] is False
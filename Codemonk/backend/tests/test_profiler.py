@@ -0,0 +1,72 @@
+import time
+import asyncio
+import threading
+from collections import Counter
+from services.profiler import LoopWatchdog, SamplingProfiler, culprit, folded
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_folded_output_is_most_common_first():
+    assert folded(Counter({"a;b": 1, "a;c": 3})) == "a;c 3\na;b 1\n"
+
+
+def test_culprit_names_library_and_backend_caller():
+    stack = "main.py:app;routers/dispatch.py:create_dispatch;services/state_store.py:put;sqlite3/dbapi2.py:execute"
+    assert culprit(stack) == {
+        "library": "SQLite",
+        "caller": "services/state_store.py:put",
+        "leaf": "sqlite3/dbapi2.py:execute"
+    }
+    assert culprit("routers/geocode.py:search;services/geocoder.py:geocode")["library"] == "CPU"
+
+
+def test_sampling_profiler_sees_busy_threads():
+    profiler = SamplingProfiler()
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        assert profiler.start(0.2, interval=0.002)
+        assert not profiler.start(0.2), "only one profile at a time"
+        while profiler.running:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 0
+    assert any(stack.startswith("[busy-worker]") and stack.endswith(":spin") for stack in profiler.counts)
+
+
+def test_watchdog_records_loop_blocks_and_slow_requests():
+    watchdog = LoopWatchdog(slow_ms=50, block_ms=40, interval=0.005)
+
+    async def slow_handler():
+        await asyncio.sleep(0.2)
+
+    async def scenario():
+        await watchdog.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.25)  # holds the loop
+        await asyncio.sleep(0.05)
+
+        request_id = watchdog.begin("GET", "/api/slow")
+        await asyncio.create_task(slow_handler())
+        watchdog.end(request_id, 200)
+        assert watchdog.begin("GET", "/api/events/stream") is None
+        await watchdog.stop()
+
+    asyncio.run(scenario())
+
+    block = watchdog.blocks[0]
+    assert block["duration_ms"] >= 150
+    assert "test_profiler.py:scenario" in block["stack"]
+
+    capture = watchdog.captures[0]
+    assert capture["path"] == "/api/slow" and capture["status"] == 200
+    assert capture["duration_ms"] >= 150
+    assert "[awaiting]" in capture["folded"]
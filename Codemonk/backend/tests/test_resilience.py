@@ -0,0 +1,98 @@
+import time
+import asyncio
+import pytest
+from services.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResiliencePolicy
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_after_a_good_trial():
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, reset_timeout=0.05)
+    for success in (True, False, True, False):
+        breaker.record(success)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    # Only one trial call while half open
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_fails_fast_without_calling_the_provider():
+    policy = ResiliencePolicy("test", timeout=1, breaker=CircuitBreaker(min_calls=1, failure_rate=1.0))
+    calls = []
+
+    def provider():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        policy.call(provider)
+    with pytest.raises(CircuitOpenError):
+        policy.call(provider)
+    assert len(calls) == 1
+    assert policy.snapshot()["short_circuited"] == 1
+
+
+def test_deadline_is_enforced_without_blocking_the_loop():
+    policy = ResiliencePolicy("test", timeout=0.05)
+
+    async def main():
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await policy.call_async(time.sleep, 0.5)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.3
+    assert policy.snapshot()["timeouts"] == 1
+
+
+def test_slow_call_is_hedged_and_the_backup_wins():
+    policy = ResiliencePolicy("test", timeout=2, hedge=True, hedge_budget=1.0, hedge_min_delay=0.01, min_samples=3)
+    policy._latencies.extend([0.01] * 3)
+    delays = iter([1.0, 0.0])
+
+    def provider():
+        time.sleep(next(delays))
+        return "answer"
+
+    async def main():
+        started = time.monotonic()
+        result = await policy.call_async(provider)
+        return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(main())
+    assert result == "answer"
+    assert elapsed < 0.5
+    assert policy.stats["hedges_fired"] == 1
+    assert policy.stats["hedge_wins"] == 1
+
+
+def test_cancelled_half_open_trial_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(min_calls=1, failure_rate=1.0, reset_timeout=0.0)
+    breaker.record(False)
+    policy = ResiliencePolicy("test", timeout=5, breaker=breaker)
+
+    async def scenario():
+        trial = asyncio.create_task(policy.call_async(time.sleep, 0.2))
+        await asyncio.sleep(0.02)
+        assert breaker.state == "half_open"
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(scenario())
+    assert policy.snapshot()["abandoned"] == 1
+    # The next caller gets the trial instead of CircuitOpenError
+    assert policy.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_older_than_the_deadline_is_treated_as_lost():
+    breaker = CircuitBreaker(min_calls=1, failure_rate=1.0, reset_timeout=0.0)
+    breaker.record(False)
+    assert breaker.allow(trial_timeout=0.05)
+    assert not breaker.allow(trial_timeout=0.05)
+    time.sleep(0.06)
+    assert breaker.allow(trial_timeout=0.05)
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from routers.ambulances import AMBULANCES
+from routers.dispatch import DISPATCHES
+from routers.emergencies import EMERGENCIES
+from services.capability_index import capability_index
+from services.hospital_registry import hospital_registry, CAPACITY_FIELDS
+from services.sms_service import sms_service
+from services.state_store import state_store
+from simulation.engine import CitySimulator
+
+# Collection -> key field
+COLLECTIONS = {AMBULANCES: "id", DISPATCHES: "dispatch_id", EMERGENCIES: "id"}
+
+
+@pytest.fixture
+def isolated_city():
+    """The simulator replaces the fleet and moves hospital beds; put everything back afterwards"""
+    saved = {collection: state_store.values(collection) for collection in COLLECTIONS}
+    capacity = {h["id"]: {field: h[field] for field in CAPACITY_FIELDS} for h in hospital_registry.list()}
+    configured = sms_service.is_configured
+    yield
+    for collection, records in saved.items():
+        key = COLLECTIONS[collection]
+        for record in state_store.values(collection):
+            state_store.delete(collection, record[key])
+            if collection == AMBULANCES:
+                capability_index.remove(record[key])
+        for record in records:
+            state_store.put(collection, record[key], record)
+    capability_index.load(saved[AMBULANCES])
+    for hospital_id, fields in capacity.items():
+        hospital_registry.update_capacity(hospital_id, fields)
+    sms_service.is_configured = configured
+
+
+def simulate(**options):
+    simulator = CitySimulator(fleet_size=40, calls_per_minute=2.0, hours=0.5, **options)
+    return simulator, asyncio.run(simulator.run())
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        CitySimulator(policy="fastest")
+
+
+def test_every_call_is_its_own_emergency(isolated_city):
+    before = {record["id"] for record in state_store.values(EMERGENCIES)}
+    _, report = simulate(seed=1)
+    created = [record for record in state_store.values(EMERGENCIES) if record["id"] not in before]
+
+    assert report["summary"]["calls"] > 0
+    # Synthetic call texts repeat; deduplication must not fold them into one incident
+    assert len(created) == report["summary"]["calls"]
+    assert all(record.get("report_count", 1) == 1 for record in created)
+
+
+def test_run_is_reproducible_and_consistent(isolated_city):
+    simulator, first = simulate(seed=3)
+    _, second = simulate(seed=3)
+
+    summary = first["summary"]
+    assert summary["response_time"] == second["summary"]["response_time"]
+    assert summary["calls"] == sum(hour["calls"] for hour in first["per_hour"])
+    assert summary["response_time"]["count"] + summary["unserved_at_end"] <= summary["calls"]
+    assert 0.0 < summary["utilisation"] <= 1.0
+    assert len(state_store.values(AMBULANCES)) == simulator.fleet_size
+    assert sms_service.is_configured is False
@@ -0,0 +1,143 @@
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+from services.sms_service import MessageCoalescer, TokenBucket, WhatsAppService, format_update_batch
+
+
+class FakeMessages:
+    """Twilio messages API stand-in that takes `delay` seconds per send"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+
+    def create(self, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("twilio down")
+        self.sent.append(kwargs)
+        return SimpleNamespace(sid=f"SM{len(self.sent)}", status="queued")
+
+
+def configured_service(messages: FakeMessages) -> WhatsAppService:
+    service = WhatsAppService()
+    service.is_configured = True
+    service.client = SimpleNamespace(messages=messages)
+    return service
+
+
+async def loop_ticks(coroutine):
+    """Run a coroutine and count how often a 10 ms ticker got to run meanwhile"""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        result = await coroutine
+    finally:
+        task.cancel()
+    return result, ticks
+
+
+def test_token_bucket_limits_bursts():
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.time_until_available() <= 1
+
+
+def test_updates_within_the_window_become_one_message():
+    sent = []
+    done = threading.Event()
+
+    def send(phone, body):
+        sent.append((phone, body))
+        done.set()
+        return {"success": True}
+
+    coalescer = MessageCoalescer(send, window=0.05, rate=10, burst=5)
+    coalescer.submit("+911", "AMB-1", "ROUTE_CHANGE", "Take the flyover")
+    assert coalescer.submit("+911", "AMB-1", "PRIORITY_UPDATE", "Now critical") == 2
+    assert done.wait(2)
+
+    assert sent == [("+911", format_update_batch("AMB-1", [
+        ("ROUTE_CHANGE", "Take the flyover"), ("PRIORITY_UPDATE", "Now critical")
+    ]))]
+    assert coalescer.metrics()["updates_coalesced"] == 1
+
+
+def test_failed_send_is_retried_with_backoff_then_dropped():
+    outcomes = [False, False, True]
+    sent = []
+    done = threading.Event()
+
+    def send(phone, body):
+        sent.append(body)
+        success = outcomes.pop(0) if outcomes else False
+        if success or not outcomes:
+            done.set()
+        return {"success": success, "error": None if success else "twilio down"}
+
+    coalescer = MessageCoalescer(send, window=0.01, rate=100, burst=5, max_attempts=3, retry_backoff=0.01)
+    coalescer.submit("+911", "AMB-1", "ROUTE_CHANGE", "Take the flyover")
+    assert done.wait(2)
+    metrics = coalescer.metrics()
+    assert len(sent) == 3 and len(set(sent)) == 1
+    assert (metrics["messages_sent"], metrics["send_failures"], metrics["send_retries"]) == (1, 2, 2)
+
+    done.clear()
+    coalescer.submit("+912", "AMB-2", "ROUTE_CHANGE", "Take the ring road")
+    assert done.wait(2)
+    deadline = time.monotonic() + 2
+    while coalescer.metrics()["messages_dropped"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    metrics = coalescer.metrics()
+    assert (metrics["messages_sent"], metrics["send_failures"], metrics["messages_dropped"]) == (1, 5, 1)
+
+
+def test_waiting_for_a_token_does_not_block_the_event_loop():
+    coalescer = MessageCoalescer(lambda *args: {"success": True}, window=1, rate=4, burst=1)
+
+    async def main():
+        await coalescer.wait_for_token("+911", 5)
+        return await loop_ticks(coalescer.wait_for_token("+911", 5))
+
+    waited, ticks = asyncio.run(main())
+    assert 0.15 < waited < 0.5
+    assert ticks >= 10
+
+
+def test_queued_update_is_not_reported_as_sent():
+    messages = FakeMessages(fail=True)
+    service = configured_service(messages)
+    service.coalescer.window = 0.01
+
+    result = asyncio.run(service.send_emergency_update("+911", "AMB-1", "UPDATE", "Gate 3"))
+    assert result["queued"] is True
+    assert result["success"] is False
+
+    deadline = time.monotonic() + 2
+    while service.get_metrics()["send_failures"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.get_metrics()["send_failures"] == 1
+
+
+def test_hospital_assignment_does_not_block_the_event_loop():
+    messages = FakeMessages(delay=0.3)
+    service = configured_service(messages)
+
+    result, ticks = asyncio.run(loop_ticks(service.send_hospital_assignment(
+        driver_phone="+919876543210", ambulance_id="AMB-1", hospital_name="AIIMS", hospital_address="Ansari Nagar"
+    )))
+    assert result["success"] is True
+    assert messages.sent[0]["to"] == f"whatsapp:{service.admin_number}"
+    assert ticks >= 15
+
+
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import pytest
+from services.state_store import MemoryStateBackend, SQLiteStateBackend, create_backend
+from services.event_bus import EventBus
+
+
+def test_put_many_compare_and_set_is_atomic(tmp_path):
+    for backend in (MemoryStateBackend(), SQLiteStateBackend(str(tmp_path / "state.db"))):
+        first = backend.put("units", "A", {"id": "A", "status": "available"})
+        backend.put("units", "B", {"id": "B", "status": "available"})
+
+        written, conflicts = backend.put_many("units", [
+            ("A", {"id": "A", "status": "dispatched"}, first["version"]),
+            ("B", {"id": "B", "status": "dispatched"}, first["version"] - 1)
+        ], atomic=True)
+
+        assert written == []
+        assert [conflict["id"] for conflict in conflicts] == ["B"]
+        assert backend.get("units", "A")["status"] == "available"
+
+
+def test_sqlite_workers_share_records_ids_and_events(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a, worker_b = SQLiteStateBackend(path), SQLiteStateBackend(path)
+
+    worker_a.put("emergencies", "EMG-1", {"id": "EMG-1"})
+    assert worker_b.get("emergencies", "EMG-1")["id"] == "EMG-1"
+    assert {worker_a.next_id("emergencies"), worker_b.next_id("emergencies")} == {1, 2}
+
+    bus_b = EventBus(worker_b)
+    bus_b._cursor = worker_b.last_event_cursor()
+    received = []
+    bus_b.add_listener(lambda topic, data: received.append((topic, data)))
+
+    EventBus(worker_a).publish("emergency.created", {"id": "EMG-1"})
+    assert bus_b.dispatch_pending() == 1
+    assert received == [("emergency.created", {"id": "EMG-1"})]
+
+
+def test_poller_reads_sqlite_events_off_the_event_loop(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / "state.db"))
+    bus = EventBus(backend)
+    readers = []
+    read_events = backend.read_events
+
+    def tracked(*args):
+        readers.append(threading.current_thread())
+        return read_events(*args)
+
+    backend.read_events = tracked
+    received = []
+    bus.add_listener(lambda topic, data: received.append(topic))
+    bus.publish("ambulance.updated", {"id": "AMB-1"})
+
+    assert asyncio.run(bus.dispatch_pending_async()) == 1
+    assert received == ["ambulance.updated"]
+    assert readers and threading.main_thread() not in readers
+
+
+def test_changes_since_reports_updates_and_deletions():
+    backend = MemoryStateBackend()
+    backend.put("units", "A", {"id": "A"})
+    version = backend.collection_version("units")
+    backend.put("units", "B", {"id": "B"})
+    backend.delete("units", "A")
+
+    changed, deleted = backend.changes_since("units", version)
+    assert [record["id"] for record in changed] == ["B"]
+    assert deleted == ["A"]
+
+
+def test_create_backend_rejects_unknown_urls():
+    with pytest.raises(ValueError, match="SARS_STATE_BACKEND"):
+        create_backend("postgres://localhost")
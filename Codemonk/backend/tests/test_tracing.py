@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from services.tracing import SpanStore, Tracer, aggregate, parse_traceparent, summarize
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def tracer():
+    return Tracer(SpanStore())
+
+
+def span(name, start, duration_ms, span_id, parent_id=None):
+    return {"trace_id": "t", "span_id": span_id, "parent_id": parent_id, "name": name, "start": start,
+            "duration_ms": duration_ms, "status": "ok", "attributes": {}}
+
+
+def test_nested_spans_are_exported_together_when_the_root_ends(tracer):
+    with tracer.span("dispatch.create") as root:
+        with tracer.span("eta.predict") as child:
+            assert child.trace_id == root.trace_id
+            assert child.parent_id == root.span_id
+        assert tracer.store.get(root.trace_id) is None
+
+    spans = tracer.store.get(root.trace_id)
+    assert [s["name"] for s in spans] == ["dispatch.create", "eta.predict"]
+
+
+def test_failed_span_records_the_error(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("transcription.upload") as failed:
+            raise ValueError("bad audio")
+    recorded = tracer.store.get(failed.trace_id)[0]
+    assert recorded["status"] == "error"
+    assert recorded["attributes"]["error"] == "ValueError: bad audio"
+
+
+def test_a_later_request_joins_the_trace(tracer):
+    trace_id, parent_id = parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01")
+    with tracer.span("emergency.create", trace_id=trace_id, parent_id=parent_id) as joined:
+        assert joined.traceparent.startswith(f"00-{TRACE_ID}-")
+    assert joined.parent_id == PARENT_ID
+
+
+@pytest.mark.parametrize("header", [None, "", "garbage", f"00-{TRACE_ID}-short-01", f"00-{'z' * 32}-{PARENT_ID}-01"])
+def test_invalid_traceparent_is_ignored(header):
+    assert parse_traceparent(header) is None
+
+
+def test_concurrent_requests_do_not_share_spans(tracer):
+    async def request(name):
+        with tracer.span(name) as root:
+            await asyncio.sleep(0.01)
+            with tracer.span(f"{name}.inner") as inner:
+                return root.trace_id, inner.parent_id == root.span_id
+
+    async def both():
+        return await asyncio.gather(request("a"), request("b"))
+
+    (trace_a, nested_a), (trace_b, nested_b) = asyncio.run(both())
+    assert trace_a != trace_b and nested_a and nested_b
+
+
+def test_summary_splits_request_time_from_waiting_time():
+    spans = [
+        span("transcription.upload", 100.0, 2000, "a"),
+        span("emergency.create", 130.0, 50, "b"),
+        span("dispatch.create", 160.0, 500, "c"),
+        span("whatsapp.send_hospital_assignment", 160.2, 300, "d", parent_id="c"),
+    ]
+    summary = summarize("t", spans)
+    assert summary["duration_ms"] == 60500.0
+    assert summary["in_requests_ms"] == 2550.0
+    assert summary["between_requests_ms"] == 57950.0
+    assert summary["call_to_dispatch_ms"] == 60500.0
+    assert aggregate([spans])["call_to_dispatch"]["count"] == 1
+
+
+def test_store_keeps_the_most_recent_traces():
+    store = SpanStore(max_traces=2)
+    for trace_id in ("t1", "t2", "t3"):
+        store.add([{**span("x", 0.0, 1, trace_id), "trace_id": trace_id}])
+    assert store.get("t1") is None
+    assert [trace_id for trace_id, _ in store.recent(5)] == ["t3", "t2"]
+
+
+def test_emergency_continues_the_callers_trace(client):
+    response = client.post(
+        "/api/emergencies/?dedupe=false",
+        json={"emergency_type": "fall", "location": "somewhere"},
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+    )
+    assert response.json()["emergency"]["trace_id"] == TRACE_ID
@@ -0,0 +1,66 @@
+import pytest
+from services.transcript_index import TranscriptIndex, snippet
+
+CALLS = [
+    ("CALL-1", "My father has severe chest pain and is sweating", "cardiac emergency", "critical", "2025-01-01T08:00:00+00:00"),
+    ("CALL-2", "Chest pain after a fall, he is breathing fine", "trauma", "moderate", "2025-01-01T09:00:00+00:00"),
+    ("CALL-3", "A bus hit a motorcycle near the flyover, two injured", "trauma", "critical", "2025-01-01T10:00:00+00:00"),
+    ("CALL-4", "Child with high fever and a seizure", "pediatric", "high", "2025-01-02T08:00:00+00:00"),
+]
+JAN_2 = 1735776000.0
+
+
+@pytest.fixture
+def index():
+    i = TranscriptIndex()
+    i.load(
+        {"id": key, "transcription": text, "created_at": created_at,
+         "extracted_data": {"emergency_type": kind, "severity": severity}}
+        for key, text, kind, severity, created_at in CALLS
+    )
+    return i
+
+
+def ids(result):
+    return [key for key, _ in result["hits"]]
+
+
+def test_all_words_must_match_by_default(index):
+    assert ids(index.search("chest pain sweating")) == ["CALL-1"]
+    assert sorted(ids(index.search("sweating seizure", match_all=False))) == ["CALL-1", "CALL-4"]
+
+
+def test_bm25_prefers_the_call_that_matches_more_terms(index):
+    assert ids(index.search("chest pain cardiac", match_all=False))[0] == "CALL-1"
+
+
+def test_last_word_matches_as_a_prefix(index):
+    result = index.search("motorcy")
+    assert ids(result) == ["CALL-3"]
+    assert "motorcycle" in result["terms"]
+    assert ids(index.search("seiz* child")) == ["CALL-4"]
+
+
+def test_filters_narrow_the_matches(index):
+    assert ids(index.search("chest pain", severity="moderate")) == ["CALL-2"]
+    assert ids(index.search("", emergency_type="Trauma", severity="critical")) == ["CALL-3"]
+    assert ids(index.search("", after=JAN_2)) == ["CALL-4"]
+    assert index.search("chest", severity="unknown-severity")["total"] == 0
+
+
+def test_filters_alone_return_newest_first(index):
+    result = index.search("", limit=2)
+    assert result["total"] == 4
+    assert ids(result) == ["CALL-4", "CALL-3"]
+
+
+def test_calls_are_indexed_once(index):
+    assert index.add({"id": "CALL-1", "transcription": "duplicate"}) is False
+    assert index.stats()["calls"] == 4
+
+
+def test_snippet_is_centred_on_the_match():
+    text = "x " * 200 + "the patient is unconscious " + "y " * 200
+    window = snippet(text, ["unconscious"])
+    assert "unconscious" in window
+    assert window.startswith("…") and window.endswith("…")
@@ -39,6 +39,7 @@ import {
 import { Line, Bar, Pie, Doughnut } from "react-chartjs-2";
 import Sidebar from "../components/Sidebar";
 import TopNavBar from "../components/TopNavBar";
+import { analyticsAPI } from "../services/api";
 
 // Register ChartJS components
 ChartJS.register(
@@ -164,6 +165,37 @@ const Analytics = () => {
               },
             });
             console.log("Heatmap layer added successfully!");
+
+            // Live coverage raster under the heatmap, re-tiled whenever it changes
+            let coverageVersion = null;
+            const refreshCoverage = async () => {
+              try {
+                const coverage = await analyticsAPI.getCoverage();
+                if (coverage.version === coverageVersion) return;
+                coverageVersion = coverage.version;
+                if (map.getLayer("coverage-layer")) map.removeLayer("coverage-layer");
+                if (map.getSource("coverage-source")) map.removeSource("coverage-source");
+                map.addSource("coverage-source", {
+                  type: "raster",
+                  tiles: [analyticsAPI.coverageTileUrl(coverage.version)],
+                  tileSize: 256,
+                });
+                map.addLayer(
+                  {
+                    id: "coverage-layer",
+                    type: "raster",
+                    source: "coverage-source",
+                    paint: { "raster-opacity": 0.6 },
+                  },
+                  "emergency-heatmap-layer"
+                );
+              } catch (error) {
+                console.error("Error loading coverage:", error);
+              }
+            };
+            refreshCoverage();
+            const coverageTimer = setInterval(refreshCoverage, 30000);
+            map.on("remove", () => clearInterval(coverageTimer));
           });
 
           map.addControl(new window.tt.NavigationControl());
@@ -23,6 +23,7 @@ import {
 } from '@mui/icons-material';
 import Sidebar from '../components/Sidebar';
 import TopNavBar from '../components/TopNavBar';
+import { mapsAPI } from '../services/api';
 import { useNavigate } from 'react-router-dom';
 
 /**
@@ -87,14 +88,10 @@ const Dashboard = () => {
       weatherDesc: 'Wet roads, visibility moderate',
     }));
 
-    // Fetch real traffic data from TomTom API
+    // Fetch traffic data through the backend's shared cache
     const fetchTrafficData = async () => {
       try {
-        const bbox = '77.1,28.5,77.3,28.7'; // Bounding box for New Delhi
-        const response = await fetch(
-          `https://api.tomtom.com/traffic/services/4/flowSegmentData/absolute/10/json?point=28.6139,77.2090&key=JXPnqva3lZanMKstFTttkppZnHor4IXr`
-        );
-        const data = await response.json();
+        const data = await mapsAPI.getTrafficFlow(28.6139, 77.2090);
         
         if (data.flowSegmentData) {
           const speed = data.flowSegmentData.currentSpeed;
@@ -23,6 +23,7 @@ import {
   Opacity,
 } from "@mui/icons-material";
 import { useLocation, useNavigate } from "react-router-dom";
+import { mapsAPI } from "../services/api";
 import Sidebar from "../components/Sidebar";
 import TopNavBar from "../components/TopNavBar";
 import {
@@ -200,13 +201,11 @@ const LiveTracking = () => {
       map.on("load", async () => {
         console.log("Map loaded successfully");
         try {
-          // Fetch real route from TomTom Routing API
-          const apiKey = "JXPnqva3lZanMKstFTttkppZnHor4IXr";
-          const routeUrl = `https://api.tomtom.com/routing/1/calculateRoute/${ambulanceStart.lat},${ambulanceStart.lng}:${patientLocation.lat},${patientLocation.lng}/json?key=${apiKey}&traffic=true&routeType=fastest&travelMode=car`;
-
-          console.log("Fetching route from TomTom API...");
-          const response = await fetch(routeUrl);
-          const data = await response.json();
+          // Fetch the route through the backend's shared routing cache
+          console.log("Fetching route...");
+          const data = await mapsAPI.getRoute([ambulanceStart, patientLocation], {
+            route_type: "fastest",
+          });
 
           console.log("Route API response:", data);
 
@@ -22,6 +22,7 @@ import {
 } from "@mui/icons-material";
 import Sidebar from "../components/Sidebar";
 import TopNavBar from "../components/TopNavBar";
+import { mapsAPI } from "../services/api";
 
 const RoutePlanning = () => {
   const [mobileOpen, setMobileOpen] = useState(false);
@@ -221,20 +222,8 @@ const RoutePlanning = () => {
         map.removeSource("route-outline");
       }
 
-      // Calculate route using TomTom Routing API
-      // TomTom expects waypoints in lat,lng format (not lng,lat)
-      const waypoints = `${ambulance.lat},${ambulance.lng}:${emergency.lat},${emergency.lng}:${hospital.lat},${hospital.lng}`;
-      const url = `https://api.tomtom.com/routing/1/calculateRoute/${waypoints}/json?key=JXPnqva3lZanMKstFTttkppZnHor4IXr&traffic=true&travelMode=car`;
-
-      console.log("Fetching route from:", url);
-
-      const response = await fetch(url);
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-
-      const data = await response.json();
+      // Calculate route through the backend's shared routing cache
+      const data = await mapsAPI.getRoute([ambulance, emergency, hospital]);
       console.log("Route data received:", data);
 
       if (!data.routes || data.routes.length === 0) {
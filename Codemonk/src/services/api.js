@@ -118,15 +118,44 @@ export const mapsAPI = {
   },
 
   /**
-   * Get optimized route
+   * Get a traffic-aware route through [{lat, lng}, ...] (TomTom calculateRoute format)
+   * Served from the backend's shared route cache
    */
-  getRoute: async (origin, destination) => {
-    const response = await apiClient.post('/maps/route', {
-      origin,
-      destination,
+  getRoute: async (points, options = {}) => {
+    const waypoints = points.map((point) => `${point.lat},${point.lng}`).join(':');
+    const response = await apiClient.get('/maps/route', {
+      params: { waypoints, ...options },
     });
     return response.data;
   },
+
+  /**
+   * Get traffic flow near a point (TomTom flowSegmentData format)
+   */
+  getTrafficFlow: async (lat, lng) => {
+    const response = await apiClient.get('/maps/traffic/flow', {
+      params: { latitude: lat, longitude: lng },
+    });
+    return response.data;
+  },
+};
+
+// Analytics API
+export const analyticsAPI = {
+  /**
+   * Get coverage of the service area by available ambulances
+   */
+  getCoverage: async () => {
+    const response = await apiClient.get('/analytics/coverage');
+    return response.data;
+  },
+
+  /**
+   * XYZ tile URL template for the coverage raster layer
+   * The version makes map tiles refetch once coverage changes
+   */
+  coverageTileUrl: (version) =>
+    `${API_BASE_URL}/analytics/coverage/tiles/{z}/{x}/{y}.png?v=${version}`,
 };
 
 // Agency API
@@ -175,6 +204,7 @@ export default {
   ambulanceAPI,
   dispatchAPI,
   mapsAPI,
+  analyticsAPI,
   agencyAPI,
   trackingAPI,
 };